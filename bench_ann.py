@@ -0,0 +1,157 @@
+import time
+import json
+import argparse
+
+import faiss
+import numpy as np
+
+from vector_store import VectorStore
+from logs import configure
+
+
+def recall_at_k(approx_ids, exact_ids, k):
+    """Average fraction of the exact top-k found by the approximate search."""
+    hits = [
+        len(set(a[:k]) & set(e[:k])) / min(k, len(e))
+        for a, e in zip(approx_ids, exact_ids)
+        if len(e)
+    ]
+    return float(np.mean(hits)) if hits else 0.0
+
+
+def time_queries(store, queries, k):
+    """Run queries one at a time and return (result ids, latencies in ms)."""
+    result_ids = []
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        results = store.search(query, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        result_ids.append([r["id"] for r in results])
+    return result_ids, latencies
+
+
+def index_bytes(store):
+    """In-RAM size of a FAISS index: its serialized size."""
+    return int(faiss.serialize_index(store.index).nbytes)
+
+
+def knob_grid(spec, nprobes, ef_searches, rerank_factors=None):
+    """Query-time settings worth sweeping for an index type."""
+    if "IVF" in spec:
+        grid = [{"nprobe": n} for n in nprobes]
+    elif "HNSW" in spec:
+        grid = [{"ef_search": ef} for ef in ef_searches]
+    else:
+        grid = [{}]
+    if rerank_factors:
+        grid = [dict(params, rerank_factor=factor) for params in grid for factor in rerank_factors]
+    return grid
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure recall@k and latency of FAISS index types against the exact flat index."
+    )
+    parser.add_argument("--index", default="data/index/faiss.index", help="Exact (Flat) index to take vectors from")
+    parser.add_argument("--metadata", default="data/index/metadata.bin", help="Metadata of that index")
+    parser.add_argument("--specs", nargs="+", default=["IVF256,Flat", "HNSW32", "IVF256,PQ48"],
+                        help="Index specs to compare, e.g. SQ8 or PQ48 for compressed indexes")
+    parser.add_argument("--nprobe", nargs="+", type=int, default=[1, 4, 16, 64], help="nprobe values for IVF")
+    parser.add_argument("--ef-search", nargs="+", type=int, default=[16, 64, 256], help="efSearch values for HNSW")
+    parser.add_argument("--k", type=int, default=10, help="Neighbours per query")
+    parser.add_argument("--num-queries", type=int, default=200, help="Queries sampled from the corpus")
+    parser.add_argument("--query-file", help="Embed these queries (one per line) instead of sampling pages")
+    parser.add_argument("--train-size", type=int, default=50000, help="Training sample size")
+    parser.add_argument("--rerank-dtype", choices=["float16", "float32"], default=None,
+                        help="Keep exact vectors for re-ranking the candidates of every spec")
+    parser.add_argument("--rerank-factor", nargs="+", type=int, default=[1, 4, 10],
+                        help="Candidates re-ranked per result (with --rerank-dtype)")
+    parser.add_argument("--output", help="Write the results as JSON to this path")
+    args = parser.parse_args()
+    configure()
+
+    exact = VectorStore()
+    exact.load(args.index, args.metadata)
+    ids, vectors = exact.get_vectors()
+    metadata = [exact.metadata[i] for i in ids]
+    print(f"[INFO] Benchmarking on {len(vectors)} vectors, k={args.k}")
+
+    if args.query_file:
+        from embedder import Embedder
+        with open(args.query_file, "r", encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+        queries = Embedder().embed_texts(texts).astype("float32")
+    else:
+        # Perturb sampled pages so a query is not just its own nearest neighbour
+        rng = np.random.default_rng(0)
+        sample = vectors[rng.choice(len(vectors), min(args.num_queries, len(vectors)), replace=False)]
+        queries = sample + rng.normal(scale=0.01, size=sample.shape).astype("float32")
+
+    exact_ids, exact_latencies = time_queries(exact, queries, args.k)
+    flat_bytes = index_bytes(exact)
+
+    rows = [{
+        "index_spec": "Flat",
+        "params": {},
+        "index_mb": flat_bytes / 1e6,
+        "memory_saved": 0.0,
+        "vector_file_mb": 0.0,
+        "build_seconds": 0.0,
+        "recall_at_k": 1.0,
+        "p50_ms": float(np.percentile(exact_latencies, 50)),
+        "p99_ms": float(np.percentile(exact_latencies, 99)),
+    }]
+
+    for spec in args.specs:
+        store = VectorStore(
+            dim=vectors.shape[1], index_spec=spec, train_size=args.train_size, rerank_dtype=args.rerank_dtype
+        )
+        start = time.perf_counter()
+        try:
+            store.add_embeddings(vectors, metadata)
+            store.flush()
+        except ValueError as e:
+            print(f"[WARN] Skipping {spec}: {e}")
+            continue
+        build_seconds = time.perf_counter() - start
+        # The vector file stays on disk, memory-mapped at query time
+        spec_bytes = index_bytes(store)
+        vector_file_bytes = store.vectors.nbytes if store.vectors is not None else 0
+
+        rerank_factors = args.rerank_factor if args.rerank_dtype else None
+        for params in knob_grid(spec, args.nprobe, args.ef_search, rerank_factors):
+            store.set_search_params(**params)
+            approx_ids, latencies = time_queries(store, queries, args.k)
+            rows.append({
+                "index_spec": spec,
+                "params": params,
+                "index_mb": spec_bytes / 1e6,
+                "memory_saved": 1 - spec_bytes / flat_bytes,
+                "vector_file_mb": vector_file_bytes / 1e6,
+                "build_seconds": build_seconds,
+                "recall_at_k": recall_at_k(approx_ids, exact_ids, args.k),
+                "p50_ms": float(np.percentile(latencies, 50)),
+                "p99_ms": float(np.percentile(latencies, 99)),
+            })
+
+    print(
+        f"\n{'index':<16}{'params':<30}{'RAM MB':>9}{'saved':>8}{'file MB':>9}{'build s':>9}"
+        f"{'recall@' + str(args.k):>11}{'p50 ms':>9}{'p99 ms':>9}"
+    )
+    for row in rows:
+        params = ",".join(f"{k}={v}" for k, v in row["params"].items()) or "-"
+        print(
+            f"{row['index_spec']:<16}{params:<30}{row['index_mb']:>9.1f}{row['memory_saved']:>8.1%}"
+            f"{row['vector_file_mb']:>9.1f}{row['build_seconds']:>9.2f}"
+            f"{row['recall_at_k']:>11.3f}{row['p50_ms']:>9.3f}{row['p99_ms']:>9.3f}"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"k": args.k, "num_vectors": len(vectors), "results": rows}, f, indent=4)
+        print(f"\n[INFO] Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
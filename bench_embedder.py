@@ -0,0 +1,138 @@
+import time
+import json
+import argparse
+
+import numpy as np
+
+from embedder import BACKENDS, Embedder
+from page_store import PageStore
+from logs import configure
+
+
+def cosine_drift(reference, candidate):
+    """
+    Per-row cosine distance (1 - cosine similarity) between two embedding
+    matrices of the same texts.
+    """
+    reference = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    candidate = candidate / np.linalg.norm(candidate, axis=1, keepdims=True)
+    return 1.0 - np.sum(reference * candidate, axis=1)
+
+
+def neighbour_overlap(reference, candidate, k=10):
+    """
+    Average fraction of each text's k nearest neighbours (among the sample)
+    that stay the same under the candidate embeddings.
+    """
+    k = min(k, len(reference) - 1)
+    if k < 1:
+        return 1.0
+
+    def neighbours(vectors):
+        distances = np.sum((vectors[:, None, :] - vectors[None, :, :]) ** 2, axis=2)
+        np.fill_diagonal(distances, np.inf)
+        return np.argsort(distances, axis=1)[:, :k]
+
+    ref, cand = neighbours(reference), neighbours(candidate)
+    return float(np.mean([len(set(r) & set(c)) / k for r, c in zip(ref, cand)]))
+
+
+def time_encoding(embedder, texts, repeats=1):
+    """Encode texts and return (embeddings, texts per second of the best run)."""
+    best = None
+    embeddings = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        embeddings = embedder.encode_sorted(texts)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return embeddings, len(texts) / best
+
+
+def compare_backends(texts, model_name, backends, reference="torch", local_files_only=False,
+                     batch_size=32, repeats=1, k=10):
+    """
+    Embed texts with the reference backend and every candidate backend.
+    Returns one row per backend with its throughput, speedup and cosine
+    drift against the reference embeddings.
+    """
+    def load(backend):
+        embedder = Embedder(model_name, backend=backend, batch_size=batch_size, local_files_only=local_files_only)
+        embedder.warmup(background=False)
+        return embedder
+
+    reference_vectors, reference_rate = time_encoding(load(reference), texts, repeats)
+    rows = [{"backend": reference, "texts_per_s": reference_rate, "speedup": 1.0}]
+
+    for backend in backends:
+        if backend == reference:
+            continue
+        try:
+            vectors, rate = time_encoding(load(backend), texts, repeats)
+        except Exception as e:
+            print(f"[WARN] Skipping backend '{backend}': {e}")
+            continue
+
+        drift = cosine_drift(reference_vectors, vectors)
+        rows.append({
+            "backend": backend,
+            "texts_per_s": rate,
+            "speedup": rate / reference_rate,
+            "mean_drift": float(drift.mean()),
+            "p99_drift": float(np.percentile(drift, 99)),
+            "max_drift": float(drift.max()),
+            f"neighbour_overlap@{k}": neighbour_overlap(reference_vectors, vectors, k),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare embedding backends: cosine drift against the torch reference and throughput."
+    )
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="Model name or local directory")
+    parser.add_argument("--backends", nargs="+", default=["torch-int8", "onnx", "onnx-int8"],
+                        choices=BACKENDS, help="Backends to compare")
+    parser.add_argument("--reference", default="torch", choices=BACKENDS, help="Reference backend")
+    parser.add_argument("--pages", default="data/index/pages.db", help="Page store to sample texts from")
+    parser.add_argument("--num-texts", type=int, default=500, help="Pages sampled from the page store")
+    parser.add_argument("--batch-size", type=int, default=32, help="Texts per forward pass")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per backend (best is kept)")
+    parser.add_argument("--local-files-only", action="store_true", help="Load the model from disk, no network")
+    parser.add_argument("--output", help="Write the results as JSON to this path")
+    args = parser.parse_args()
+    configure()
+
+    page_store = PageStore(args.pages)
+    texts = [text for _, text in page_store.iter_pages()]
+    page_store.close()
+    if len(texts) > args.num_texts:
+        rng = np.random.default_rng(0)
+        texts = [texts[i] for i in rng.choice(len(texts), args.num_texts, replace=False)]
+    print(f"[INFO] Comparing backends on {len(texts)} pages...")
+
+    rows = compare_backends(
+        texts,
+        args.model,
+        args.backends,
+        reference=args.reference,
+        local_files_only=args.local_files_only,
+        batch_size=args.batch_size,
+        repeats=args.repeats,
+    )
+
+    print(f"{'backend':<12} {'texts/s':>9} {'speedup':>8} {'mean drift':>11} {'max drift':>10}")
+    for row in rows:
+        print(
+            f"{row['backend']:<12} {row['texts_per_s']:>9.1f} {row['speedup']:>7.2f}x "
+            f"{row.get('mean_drift', 0.0):>11.5f} {row.get('max_drift', 0.0):>10.5f}"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=4)
+        print(f"[INFO] Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
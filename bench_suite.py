@@ -0,0 +1,317 @@
+import os
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+
+import numpy as np
+
+from logs import configure, get_logger
+from metrics import add_stage_hook, remove_stage_hook
+from synthetic_corpus import StubEmbedder, iter_documents, write_extracted, write_pdfs
+
+log = get_logger("bench_suite")
+
+
+BENCHMARKS = ("extraction", "embedding", "index_build", "vector_search", "end_to_end")
+
+QUERIES = [
+    "partial loss of engine power after takeoff",
+    "carburetor icing during descent",
+    "loss of directional control in a crosswind",
+    "fuel exhaustion forced landing",
+    "hard landing after a high flare",
+    "bird strike during the initial climb",
+    "spatial disorientation at night",
+    "collision with power lines during aerial application",
+    "oil streaming from the engine cowling",
+    "bounced landing and go-around",
+]
+
+
+def latency_stats(latencies_ms):
+    """Summary of per-query latencies in milliseconds."""
+    latencies_ms = np.asarray(latencies_ms, dtype="float64")
+    return {
+        "queries": int(len(latencies_ms)),
+        "mean_ms": float(latencies_ms.mean()),
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "qps": float(1000.0 / latencies_ms.mean()),
+    }
+
+
+def directory_bytes(path):
+    """Total size of the files in a directory."""
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def bench_extraction(pdf_paths):
+    """Text extraction with pdf_processor, one PDF at a time."""
+    from pdf_processor import extract_text_from_pdf
+
+    pages = 0
+    start = time.perf_counter()
+    for path in pdf_paths:
+        pages += len(extract_text_from_pdf(path)["pages"])
+    seconds = time.perf_counter() - start
+    return {"documents": len(pdf_paths), "pages": pages, "seconds": seconds, "pages_per_s": pages / seconds}
+
+
+def bench_embedding(embedder, texts):
+    """Page embedding throughput (length-sorted batches)."""
+    embedder.encode_sorted(texts[:8])
+    start = time.perf_counter()
+    embedder.encode_sorted(texts)
+    seconds = time.perf_counter() - start
+    return {"pages": len(texts), "seconds": seconds, "pages_per_s": len(texts) / seconds}
+
+
+def bench_index_build(extracted_dir, index_dir, embedder, index_spec="Flat", batch_size=256):
+    """
+    A full build the way build_index.py runs it: extracted JSON in, FAISS
+    index, metadata, page store, lexical index and field table out.
+    """
+    from ingest import iter_extracted_json, list_extracted_json, update_index
+
+    sources = {
+        os.path.basename(path).replace(".json", ".pdf"): path
+        for path in list_extracted_json(extracted_dir)
+    }
+    paths = [os.path.join(index_dir, name) for name in ("faiss.index", "metadata.bin", "manifest.json")]
+
+    start = time.perf_counter()
+    update_index(
+        sources,
+        iter_extracted_json,
+        *paths,
+        pages_path=os.path.join(index_dir, "pages.db"),
+        lexical_path=os.path.join(index_dir, "lexical.npz"),
+        fields_path=os.path.join(index_dir, "fields.npz"),
+        embedder=embedder,
+        dim=getattr(embedder, "dim", 384),
+        index_spec=index_spec,
+        batch_size=batch_size,
+    )
+    seconds = time.perf_counter() - start
+
+    from page_store import PageStore
+    page_store = PageStore(os.path.join(index_dir, "pages.db"))
+    pages = len(page_store)
+    page_store.close()
+    return {
+        "documents": len(sources),
+        "pages": pages,
+        "seconds": seconds,
+        "pages_per_s": pages / seconds,
+        "index_bytes": directory_bytes(index_dir),
+    }
+
+
+def bench_vector_search(index_dir, embedder, queries, k=5, repeats=5):
+    """VectorStore.search latency, and search_batch over all queries at once."""
+    from vector_store import VectorStore
+
+    store = VectorStore(dim=getattr(embedder, "dim", 384))
+    store.load(os.path.join(index_dir, "faiss.index"), os.path.join(index_dir, "metadata.bin"))
+    vectors = embedder.embed_texts(queries).astype("float32")
+
+    latencies = []
+    for _ in range(repeats):
+        for vector in vectors:
+            start = time.perf_counter()
+            store.search(vector, k)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        store.search_batch(vectors, k)
+    batch_seconds = time.perf_counter() - start
+
+    result = latency_stats(latencies)
+    result["batch_qps"] = len(vectors) * repeats / batch_seconds
+    result["vectors"] = int(store.index.ntotal)
+    return result
+
+
+def bench_end_to_end(index_dir, embedder, queries, k=5, repeats=5, modes=("semantic", "hybrid")):
+    """SearchEngine.search latency including snippets, per retrieval mode."""
+    from search_engine import SearchEngine
+
+    engine = SearchEngine(
+        index_path=os.path.join(index_dir, "faiss.index"),
+        metadata_path=os.path.join(index_dir, "metadata.bin"),
+        pages_path=os.path.join(index_dir, "pages.db"),
+        lexical_path=os.path.join(index_dir, "lexical.npz"),
+        fields_path=os.path.join(index_dir, "fields.npz"),
+        cache_path=None,
+        embedder=embedder,
+        # Queries repeat across passes; measure the search, not the cache
+        result_cache_size=0,
+    )
+
+    results = {"startup_seconds": engine.startup_timings["total"]}
+    for mode in modes:
+        latencies = []
+        stage_seconds = {}
+
+        def on_stage(name, seconds, labels):
+            if labels.get("pipeline") == "search":
+                stage_seconds[name] = stage_seconds.get(name, 0.0) + seconds
+
+        add_stage_hook(on_stage)
+        try:
+            for _ in range(repeats):
+                for query in queries:
+                    start = time.perf_counter()
+                    engine.search(query, k=k, threshold=2.0, mode=mode)
+                    latencies.append((time.perf_counter() - start) * 1000)
+        finally:
+            remove_stage_hook(on_stage)
+        results[mode] = latency_stats(latencies)
+        # Where the time goes: mean milliseconds per query in each stage
+        results[mode]["stages_ms"] = {
+            name: seconds * 1000 / len(latencies) for name, seconds in stage_seconds.items()
+        }
+    return results
+
+
+def environment():
+    """What the numbers depend on, recorded with every run."""
+    import faiss
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "faiss": faiss.__version__,
+    }
+
+
+def flatten(results, prefix=""):
+    """{"a": {"b": 1}} -> {"a.b": 1}, numbers only."""
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compare(baseline, current):
+    """Print each timing/throughput metric next to a baseline run."""
+    old, new = flatten(baseline["results"]), flatten(current["results"])
+    print(f"\n{'metric':<40} {'baseline':>12} {'current':>12} {'change':>8}")
+    for key in sorted(set(old) & set(new)):
+        if not key.endswith(("_ms", "_s", "seconds", "qps")) or not old[key]:
+            continue
+        change = new[key] / old[key] - 1.0
+        print(f"{key:<40} {old[key]:>12.4g} {new[key]:>12.4g} {change:>+7.1%}")
+
+
+def run_suite(args):
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="pdf_search_bench_")
+    extracted_dir = os.path.join(work_dir, "extracted")
+    index_dir = os.path.join(work_dir, "index")
+    os.makedirs(index_dir, exist_ok=True)
+
+    if args.embedder == "model":
+        from embedder import Embedder
+        embedder = Embedder(batch_size=args.encode_batch_size)
+    else:
+        embedder = StubEmbedder()
+
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "compare", "work_dir")}
+    report = {"environment": environment(), "config": config, "results": {}}
+    results = report["results"]
+
+    def run(name, benchmark, *bench_args, **bench_kwargs):
+        log.info("Running benchmark", benchmark=name)
+        try:
+            results[name] = benchmark(*bench_args, **bench_kwargs)
+        except Exception as e:
+            log.error("Benchmark failed", benchmark=name, error=e)
+            results[name] = {"error": str(e)}
+
+    try:
+        if "extraction" in args.benchmarks:
+            pdf_dir = os.path.join(work_dir, "pdfs")
+            pdf_paths = write_pdfs(
+                iter_documents(args.extraction_pages, args.pages_per_doc, args.seed), pdf_dir
+            )
+            run("extraction", bench_extraction, pdf_paths)
+
+        if "embedding" in args.benchmarks:
+            texts = [
+                page["text"]
+                for data in iter_documents(args.embedding_pages, args.pages_per_doc, args.seed)
+                for page in data["pages"]
+            ]
+            run("embedding", bench_embedding, embedder, texts)
+
+        if set(args.benchmarks) & {"index_build", "vector_search", "end_to_end"}:
+            write_extracted(iter_documents(args.pages, args.pages_per_doc, args.seed), extracted_dir)
+            run("index_build", bench_index_build, extracted_dir, index_dir, embedder, args.index_spec)
+
+        if "vector_search" in args.benchmarks:
+            run("vector_search", bench_vector_search, index_dir, embedder, QUERIES, args.k, args.repeats)
+
+        if "end_to_end" in args.benchmarks:
+            run("end_to_end", bench_end_to_end, index_dir, embedder, QUERIES, args.k, args.repeats)
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark extraction, embedding, index build and search on a synthetic corpus."
+    )
+    parser.add_argument("--benchmarks", nargs="+", choices=BENCHMARKS, default=list(BENCHMARKS),
+                        help="Benchmarks to run")
+    parser.add_argument("--pages", type=int, default=20000, help="Synthetic corpus size for index/search")
+    parser.add_argument("--pages-per-doc", type=int, default=4, help="Pages per synthetic report")
+    parser.add_argument("--extraction-pages", type=int, default=400, help="Pages rendered to PDF for extraction")
+    parser.add_argument("--embedding-pages", type=int, default=2000, help="Pages embedded by the embedding benchmark")
+    parser.add_argument("--embedder", choices=["stub", "model"], default="stub",
+                        help="Hashing stub (no model, index-side scaling) or the real model")
+    parser.add_argument("--encode-batch-size", type=int, default=32, help="Pages per model forward pass")
+    parser.add_argument("--index-spec", default="Flat", help="FAISS index type to build")
+    parser.add_argument("--k", type=int, default=5, help="Results per query")
+    parser.add_argument("--repeats", type=int, default=5, help="Passes over the query set")
+    parser.add_argument("--seed", type=int, default=0, help="Corpus seed")
+    parser.add_argument("--work-dir", help="Keep generated files here (default: temporary, deleted)")
+    parser.add_argument("--output", default="bench_results.json", help="JSON results path")
+    parser.add_argument("--compare", help="Previous results JSON to compare against")
+    args = parser.parse_args()
+    configure()
+
+    report = run_suite(args)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+    log.info("Results written", path=args.output)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,58 +1,81 @@
 import os
-import json
-from embedder import Embedder
-from vector_store import VectorStore
-import numpy as np
+import argparse
+from document_index import POOLINGS
+from embedder import BACKENDS
+from ingest import list_extracted_json, iter_extracted_json, update_index
+from logs import configure, get_logger
+from metrics import REGISTRY
+from snapshots import build_snapshot
 
-# Paths
-extracted_folder = "data/extracted"
-index_path = "data/index/faiss.index"
-metadata_path = "data/index/metadata.json"
-
-# Initialize modules
-embedder = Embedder()
-vector_store = VectorStore(dim=384)
-
-all_embeddings = []
-all_metadata = []
+log = get_logger("build_index")
 
-print("[INFO] Building index from extracted JSON files...")
-
-# Loop through all JSON files
-for filename in os.listdir(extracted_folder):
-    if filename.endswith(".json"):
-        json_path = os.path.join(extracted_folder, filename)
-
-        print(f"[PROCESSING] {filename}")
-        
-        # Load JSON
-        with open(json_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+# Paths; the index files live in versioned snapshots under index_dir
+extracted_folder = "data/extracted"
+index_dir = "data/index"
 
-        pages = data["pages"]
-        filename_only = data["filename"]
 
-        # Create metadata for each page
-        metadata_list = [
-            {"filename": filename_only, "page": page["page"]}
-            for page in pages
-        ]
+def main():
+    parser = argparse.ArgumentParser(description="Build the FAISS index from extracted JSON files.")
+    parser.add_argument("--rebuild", action="store_true", help="Ignore the manifest and rebuild from scratch")
+    parser.add_argument("--index-spec", default=None, help="FAISS index type, e.g. Flat, IVF1024,Flat, HNSW32, SQ8")
+    parser.add_argument("--train-size", type=int, default=50000, help="Vectors sampled to train IVF/PQ indexes")
+    parser.add_argument("--rerank-dtype", choices=["float16", "float32"], default=None,
+                        help="Keep exact vectors on disk and re-rank candidates of a compressed index (SQ8, PQ48)")
+    parser.add_argument("--encode-batch-size", type=int, default=32, help="Pages per model forward pass")
+    parser.add_argument("--encode-workers", type=int, default=1, help="Encoding processes")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="Embedding model name or local directory")
+    parser.add_argument("--backend", default="torch", choices=BACKENDS, help="Embedding backend")
+    parser.add_argument("--local-files-only", action="store_true", help="Load the model from disk, no network")
+    parser.add_argument("--checkpoint-every", type=int, default=100000, help="Save progress every N vectors")
+    parser.add_argument("--sentence-embeddings", action="store_true",
+                        help="Also embed every sentence, so snippets pick sentences by similarity")
+    parser.add_argument("--dedup-threshold", type=float, default=0.9,
+                        help="Store pages at least this similar (MinHash) to an indexed page with the same "
+                             "identifiers as aliases; 0 disables")
+    parser.add_argument("--document-pooling", choices=POOLINGS, default="centroid",
+                        help="How page vectors are pooled into the per-document index")
+    parser.add_argument("--keep-snapshots", type=int, default=2,
+                        help="Index snapshots kept, the new one included (the others allow rollback)")
+    parser.add_argument("--metrics-file", help="Write build metrics here in the Prometheus text format")
+    args = parser.parse_args()
+    configure()
 
-        # Get embeddings
-        page_texts = [p["text"] for p in pages]
-        page_embeddings = embedder.embed_pages(pages)
+    log.info("Building index from extracted JSON files", folder=extracted_folder)
 
-        # Add to global lists
-        all_embeddings.append(page_embeddings)
-        all_metadata.extend(metadata_list)
+    # Each document is keyed by its PDF name, like the metadata entries
+    sources = {
+        os.path.basename(path).replace(".json", ".pdf"): path
+        for path in list_extracted_json(extracted_folder)
+    }
 
-# Combine embeddings into a single matrix
-all_embeddings = np.vstack(all_embeddings)
+    # Only new or changed documents are re-embedded; reading, embedding
+    # and indexing overlap through the ingest pipeline. The build goes
+    # into a new snapshot that running engines switch to once it is done.
+    build_snapshot(index_dir, lambda paths: update_index(
+        sources,
+        iter_extracted_json,
+        **paths,
+        document_pooling=args.document_pooling,
+        rebuild=args.rebuild,
+        index_spec=args.index_spec,
+        rerank_dtype=args.rerank_dtype,
+        dedup_threshold=args.dedup_threshold,
+        train_size=args.train_size,
+        embedder_options={
+            "model_name": args.model,
+            "backend": args.backend,
+            "local_files_only": args.local_files_only,
+            "batch_size": args.encode_batch_size,
+            "workers": args.encode_workers,
+        },
+        checkpoint_every=args.checkpoint_every,
+        sentence_embeddings=args.sentence_embeddings,
+    ), keep=args.keep_snapshots)
 
-# Add to FAISS index
-vector_store.add_embeddings(all_embeddings, all_metadata)
+    log.info("Index has been built and saved")
+    if args.metrics_file:
+        REGISTRY.write(args.metrics_file)
 
-# Save index + metadata
-vector_store.save(index_path, metadata_path)
 
-print("[SUCCESS] Index has been built and saved!")
+if __name__ == "__main__":
+    main()
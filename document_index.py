@@ -0,0 +1,200 @@
+import os
+import argparse
+
+import faiss
+import numpy as np
+
+from logs import configure, get_logger
+from metrics import BYTES_READ
+from vector_store import VectorStore
+
+log = get_logger("document_index")
+
+POOLINGS = ("centroid", "max")
+
+
+class DocumentIndex:
+    """
+    One vector per document, for two-stage retrieval.
+
+    Each document vector pools the vectors of its pages: "centroid" is
+    their mean, "max" their component-wise maximum, both scaled back to
+    unit length like page embeddings. A query first ranks documents over
+    this small exact index, then only the pages of the best documents are
+    searched. vector_docs maps every vector ID to its document row, as in
+    FieldTable; page_offsets / page_ids invert it (CSR layout): the vector
+    IDs of row r are page_ids[page_offsets[r]:page_offsets[r + 1]].
+    """
+
+    def __init__(self, dim=384, pooling="centroid"):
+        if pooling not in POOLINGS:
+            raise ValueError(f"[ERROR] Unknown pooling '{pooling}', expected one of {POOLINGS}.")
+        self.dim = dim
+        self.pooling = pooling
+        self.filenames = []
+        self.vectors = np.zeros((0, dim), dtype="float32")
+        self.vector_docs = np.zeros(0, dtype="int32")
+        self.page_offsets = np.zeros(1, dtype="int64")
+        self.page_ids = np.zeros(0, dtype="int64")
+        self.index = faiss.IndexFlatL2(dim)
+
+    def __len__(self):
+        return len(self.filenames)
+
+    @classmethod
+    def build(cls, vector_store, pooling="centroid", previous=None):
+        """
+        Pool the vectors of a VectorStore by document. Needs the original
+        vectors: a Flat index, or any index with a vector file (rerank_dtype).
+        previous: index of an earlier build of the same vector store;
+        documents whose vectors are all unchanged keep their pooled vector,
+        so only the vectors of re-indexed documents are read and pooled.
+        """
+        metadata = vector_store.metadata
+        ids = vector_store.ids()
+
+        # Document rows are the metadata's interned filenames, restricted
+        # to documents that still have live vectors
+        doc_ids = metadata.doc_ids
+        keep = ids < len(doc_ids)
+        keep[keep] = doc_ids[ids[keep]] >= 0
+        live = ids[keep]
+        used = np.unique(doc_ids[live])
+        rows = np.full(len(metadata.filenames), -1, dtype="int32")
+        rows[used] = np.arange(len(used), dtype="int32")
+        live_rows = rows[doc_ids[live]]
+
+        table = cls(vector_store.index.d, pooling)
+        table.filenames = [metadata.filenames[doc] for doc in used]
+        table.vector_docs = np.full(len(metadata), -1, dtype="int32")
+        table.vector_docs[live] = live_rows
+
+        # Re-indexed documents get new vector IDs: a document is unchanged
+        # when its vectors are exactly the ones of its previous row
+        old_rows = np.full(len(table), -1, dtype="int64")
+        if previous is not None and previous.pooling == pooling and previous.dim == table.dim:
+            lookup = {filename: row for row, filename in enumerate(previous.filenames)}
+            old_rows = np.array([lookup.get(name, -1) for name in table.filenames], dtype="int64")
+            before = np.full(len(live), -1, dtype="int64")
+            known = live < len(previous.vector_docs)
+            before[known] = previous.vector_docs[live[known]]
+            moved = np.zeros(len(table), dtype=bool)
+            moved[live_rows[before != old_rows[live_rows]]] = True
+            old_counts = np.bincount(
+                previous.vector_docs[previous.vector_docs >= 0], minlength=max(len(previous), 1)
+            )
+            counts = np.bincount(live_rows, minlength=len(table))
+            moved |= (old_rows >= 0) & (old_counts[np.maximum(old_rows, 0)] != counts)
+            old_rows[moved] = -1
+        reused = old_rows >= 0
+
+        pooled = np.zeros((len(table), table.dim), dtype="float32")
+        if reused.any():
+            pooled[reused] = previous.vectors[old_rows[reused]]
+        changed = ~reused[live_rows]
+        try:
+            _, vectors = vector_store.get_vectors(live[changed])
+        except RuntimeError as e:
+            raise ValueError(
+                f"[ERROR] Index '{vector_store.index_spec}' does not keep its vectors; "
+                f"rebuild it with a rerank dtype to add a document index: {e}"
+            )
+        changed_rows = live_rows[changed]
+        if pooling == "centroid":
+            sums = np.zeros((len(table), table.dim), dtype="float32")
+            np.add.at(sums, changed_rows, vectors)
+        else:
+            sums = np.full((len(table), table.dim), -np.inf, dtype="float32")
+            np.maximum.at(sums, changed_rows, vectors)
+        norms = np.linalg.norm(sums[~reused], axis=1, keepdims=True)
+        pooled[~reused] = sums[~reused] / np.maximum(norms, 1e-12)
+        table.vectors = pooled
+        table.index.add(table.vectors)
+        table._index_pages()
+
+        log.info("Document index built", documents=len(table), pooled=int((~reused).sum()), pooling=pooling)
+        return table
+
+    def doc_mask(self, id_mask):
+        """Boolean mask over documents with at least one vector in id_mask."""
+        mask = np.zeros(len(self), dtype=bool)
+        id_mask = np.asarray(id_mask, dtype=bool)[:len(self.vector_docs)]
+        rows = self.vector_docs[:len(id_mask)][id_mask]
+        mask[rows[rows >= 0]] = True
+        return mask
+
+    def _index_pages(self):
+        """Group vector IDs by document row into page_offsets / page_ids."""
+        live = np.flatnonzero(self.vector_docs >= 0)
+        rows = self.vector_docs[live]
+        # Stable: the pages of a row stay in vector ID order
+        self.page_ids = live[np.argsort(rows, kind="stable")].astype("int64")
+        self.page_offsets = np.zeros(len(self) + 1, dtype="int64")
+        np.cumsum(np.bincount(rows, minlength=len(self)), out=self.page_offsets[1:])
+
+    def pages(self, rows):
+        """Vector IDs of the pages of document rows, without scanning vector_docs."""
+        starts, stops = self.page_offsets[rows], self.page_offsets[np.asarray(rows) + 1]
+        if not len(starts):
+            return np.zeros(0, dtype="int64")
+        return np.concatenate([self.page_ids[start:stop] for start, stop in zip(starts, stops)])
+
+    def search(self, query_embeddings, n_docs, doc_mask=None):
+        """
+        The n_docs closest documents of every query.
+        doc_mask: optional boolean array over document rows.
+        Returns (distances, rows) matrices padded with -1 like a FAISS search.
+        """
+        query_embeddings = np.array(query_embeddings).astype("float32").reshape(-1, self.dim)
+        if doc_mask is None:
+            return self.index.search(query_embeddings, n_docs)
+        bits = np.packbits(np.asarray(doc_mask, dtype=bool), bitorder="little")
+        params = faiss.SearchParameters(sel=faiss.IDSelectorBitmap(len(bits), faiss.swig_ptr(bits)))
+        return self.index.search(query_embeddings, n_docs, params=params)
+
+    def save(self, path):
+        """Save the index as a compressed .npz file, replacing it atomically."""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(
+                f,
+                filenames=np.array(self.filenames),
+                vectors=self.vectors,
+                vector_docs=self.vector_docs,
+                pooling=np.array(self.pooling),
+            )
+        os.replace(tmp_path, path)
+        log.info("Document index saved", path=path, documents=len(self))
+
+    @classmethod
+    def load(cls, path):
+        """Load an index written by save."""
+        with np.load(path) as data:
+            vectors = data["vectors"]
+            table = cls(vectors.shape[1], str(data["pooling"]))
+            table.filenames = [str(name) for name in data["filenames"]]
+            table.vectors = vectors
+            table.vector_docs = data["vector_docs"]
+        table.index.add(table.vectors)
+        table._index_pages()
+        BYTES_READ.inc(table.vectors.nbytes + table.vector_docs.nbytes, source="documents")
+        return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the per-document vector index for an existing index.")
+    parser.add_argument("--index", default="data/index/faiss.index", help="FAISS index path")
+    parser.add_argument("--metadata", default="data/index/metadata.bin", help="Index metadata path")
+    parser.add_argument("--output", default="data/index/documents.npz", help="Output document index path")
+    parser.add_argument("--pooling", choices=POOLINGS, default="centroid",
+                        help="How page vectors are pooled into one vector per document")
+    args = parser.parse_args()
+    configure()
+
+    vector_store = VectorStore()
+    vector_store.load(args.index, args.metadata)
+    DocumentIndex.build(vector_store, args.pooling).save(args.output)
+
+
+if __name__ == "__main__":
+    main()
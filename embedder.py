@@ -1,11 +1,229 @@
-from sentence_transformers import SentenceTransformer
+import os
+import time
+import argparse
+import threading
+
 import numpy as np
 
+from logs import configure, get_logger
+
+log = get_logger("embedder")
+
+# "torch" is the full-precision reference; the others trade a little
+# accuracy for CPU speed while staying in the same model's vector space
+BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+
+# Indexes built before the embedding space was recorded used this
+LEGACY_SPACE = {"model": "all-MiniLM-L6-v2", "backend": "torch"}
+
+# Files loaded from <model dir>/onnx/, as written by export_onnx_model
+ONNX_FILES = {"onnx": "onnx/model.onnx", "onnx-int8": "onnx/model_qint8_avx2.onnx"}
+
+
+def model_id(model_name):
+    """
+    Identity of a model's vector space: the model's name without the hub
+    organisation or local directory, so "sentence-transformers/all-MiniLM-L6-v2"
+    and "models/all-MiniLM-L6-v2" are the same model.
+    """
+    return os.path.basename(os.path.normpath(model_name))
+
+
+def check_compatible(index_embedding, embedder):
+    """
+    Check that queries embedded by embedder can be searched against an
+    index built with index_embedding ({"model", "backend"}, or None for
+    indexes built before it was recorded, which used the default torch model).
+    A different model means a different vector space and raises ValueError;
+    a different backend of the same model only drifts slightly (measure it
+    with bench_embedder.py) and is reported as a warning.
+    """
+    index_embedding = index_embedding or LEGACY_SPACE
+    space = embedder.space
+
+    if index_embedding["model"] != space["model"]:
+        raise ValueError(
+            f"[ERROR] Index was built with model '{index_embedding['model']}' but queries use "
+            f"'{space['model']}'; the vector spaces are incompatible. Rebuild the index."
+        )
+    if index_embedding["backend"] != space["backend"]:
+        log.warning(
+            "Index was built with a different backend; distances drift slightly, "
+            "run bench_embedder.py to measure it",
+            index_backend=index_embedding["backend"],
+            query_backend=space["backend"],
+        )
+
+
 class Embedder:
-    def __init__(self, model_name="all-MiniLM-L6-v2"):
-        print("[INFO] Loading embedding model...")
-        self.model = SentenceTransformer(model_name)
-        print("[INFO] Model loaded successfully!")
+    def __init__(self, model_name="all-MiniLM-L6-v2", cache=None, batch_size=32, workers=1, lazy=False,
+                 backend="torch", local_files_only=False, onnx_file=None):
+        """
+        model_name: hub model name or local model directory
+        cache: optional EmbeddingCache used by embed_queries
+        batch_size: texts per model forward pass when embedding pages
+        workers: number of encoding processes used by embed_pages
+        lazy: defer importing sentence-transformers (and torch) and loading
+              the model until it is first needed or warmup() is called
+        backend: "torch" (full precision), "torch-int8" (dynamically
+                 quantized Linear layers), "onnx" or "onnx-int8" (ONNX
+                 Runtime; the model directory needs the files written by
+                 export_onnx_model)
+        local_files_only: never touch the network, load from disk only
+        onnx_file: ONNX file inside the model directory, overriding the
+                   backend's default
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"[ERROR] Unknown embedding backend '{backend}', expected one of {BACKENDS}.")
+        self.model_name = model_name
+        self.backend = backend
+        self.local_files_only = local_files_only
+        self.onnx_file = onnx_file or ONNX_FILES.get(backend)
+        self.cache = cache
+        self.batch_size = batch_size
+        self.workers = workers
+        self._pool = None
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._warmup_thread = None
+        # Seconds spent per loading phase: import, load, warmup
+        self.timings = {}
+
+        if not lazy:
+            self._load_model()
+
+    def _load_model(self):
+        """Import sentence-transformers and load the model, once."""
+        with self._model_lock:
+            if self._model is not None:
+                return self._model
+
+            log.info("Loading embedding model", model=self.model_name, backend=self.backend)
+            start = time.perf_counter()
+            from sentence_transformers import SentenceTransformer
+            self.timings["import"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            if self.backend.startswith("onnx"):
+                model = SentenceTransformer(
+                    self.model_name,
+                    device="cpu",
+                    backend="onnx",
+                    model_kwargs={"file_name": self.onnx_file},
+                    local_files_only=self.local_files_only,
+                )
+            else:
+                model = SentenceTransformer(self.model_name, local_files_only=self.local_files_only)
+                if self.backend == "torch-int8":
+                    import torch
+                    model = torch.ao.quantization.quantize_dynamic(
+                        model.to("cpu"), {torch.nn.Linear}, dtype=torch.qint8
+                    )
+            self.timings["load"] = time.perf_counter() - start
+
+            self._model = model
+            log.info("Model loaded", seconds=round(self.timings["import"] + self.timings["load"], 3))
+            return model
+
+    @property
+    def model(self):
+        """The SentenceTransformer model, loaded on first access."""
+        if self._model is None:
+            return self._load_model()
+        return self._model
+
+    @property
+    def space(self):
+        """The vector space embeddings live in, recorded with the index."""
+        return {"model": model_id(self.model_name), "backend": self.backend}
+
+    @property
+    def cache_key(self):
+        """Model key for the query embedding cache; backends do not share entries."""
+        if self.backend == "torch":
+            return self.model_name
+        return f"{self.model_name}@{self.backend}"
+
+    @property
+    def ready(self):
+        """True once the model is loaded."""
+        return self._model is not None
+
+    def warmup(self, background=True):
+        """
+        Load the model and run one dummy encode so the first real query
+        does not pay for lazy initialisation. With background=True this
+        happens in a daemon thread and the call returns immediately;
+        queries needing the model meanwhile wait for it to finish loading.
+        """
+        def run():
+            try:
+                model = self._load_model()
+                start = time.perf_counter()
+                model.encode(["warmup"])
+                self.timings["warmup"] = time.perf_counter() - start
+                log.info("Model warm", seconds=round(sum(self.timings.values()), 3))
+            except Exception as e:
+                log.error("Model warmup failed", error=e)
+
+        if not background:
+            run()
+            return None
+        if self._warmup_thread is None:
+            self._warmup_thread = threading.Thread(target=run, name="embedder-warmup", daemon=True)
+            self._warmup_thread.start()
+        return self._warmup_thread
+
+    def wait_ready(self, timeout=None):
+        """Block until a background warmup has finished. Returns self.ready."""
+        if self._warmup_thread is not None:
+            self._warmup_thread.join(timeout)
+        return self.ready
+
+    def _get_pool(self):
+        """Start the multi-process encoding pool on first use."""
+        if self._pool is None:
+            log.info("Starting encoding processes", workers=self.workers)
+            self._pool = self.model.start_multi_process_pool(["cpu"] * self.workers)
+        return self._pool
+
+    def close(self):
+        """Stop the encoding processes, if any were started."""
+        if self._pool is not None:
+            self._model.stop_multi_process_pool(self._pool)
+            self._pool = None
+
+    def encode_sorted(self, texts):
+        """
+        Encode texts in batches of similar length, then restore the input order.
+
+        Texts are sorted by character length (a cheap proxy for token
+        length), so each batch pads to a similar size instead of to its
+        longest outlier. With workers > 1 the sorted texts are split into
+        contiguous chunks and encoded across the process pool.
+        """
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, self.model.get_sentence_embedding_dimension()), dtype="float32")
+
+        order = np.argsort([len(text) for text in texts], kind="stable")
+        sorted_texts = [texts[i] for i in order]
+
+        if self.workers > 1 and len(texts) > self.batch_size:
+            chunk_size = max(self.batch_size, -(-len(texts) // self.workers))
+            embeddings = self.model.encode(
+                sorted_texts,
+                batch_size=self.batch_size,
+                pool=self._get_pool(),
+                chunk_size=chunk_size,
+            )
+        else:
+            embeddings = self.model.encode(sorted_texts, batch_size=self.batch_size)
+
+        embeddings = np.asarray(embeddings)
+        result = np.empty_like(embeddings)
+        result[order] = embeddings
+        return result
 
     def embed_text(self, text):
         """
@@ -14,11 +232,69 @@ class Embedder:
         embedding = self.model.encode(text)
         return np.array(embedding)
 
+    def embed_texts(self, texts):
+        """
+        Convert a list of text strings into embeddings in a single model call.
+        Returns an array of shape (len(texts), dim).
+        """
+        embeddings = self.model.encode(list(texts))
+        return np.array(embeddings)
+
+    def embed_queries(self, queries):
+        """
+        Convert search queries into embeddings, reusing cached vectors.
+        Only queries missing from the cache are sent to the model,
+        all of them in a single call.
+        """
+        if self.cache is None:
+            return self.embed_texts(queries)
+
+        vectors = [self.cache.get(query) for query in queries]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+
+        if missing:
+            embeddings = self.embed_texts([queries[i] for i in missing])
+            for i, embedding in zip(missing, embeddings):
+                self.cache.put(queries[i], embedding)
+                vectors[i] = embedding
+
+        return np.array(vectors, dtype="float32")
+
     def embed_pages(self, pages):
         """
         Convert a list of page dictionaries into embeddings.
         Each page dict: {"page": x, "text": "..."}
         """
         texts = [page["text"] for page in pages]
-        embeddings = self.model.encode(texts)
-        return np.array(embeddings)
+        return self.encode_sorted(texts)
+
+
+def export_onnx_model(model_name, output_dir, quantization="avx2"):
+    """
+    Export a model to ONNX (onnx/model.onnx) plus a dynamically int8
+    quantized copy (onnx/model_qint8_<quantization>.onnx) in output_dir,
+    so the onnx backends can later load it with local_files_only=True.
+    Needs `pip install sentence-transformers[onnx]`.
+    """
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    model = SentenceTransformer(model_name, device="cpu", backend="onnx")
+    model.save(output_dir)
+    export_dynamic_quantized_onnx_model(model, quantization, output_dir)
+    log.info("ONNX models written", path=os.path.join(output_dir, "onnx"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the embedding model for the ONNX backends.")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="Hub model name or local directory")
+    parser.add_argument("--output-dir", default="models/all-MiniLM-L6-v2", help="Model directory to write")
+    parser.add_argument("--quantization", default="avx2", choices=["arm64", "avx2", "avx512", "avx512_vnni"],
+                        help="Target CPU instruction set of the int8 model")
+    args = parser.parse_args()
+    configure()
+
+    export_onnx_model(args.model, args.output_dir, args.quantization)
+
+
+if __name__ == "__main__":
+    main()
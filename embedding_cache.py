@@ -0,0 +1,112 @@
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from metrics import REGISTRY
+
+
+CACHE_LOOKUPS = REGISTRY.counter("query_cache_lookups_total", "Query embedding cache lookups by result.")
+
+
+def normalize_query(text):
+    """Normalize a query so trivially different spellings share a cache entry."""
+    return " ".join(text.lower().split())
+
+
+class EmbeddingCache:
+    """
+    Cache of query embeddings keyed by model name and normalized query text.
+
+    A bounded in-memory LRU sits in front of an optional SQLite store on
+    disk, so frequent queries survive restarts without re-running the model.
+    """
+
+    def __init__(self, model_name, capacity=10000, path=None):
+        self.model_name = model_name
+        self.capacity = capacity
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+
+        if path is not None:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model TEXT NOT NULL, query TEXT NOT NULL, vector BLOB NOT NULL, "
+                "PRIMARY KEY (model, query))"
+            )
+            self._conn.commit()
+
+    def _remember(self, key, vector):
+        """Insert into the in-memory LRU, evicting the oldest entry if full."""
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def get(self, text):
+        """Return the cached embedding for a query, or None on a miss."""
+        key = normalize_query(text)
+
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                CACHE_LOOKUPS.inc(result="hit")
+                return vector
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT vector FROM embeddings WHERE model = ? AND query = ?",
+                    (self.model_name, key),
+                ).fetchone()
+                if row is not None:
+                    vector = np.frombuffer(row[0], dtype="float32")
+                    self._remember(key, vector)
+                    self.hits += 1
+                    CACHE_LOOKUPS.inc(result="disk_hit")
+                    return vector
+
+            self.misses += 1
+            CACHE_LOOKUPS.inc(result="miss")
+            return None
+
+    def put(self, text, vector):
+        """Store the embedding of a query."""
+        key = normalize_query(text)
+        vector = np.asarray(vector, dtype="float32")
+
+        with self._lock:
+            self._remember(key, vector)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO embeddings (model, query, vector) VALUES (?, ?, ?)",
+                    (self.model_name, key, vector.tobytes()),
+                )
+                self._conn.commit()
+
+    def stats(self):
+        """Return hit/miss counters and the current in-memory size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+            }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,214 @@
+import os
+import argparse
+import datetime
+
+import numpy as np
+
+from logs import configure, get_logger
+from page_store import PageStore
+from metadata_table import MetadataTable
+from vector_store import load_metadata
+
+log = get_logger("field_table")
+
+
+# Report header fields stored as categorical columns
+CATEGORICAL_COLUMNS = ("state", "aircraft", "operation_part")
+
+FILTER_KEYS = ("date_from", "date_to", "state", "make", "operation_part")
+
+
+def _date_key(date):
+    """'2007-12-08' -> 20071208, the integer form stored in the table."""
+    try:
+        date = datetime.date.fromisoformat(date)
+    except (TypeError, ValueError):
+        raise ValueError(f"[ERROR] Invalid date {date!r}, expected YYYY-MM-DD.") from None
+    return date.year * 10000 + date.month * 100 + date.day
+
+
+class FieldTable:
+    """
+    Structured header fields of every report, stored column by column.
+
+    Each document is one row; categorical fields are stored as integer
+    codes into a per-column vocabulary and dates as YYYYMMDD integers.
+    vector_docs maps every vector ID to its document row, so a filter on
+    documents turns into a boolean mask over vector IDs.
+    """
+
+    def __init__(self):
+        self.filenames = []
+        self.dates = np.zeros(0, dtype="int32")
+        self.vocabularies = {column: [] for column in CATEGORICAL_COLUMNS}
+        self.codes = {column: np.zeros(0, dtype="int32") for column in CATEGORICAL_COLUMNS}
+        self.vector_docs = np.zeros(0, dtype="int32")
+
+    def __len__(self):
+        return len(self.filenames)
+
+    @classmethod
+    def build(cls, metadata, page_store, previous=None):
+        """
+        Build the table from index metadata, parsing the header on the
+        first indexed page of each document from the page store.
+        previous: table of an earlier build of the same index; documents
+        whose first page is still the same vector reuse its row instead
+        of reading and parsing the page again.
+        """
+        # Imported here: pdf_processor pulls in PyMuPDF, which loading a
+        # table at search time does not need
+        from pdf_processor import parse_report_header
+
+        if not isinstance(metadata, MetadataTable):
+            metadata = MetadataTable.from_records(metadata)
+
+        # Document rows are the metadata's interned filenames, restricted
+        # to documents that still have live vectors
+        doc_ids, pages = metadata.doc_ids, metadata.pages
+        live = np.flatnonzero(doc_ids >= 0)
+        used = np.unique(doc_ids[live])
+        rows = np.full(len(metadata.filenames), -1, dtype="int32")
+        rows[used] = np.arange(len(used), dtype="int32")
+
+        table = cls()
+        table.filenames = [metadata.filenames[doc] for doc in used]
+        vector_docs = np.full(len(metadata), -1, dtype="int32")
+        vector_docs[live] = rows[doc_ids[live]]
+
+        # First indexed page of each document: sort live vectors by
+        # (row, page) and keep the first vector of every row
+        order = live[np.lexsort((pages[live], vector_docs[live]))]
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = vector_docs[order[1:]] != vector_docs[order[:-1]]
+        first_pages = order[first]
+
+        dates = []
+        lookups = {column: {} for column in CATEGORICAL_COLUMNS}
+        codes = {column: [] for column in CATEGORICAL_COLUMNS}
+
+        # Re-indexed documents get new vector IDs, so a first page that
+        # maps to the same document in the previous table is unchanged
+        reused = np.full(len(first_pages), -1, dtype="int64")
+        if previous is not None:
+            known = first_pages < len(previous.vector_docs)
+            reused[known] = previous.vector_docs[first_pages[known]]
+        parsed = 0
+
+        for row, vector_id in enumerate(first_pages):
+            old_row = reused[row]
+            if old_row >= 0 and previous.filenames[old_row] == table.filenames[row]:
+                date = int(previous.dates[old_row])
+                values = {
+                    column: previous.vocabularies[column][previous.codes[column][old_row]]
+                    for column in CATEGORICAL_COLUMNS
+                }
+            else:
+                fields = parse_report_header(page_store.get_text(int(vector_id)) or "")
+                date = _date_key(fields["date"]) if fields["date"] else 0
+                values = {column: (fields[column] or "").lower() for column in CATEGORICAL_COLUMNS}
+                parsed += 1
+            dates.append(date)
+            for column in CATEGORICAL_COLUMNS:
+                codes[column].append(lookups[column].setdefault(values[column], len(lookups[column])))
+
+        table.dates = np.array(dates, dtype="int32")
+        for column in CATEGORICAL_COLUMNS:
+            table.vocabularies[column] = list(lookups[column])
+            table.codes[column] = np.array(codes[column], dtype="int32")
+        table.vector_docs = vector_docs
+
+        log.info("Field table built", documents=len(table), parsed=parsed)
+        return table
+
+    def _matching_codes(self, column, predicate):
+        """Codes of the vocabulary entries of a column accepted by predicate."""
+        return [code for code, value in enumerate(self.vocabularies[column]) if predicate(value)]
+
+    def document_mask(self, filters):
+        """Turn filters (see mask) into a boolean mask over document rows."""
+        unknown = set(filters) - set(FILTER_KEYS)
+        if unknown:
+            raise ValueError(f"[ERROR] Unknown filters {sorted(unknown)}, expected {FILTER_KEYS}.")
+
+        doc_mask = np.ones(len(self.filenames), dtype=bool)
+
+        if filters.get("date_from"):
+            doc_mask &= self.dates >= _date_key(filters["date_from"])
+        if filters.get("date_to"):
+            doc_mask &= (self.dates <= _date_key(filters["date_to"])) & (self.dates > 0)
+        if filters.get("state"):
+            wanted = filters["state"].lower()
+            doc_mask &= np.isin(self.codes["state"], self._matching_codes("state", lambda v: v == wanted))
+        if filters.get("make"):
+            wanted = filters["make"].lower()
+            doc_mask &= np.isin(self.codes["aircraft"], self._matching_codes("aircraft", lambda v: wanted in v))
+        if filters.get("operation_part"):
+            wanted = str(filters["operation_part"]).lower()
+            doc_mask &= np.isin(
+                self.codes["operation_part"], self._matching_codes("operation_part", lambda v: v == wanted)
+            )
+        return doc_mask
+
+    def mask(self, filters):
+        """
+        Turn filters into a boolean mask over vector IDs.
+
+        filters: dict with any of
+            date_from / date_to: "YYYY-MM-DD", inclusive
+            state: state code or country, e.g. "FL" or "France"
+            make: aircraft make or model text, matched case-insensitively
+                  anywhere in the "Aircraft" field (e.g. "cessna", "PA-28")
+            operation_part: e.g. "91", "137" or "Non-U.S."
+        """
+        doc_mask = self.document_mask(filters)
+        vector_mask = np.zeros(len(self.vector_docs), dtype=bool)
+        known = self.vector_docs >= 0
+        vector_mask[known] = doc_mask[self.vector_docs[known]]
+        return vector_mask
+
+    def save(self, path):
+        """Save the table as a compressed .npz file, replacing it atomically."""
+        arrays = {
+            "filenames": np.array(self.filenames),
+            "dates": self.dates,
+            "vector_docs": self.vector_docs,
+        }
+        for column in CATEGORICAL_COLUMNS:
+            arrays[f"{column}_vocabulary"] = np.array(self.vocabularies[column])
+            arrays[f"{column}_codes"] = self.codes[column]
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(tmp_path, path)
+        log.info("Field table saved", path=path)
+
+    @classmethod
+    def load(cls, path):
+        """Load a table written by save."""
+        table = cls()
+        with np.load(path) as data:
+            table.filenames = [str(name) for name in data["filenames"]]
+            table.dates = data["dates"]
+            table.vector_docs = data["vector_docs"]
+            for column in CATEGORICAL_COLUMNS:
+                table.vocabularies[column] = [str(v) for v in data[f"{column}_vocabulary"]]
+                table.codes[column] = data[f"{column}_codes"]
+        return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the report header field table for an existing index.")
+    parser.add_argument("--metadata", default="data/index/metadata.bin", help="Index metadata path")
+    parser.add_argument("--pages", default="data/index/pages.db", help="Page store path")
+    parser.add_argument("--output", default="data/index/fields.npz", help="Output field table path")
+    args = parser.parse_args()
+    configure()
+
+    page_store = PageStore(args.pages)
+    FieldTable.build(load_metadata(args.metadata), page_store).save(args.output)
+    page_store.close()
+
+
+if __name__ == "__main__":
+    main()
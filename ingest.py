@@ -0,0 +1,649 @@
+import os
+import json
+import queue
+import argparse
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+
+from embedder import BACKENDS, Embedder, LEGACY_SPACE
+from logs import configure, get_logger
+from metrics import BYTES_READ, REGISTRY, stage
+from vector_store import VectorStore
+from manifest import Manifest, file_hash
+from page_store import PageStore
+from lexical_index import LexicalIndex
+from snippets import analyze_page
+from field_table import FieldTable
+from document_index import POOLINGS, DocumentIndex
+from near_duplicates import DuplicateIndex, MinHasher, identifiers
+from snapshots import build_snapshot
+from pdf_processor import (
+    extract_text_from_pdf,
+    save_extracted_json,
+    save_extracted_text,
+)
+
+
+log = get_logger("ingest")
+
+BUILD_PAGES = REGISTRY.counter("build_pages_total", "Pages embedded and indexed by builds.")
+BUILD_DOCUMENTS = REGISTRY.counter("build_documents_total", "Documents indexed or removed by builds.")
+BUILD_DUPLICATES = REGISTRY.counter(
+    "build_duplicate_pages_total", "Pages stored as aliases of a near-duplicate instead of embedded."
+)
+
+# Marks the end of a stream on a pipeline queue
+_DONE = object()
+
+
+def extract_and_save(pdf_path, extracted_folder):
+    """
+    Extract a single PDF and write its .json and .txt output.
+    Runs inside a worker process, so it only takes picklable arguments.
+    """
+    data = extract_text_from_pdf(pdf_path)
+    if data is None:
+        return None
+
+    base_name = os.path.splitext(os.path.basename(pdf_path))[0]
+    save_extracted_json(data, os.path.join(extracted_folder, base_name + ".json"))
+    save_extracted_text(data, os.path.join(extracted_folder, base_name + ".txt"))
+    return data
+
+
+def list_pdfs(dataset_folder):
+    """Return the sorted list of PDF paths inside a folder."""
+    return [
+        os.path.join(dataset_folder, name)
+        for name in sorted(os.listdir(dataset_folder))
+        if name.lower().endswith(".pdf")
+    ]
+
+
+def iter_extracted_pdfs(pdf_paths, extracted_folder, workers=None, max_in_flight=None):
+    """
+    Extract PDFs in a process pool and yield each document as soon as it is ready.
+    At most `max_in_flight` PDFs are queued in the pool at once, so memory stays
+    bounded no matter how many files are in the dataset.
+    """
+    os.makedirs(extracted_folder, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or workers * 2
+
+    pdf_paths = iter(pdf_paths)
+    pending = set()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            while len(pending) < max_in_flight:
+                pdf_path = next(pdf_paths, None)
+                if pdf_path is None:
+                    break
+                pending.add(pool.submit(extract_and_save, pdf_path, extracted_folder))
+
+            if not pending:
+                break
+
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                data = future.result()
+                if data is not None:
+                    yield data
+
+
+def list_extracted_json(extracted_folder):
+    """Return the sorted list of extracted JSON paths inside a folder."""
+    return [
+        os.path.join(extracted_folder, name)
+        for name in sorted(os.listdir(extracted_folder))
+        if name.endswith(".json")
+    ]
+
+
+def iter_extracted_json(json_paths):
+    """Yield the extracted document stored in each JSON file."""
+    for json_path in json_paths:
+        log.debug("Reading extracted JSON", path=json_path)
+        BYTES_READ.inc(os.path.getsize(json_path), source="extracted_json")
+        with open(json_path, "r", encoding="utf-8") as f:
+            yield json.load(f)
+
+
+def _put(q, item, abort):
+    """Put an item on a bounded queue, giving up if the pipeline was aborted."""
+    while not abort.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q, abort):
+    """Get an item from a queue, returning _DONE if the pipeline was aborted."""
+    while not abort.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _DONE
+
+
+def embed_sentences(embedder, texts, analyses):
+    """
+    Embed every sentence of a batch of pages in one call.
+    Returns one (n_sentences, dim) array per page.
+    """
+    sentences = [text[start:end] for text, (bounds, _) in zip(texts, analyses) for start, end in bounds]
+    vectors = embedder.encode_sorted(sentences)
+    offsets = np.cumsum([0] + [len(bounds) for bounds, _ in analyses])
+    return [vectors[offsets[i]:offsets[i + 1]] for i in range(len(texts))]
+
+
+def run_pipeline(documents, embedder, vector_store, batch_size=256, queue_size=8,
+                 on_indexed=None, page_store=None, sentence_embeddings=False, duplicates=None):
+    """
+    Embed and index a stream of extracted documents.
+
+    Three stages run concurrently and are connected by bounded queues:
+    reading/extracting documents, encoding page batches, and adding
+    vectors to the FAISS index. A slow stage applies backpressure to the
+    ones before it instead of letting work pile up in memory.
+
+    Batches are only cut at document boundaries, so every document in a
+    batch is complete once the batch is indexed.
+
+    on_indexed, if given, is called from the indexing stage with the
+    metadata list and assigned vector IDs of every batch added.
+    page_store, if given, receives the text of every indexed page with its
+    snippet data (sentence offsets and token sets), computed in the
+    encoding stage. With sentence_embeddings=True every sentence is
+    embedded too, so snippets can pick sentences by similarity.
+
+    duplicates, if given (a DuplicateIndex, requires page_store), is used
+    to skip near-duplicate pages: a page whose MinHash signature matches a
+    page already indexed (and carrying all of its identifiers) is not
+    embedded but stored as an alias of it. Pages indexed by this run are keyed by (filename, page) until their
+    vector IDs are known; pages of earlier builds by their vector ID.
+
+    Returns the number of pages indexed.
+    """
+    doc_queue = queue.Queue(maxsize=queue_size)
+    vector_queue = queue.Queue(maxsize=queue_size)
+    abort = threading.Event()
+    errors = []
+    indexed = [0]
+    minhasher = MinHasher() if duplicates is not None else None
+    # (filename, page) -> vector ID of the canonical pages of this run
+    canonical_ids = {}
+
+    def produce():
+        try:
+            documents_iter = iter(documents)
+            while True:
+                # Reading/extracting happens inside the source iterator
+                with stage("read", pipeline="build"):
+                    data = next(documents_iter, _DONE)
+                if data is _DONE:
+                    break
+                if not data["pages"]:
+                    continue
+                if not _put(doc_queue, data, abort):
+                    return
+        except Exception as e:
+            errors.append(e)
+            abort.set()
+        finally:
+            _put(doc_queue, _DONE, abort)
+
+    def encode():
+        pages = []
+        metadata = []
+        signatures = []
+        aliases = []
+
+        def flush():
+            embeddings = None
+            if pages:
+                with stage("embed", pipeline="build"):
+                    embeddings = embedder.embed_pages(pages)
+            texts = [page["text"] for page in pages]
+            analyses = sentence_vectors = None
+            if page_store is not None and pages:
+                with stage("analyze", pipeline="build"):
+                    analyses = [analyze_page(text) for text in texts]
+                if sentence_embeddings:
+                    with stage("embed_sentences", pipeline="build"):
+                        sentence_vectors = embed_sentences(embedder, texts, analyses)
+            item = (embeddings, list(metadata), texts, analyses, sentence_vectors, list(signatures), list(aliases))
+            ok = _put(vector_queue, item, abort)
+            pages.clear()
+            metadata.clear()
+            signatures.clear()
+            aliases.clear()
+            return ok
+
+        def is_duplicate(data, page):
+            """Register a page with the duplicate index; True if it duplicates an indexed one."""
+            with stage("dedup", pipeline="build"):
+                signature = minhasher.signature(page["text"])
+                page_identifiers = identifiers(page["text"])
+                canonical = duplicates.find(signature, page_identifiers) if signature is not None else None
+                if canonical is not None:
+                    aliases.append((canonical, data["filename"], page["page"]))
+                    return True
+                if signature is not None:
+                    duplicates.add((data["filename"], page["page"]), signature, page_identifiers)
+                signatures.append(signature)
+                return False
+
+        try:
+            while True:
+                data = _get(doc_queue, abort)
+                if data is _DONE:
+                    break
+                for page in data["pages"]:
+                    if duplicates is not None and is_duplicate(data, page):
+                        continue
+                    pages.append(page)
+                    metadata.append({"filename": data["filename"], "page": page["page"]})
+                if len(pages) >= batch_size and not flush():
+                    return
+            if (pages or aliases) and not abort.is_set():
+                flush()
+        except Exception as e:
+            errors.append(e)
+            abort.set()
+        finally:
+            _put(vector_queue, _DONE, abort)
+
+    def index():
+        try:
+            while True:
+                item = _get(vector_queue, abort)
+                if item is _DONE:
+                    break
+                embeddings, metadata, texts, analyses, sentence_vectors, signatures, aliases = item
+                ids = np.zeros(0, dtype="int64")
+                if metadata:
+                    with stage("index", pipeline="build"):
+                        ids = vector_store.add_embeddings(np.asarray(embeddings), metadata)
+                if page_store is not None:
+                    with stage("page_store", pipeline="build"):
+                        page_store.add_pages(ids, texts, analyses, sentence_vectors)
+                        if duplicates is not None:
+                            canonical_ids.update(zip(((m["filename"], m["page"]) for m in metadata), ids))
+                            page_store.add_signatures(ids, signatures)
+                            page_store.add_aliases(
+                                [(canonical_ids.get(key, key), name, page) for key, name, page in aliases]
+                            )
+                    BUILD_DUPLICATES.inc(len(aliases))
+                if on_indexed is not None:
+                    on_indexed(metadata, ids)
+                indexed[0] += len(metadata)
+                BUILD_PAGES.inc(len(metadata))
+        except Exception as e:
+            errors.append(e)
+            abort.set()
+
+    threads = [
+        threading.Thread(target=produce, name="ingest-read", daemon=True),
+        threading.Thread(target=encode, name="ingest-encode", daemon=True),
+        threading.Thread(target=index, name="ingest-index", daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
+
+    return indexed[0]
+
+
+def load_previous(load, path):
+    """
+    The table or index saved at path by the last build, read with load,
+    or None if there is none (or it cannot be read: it is then rebuilt).
+    """
+    if path is None or not os.path.exists(path):
+        return None
+    try:
+        return load(path)
+    except Exception as e:
+        log.warning("Could not load the previous build's output, rebuilding it", path=path, error=e)
+        return None
+
+
+def update_lexical_index(page_store, lexical_path, rebuild=False):
+    """
+    Bring the BM25 index at lexical_path in line with the page store.
+    Vector IDs only grow, so pages with an ID above the index's last one
+    are added and pages the store no longer holds are dropped; only the
+    added pages are read and tokenized. Without a usable index (or with
+    rebuild=True) it is built from every stored page.
+    """
+    index = None if rebuild else load_previous(LexicalIndex.load, lexical_path)
+    if index is None:
+        index = LexicalIndex.build(page_store.iter_pages())
+    else:
+        removed = index.vector_ids[~np.isin(index.vector_ids, page_store.ids())]
+        last_id = int(index.vector_ids.max()) if len(index) else -1
+        index.update(removed, page_store.iter_pages(after=last_id))
+    index.save(lexical_path)
+    return index
+
+
+def update_index(sources, load_documents, index_path, metadata_path, manifest_path,
+                 pages_path=None, lexical_path=None, fields_path=None, embedder=None, rebuild=False, dim=384,
+                 index_spec=None, train_size=50000, rerank_dtype=None, embedder_options=None,
+                 checkpoint_every=100000, dedup_threshold=0.9, documents_path=None, document_pooling="centroid",
+                 **pipeline_options):
+    """
+    Bring the index in line with the current set of source files.
+
+    sources: {filename: path of the file the document is built from}
+    load_documents: callable taking a list of source paths and yielding
+    extracted documents for them.
+    pages_path: page-text store kept in sync with the index (optional).
+    lexical_path: BM25 index brought in line with the page store after
+    every build that changed something, see update_lexical_index
+    (optional, requires pages_path).
+    fields_path: report header field table used for filtered search,
+    rebuilt after every build that changed something; only the headers
+    of re-indexed documents are parsed again (optional, requires
+    pages_path).
+    index_spec: FAISS index type (see VectorStore); None keeps the type of
+    the existing index, or "Flat" for a new one. Changing it rebuilds.
+    rerank_dtype: "float16" or "float32" keeps exact vectors next to a
+    compressed index for re-ranking (see VectorStore); None keeps what the
+    existing index has. Changing it rebuilds.
+    embedder_options: keyword arguments for the Embedder created when no
+    embedder is passed (e.g. batch_size, workers, backend). An index built
+    with a different model is rebuilt.
+    checkpoint_every: save progress after roughly this many new vectors.
+    dedup_threshold: MinHash similarity above which a page is stored as an
+    alias of an indexed near-duplicate instead of being embedded (requires
+    pages_path; None or 0 embeds every page). Aliases get no lexical or
+    field table entries of their own, so a page is only aliased to one
+    carrying all its identifiers (accident numbers etc.). Documents whose
+    pages were aliases of removed pages are re-indexed.
+    documents_path: per-document vector index for document-level search,
+    rebuilt after every build that changed something, re-pooling only the
+    re-indexed documents (optional; needs a Flat index or rerank_dtype). document_pooling: "centroid" or "max",
+    see DocumentIndex.
+
+    Only documents whose content hash changed since the last build are
+    loaded and re-embedded; vectors of changed or removed documents are
+    deleted from the index. With rebuild=True everything is rebuilt.
+
+    Progress is checkpointed while the build runs: metadata is appended,
+    the index is rewritten atomically and the manifest records finished
+    documents. Re-running a killed build resumes from the last checkpoint.
+
+    Returns (number of documents re-indexed, number of documents removed).
+    """
+    manifest = Manifest() if rebuild else Manifest.load(manifest_path)
+    vector_store = VectorStore(
+        dim=dim, index_spec=index_spec or "Flat", train_size=train_size, rerank_dtype=rerank_dtype
+    )
+
+    # The model is only loaded if something needs embedding
+    owns_embedder = embedder is None
+    if owns_embedder:
+        embedder = Embedder(**{"lazy": True, **(embedder_options or {})})
+    space = getattr(embedder, "space", None)
+
+    if len(manifest) and os.path.exists(index_path) and os.path.exists(metadata_path):
+        vector_store.load(index_path, metadata_path)
+        built_space = vector_store.embedding or LEGACY_SPACE
+        if index_spec is not None and vector_store.index_spec != index_spec:
+            log.info("Index type changed, rebuilding", previous=vector_store.index_spec, index_spec=index_spec)
+            vector_store = VectorStore(
+                dim=dim, index_spec=index_spec, train_size=train_size,
+                rerank_dtype=rerank_dtype or vector_store.rerank_dtype,
+            )
+            manifest = Manifest()
+        elif rerank_dtype is not None and vector_store.rerank_dtype != rerank_dtype:
+            log.info("Re-ranking vectors changed, rebuilding", previous=vector_store.rerank_dtype,
+                     rerank_dtype=rerank_dtype)
+            vector_store = VectorStore(
+                dim=dim, index_spec=vector_store.index_spec, train_size=train_size, rerank_dtype=rerank_dtype
+            )
+            manifest = Manifest()
+        elif space is not None and built_space != space:
+            # Vectors from different models (or backends) do not mix
+            log.info("Embedding changed, rebuilding", previous=built_space, embedding=space)
+            vector_store = VectorStore(
+                dim=dim, index_spec=vector_store.index_spec, train_size=train_size,
+                rerank_dtype=vector_store.rerank_dtype,
+            )
+            manifest = Manifest()
+    else:
+        # Without a manifest we cannot tell which vectors belong to which
+        # document, so start from an empty index
+        manifest = Manifest()
+
+    # A new page store reuses vector IDs, so tables keyed by them are rebuilt
+    fresh = not len(manifest)
+    if fresh:
+        if pages_path is not None and os.path.exists(pages_path):
+            os.remove(pages_path)
+
+    if space is not None:
+        vector_store.embedding = space
+
+    os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+    page_store = PageStore(pages_path) if pages_path is not None else None
+
+    # Vectors added after the last checkpoint of a killed build are not
+    # owned by any document in the manifest; drop them before resuming
+    if len(manifest):
+        ids = vector_store.ids()
+        owned = np.fromiter(manifest.all_ids(), dtype="int64")
+        orphans = ids[~np.isin(ids, owned)]
+        if len(orphans):
+            log.info("Dropping vectors left over by an interrupted build", count=len(orphans))
+            vector_store.remove_ids(orphans)
+            if page_store is not None:
+                page_store.remove_ids(orphans)
+
+    hashes = {name: file_hash(path) for name, path in sources.items()}
+    changed, removed = manifest.diff(hashes)
+
+    if not changed and not removed:
+        log.info("Index is up to date, nothing to do")
+        if page_store is not None:
+            page_store.close()
+        return 0, 0
+
+    log.info("Updating index", changed=len(changed), removed=len(removed))
+
+    stale = [name for name in changed if name in manifest] + removed
+    stale_ids = manifest.ids_for(stale)
+    if page_store is not None:
+        # Pages aliased to a removed page need a new canonical page, so
+        # their documents are re-indexed too (which may remove more pages)
+        while True:
+            pending = set(changed)
+            orphaned = sorted(
+                name for name in page_store.alias_documents(stale_ids)
+                if name in hashes and name not in pending
+            )
+            if not orphaned:
+                break
+            log.info("Re-indexing documents whose duplicate pages lost their original", count=len(orphaned))
+            changed = changed + orphaned
+            stale += [name for name in orphaned if name in manifest]
+            stale_ids = manifest.ids_for(stale)
+        page_store.remove_aliases(changed + removed)
+    vector_store.remove_ids(stale_ids)
+    if page_store is not None:
+        page_store.remove_ids(stale_ids)
+    manifest.drop(removed)
+    for name in changed:
+        manifest.set_document(name)
+
+    def checkpoint():
+        with stage("checkpoint", pipeline="build"):
+            vector_store.save(index_path, metadata_path)
+            if page_store is not None:
+                page_store.commit()
+            manifest.save(manifest_path)
+
+    since_checkpoint = [0]
+
+    def on_indexed(metadata, ids):
+        for meta, vector_id in zip(metadata, ids):
+            manifest.add_ids(meta["filename"], [vector_id])
+        for name in {meta["filename"] for meta in metadata}:
+            manifest.complete(name, hashes.get(name))
+
+        since_checkpoint[0] += len(ids)
+        # Indexes still collecting training data are not checkpointed,
+        # so they are trained on the full sample
+        if since_checkpoint[0] >= checkpoint_every and vector_store.index.is_trained:
+            checkpoint()
+            since_checkpoint[0] = 0
+
+    duplicates = None
+    if dedup_threshold and page_store is not None:
+        # Identifiers of pages from earlier builds are read when a page matches them
+        duplicates = DuplicateIndex(
+            threshold=dedup_threshold, load_identifiers=lambda key: identifiers(page_store.get_text(key) or "")
+        )
+        for vector_id, signature in page_store.iter_signatures():
+            duplicates.add(vector_id, signature)
+
+    if changed:
+        try:
+            run_pipeline(
+                load_documents([sources[name] for name in changed]),
+                embedder,
+                vector_store,
+                on_indexed=on_indexed,
+                page_store=page_store,
+                duplicates=duplicates,
+                **pipeline_options,
+            )
+        finally:
+            if owns_embedder:
+                embedder.close()
+
+    # Documents without any pages never reach the indexing stage
+    for name in changed:
+        manifest.complete(name, hashes[name])
+
+    checkpoint()
+    if page_store is not None:
+        if lexical_path is not None:
+            # From stored page texts, so nothing is re-extracted
+            with stage("lexical", pipeline="build"):
+                update_lexical_index(page_store, lexical_path, rebuild=fresh)
+        if fields_path is not None:
+            with stage("fields", pipeline="build"):
+                previous = None if fresh else load_previous(FieldTable.load, fields_path)
+                FieldTable.build(vector_store.metadata, page_store, previous=previous).save(fields_path)
+        page_store.close()
+    if documents_path is not None:
+        with stage("documents", pipeline="build"):
+            try:
+                previous = None if fresh else load_previous(DocumentIndex.load, documents_path)
+                DocumentIndex.build(vector_store, document_pooling, previous=previous).save(documents_path)
+            except ValueError as e:
+                log.warning("Document index not built", error=e)
+
+    BUILD_DOCUMENTS.inc(len(changed), status="indexed")
+    BUILD_DOCUMENTS.inc(len(removed), status="removed")
+    return len(changed), len(removed)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Extract PDFs from dataset/ and build the FAISS index in one pass."
+    )
+    parser.add_argument("--dataset", default="dataset", help="Folder containing the PDF files")
+    parser.add_argument("--extracted", default="data/extracted", help="Where to write extracted JSON/TXT")
+    parser.add_argument("--index", default="data/index/faiss.index", help="Output FAISS index path")
+    parser.add_argument("--metadata", default="data/index/metadata.bin", help="Output metadata path")
+    parser.add_argument("--manifest", default="data/index/manifest.json", help="Incremental build manifest path")
+    parser.add_argument("--pages", default="data/index/pages.db", help="Page-text store path")
+    parser.add_argument("--lexical", default="data/index/lexical.npz", help="BM25 lexical index path")
+    parser.add_argument("--fields", default="data/index/fields.npz", help="Report header field table path")
+    parser.add_argument("--documents", default="data/index/documents.npz",
+                        help="Per-document vector index path (document-level search)")
+    parser.add_argument("--document-pooling", choices=POOLINGS, default="centroid",
+                        help="How page vectors are pooled into one vector per document")
+    parser.add_argument("--rebuild", action="store_true", help="Ignore the manifest and rebuild from scratch")
+    parser.add_argument("--index-spec", default=None, help="FAISS index type, e.g. Flat, IVF1024,Flat, HNSW32, SQ8")
+    parser.add_argument("--train-size", type=int, default=50000, help="Vectors sampled to train IVF/PQ indexes")
+    parser.add_argument("--rerank-dtype", choices=["float16", "float32"], default=None,
+                        help="Keep exact vectors on disk and re-rank candidates of a compressed index (SQ8, PQ48)")
+    parser.add_argument("--workers", type=int, default=None, help="Extraction processes (default: all cores)")
+    parser.add_argument("--batch-size", type=int, default=256, help="Pages per embedding batch")
+    parser.add_argument("--encode-batch-size", type=int, default=32, help="Pages per model forward pass")
+    parser.add_argument("--encode-workers", type=int, default=1, help="Encoding processes")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="Embedding model name or local directory")
+    parser.add_argument("--backend", default="torch", choices=BACKENDS, help="Embedding backend")
+    parser.add_argument("--local-files-only", action="store_true", help="Load the model from disk, no network")
+    parser.add_argument("--queue-size", type=int, default=8, help="Capacity of each pipeline queue")
+    parser.add_argument("--checkpoint-every", type=int, default=100000, help="Save progress every N vectors")
+    parser.add_argument("--sentence-embeddings", action="store_true",
+                        help="Also embed every sentence, so snippets pick sentences by similarity")
+    parser.add_argument("--dedup-threshold", type=float, default=0.9,
+                        help="Store pages at least this similar (MinHash) to an indexed page with the same "
+                             "identifiers as aliases; 0 disables")
+    parser.add_argument("--keep-snapshots", type=int, default=2,
+                        help="Index snapshots kept, the new one included (the others allow rollback)")
+    parser.add_argument("--metrics-file", help="Write build metrics here in the Prometheus text format")
+    args = parser.parse_args()
+    configure()
+
+    pdf_paths = list_pdfs(args.dataset)
+    log.info("Ingesting PDFs", count=len(pdf_paths), dataset=args.dataset)
+
+    sources = {os.path.basename(path): path for path in pdf_paths}
+    files = {
+        "index_path": args.index,
+        "metadata_path": args.metadata,
+        "manifest_path": args.manifest,
+        "pages_path": args.pages,
+        "lexical_path": args.lexical,
+        "fields_path": args.fields,
+        "documents_path": args.documents,
+    }
+    # Written into a new snapshot next to the index, published when done
+    updated, removed = build_snapshot(os.path.dirname(args.index) or ".", lambda snapshot_paths: update_index(
+        sources,
+        lambda paths: iter_extracted_pdfs(paths, args.extracted, workers=args.workers),
+        **snapshot_paths,
+        document_pooling=args.document_pooling,
+        rebuild=args.rebuild,
+        index_spec=args.index_spec,
+        rerank_dtype=args.rerank_dtype,
+        train_size=args.train_size,
+        embedder_options={
+            "model_name": args.model,
+            "backend": args.backend,
+            "local_files_only": args.local_files_only,
+            "batch_size": args.encode_batch_size,
+            "workers": args.encode_workers,
+        },
+        checkpoint_every=args.checkpoint_every,
+        sentence_embeddings=args.sentence_embeddings,
+        dedup_threshold=args.dedup_threshold,
+        batch_size=args.batch_size,
+        queue_size=args.queue_size,
+    ), keep=args.keep_snapshots, template=files)
+
+    log.info("Ingest finished", indexed=updated, removed=removed)
+    if args.metrics_file:
+        REGISTRY.write(args.metrics_file)
+
+
+if __name__ == "__main__":
+    main()
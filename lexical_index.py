@@ -0,0 +1,244 @@
+import os
+import re
+import argparse
+
+import numpy as np
+
+from logs import configure, get_logger
+
+log = get_logger("lexical_index")
+
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Accident numbers (NYC08CA055), registrations (N5921D), models (PA-22-150)
+IDENTIFIER_PATTERN = re.compile(r"^(?=.*\d)(?=.*[a-z])[a-z0-9-]{4,}$", re.IGNORECASE)
+
+
+def tokenize(text):
+    """Lowercase a text and split it into alphanumeric tokens."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def is_identifier_query(query):
+    """True when every word of the query looks like an identifier."""
+    words = query.split()
+    return bool(words) and all(IDENTIFIER_PATTERN.match(w) for w in words)
+
+
+def invert(pages):
+    """
+    Postings of an iterable of (vector_id, text) pairs, in the layout of
+    LexicalIndex: (sorted terms, offsets, doc_pos, tfs, doc_lengths,
+    vector_ids), with page positions in iteration order.
+    """
+    postings = {}
+    vector_ids = []
+    doc_lengths = []
+
+    for pos, (vector_id, text) in enumerate(pages):
+        tokens = tokenize(text)
+        vector_ids.append(vector_id)
+        doc_lengths.append(len(tokens))
+
+        counts = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for token, tf in counts.items():
+            postings.setdefault(token, []).append((pos, min(tf, 65535)))
+
+    terms = sorted(postings)
+    lengths = np.array([len(postings[t]) for t in terms], dtype="int64")
+    offsets = np.concatenate([[0], np.cumsum(lengths)]).astype("int64")
+
+    flat = [entry for term in terms for entry in postings[term]]
+    return (
+        terms,
+        offsets,
+        np.array([pos for pos, _ in flat], dtype="uint32"),
+        np.array([tf for _, tf in flat], dtype="uint16"),
+        np.array(doc_lengths, dtype="uint32"),
+        np.array(vector_ids, dtype="int64"),
+    )
+
+
+class LexicalIndex:
+    """
+    BM25 inverted index over page texts, keyed by vector ID.
+
+    Postings are stored in flat numpy arrays: for term t, the pages
+    containing it are doc_pos[offsets[t]:offsets[t + 1]] with matching
+    term frequencies in tfs. Page positions map back to vector IDs
+    through vector_ids.
+    """
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.terms = {}
+        self.offsets = np.zeros(1, dtype="int64")
+        self.doc_pos = np.zeros(0, dtype="uint32")
+        self.tfs = np.zeros(0, dtype="uint16")
+        self.doc_lengths = np.zeros(0, dtype="uint32")
+        self.vector_ids = np.zeros(0, dtype="int64")
+
+    def __len__(self):
+        return len(self.vector_ids)
+
+    @classmethod
+    def build(cls, pages, **params):
+        """
+        Build the index from an iterable of (vector_id, text) pairs.
+        """
+        index = cls(**params)
+        terms, index.offsets, index.doc_pos, index.tfs, index.doc_lengths, index.vector_ids = invert(pages)
+        index.terms = {term: i for i, term in enumerate(terms)}
+
+        log.info("Lexical index built", pages=len(index), terms=len(terms))
+        return index
+
+    def update(self, remove_ids, pages):
+        """
+        Drop the pages of the vector IDs remove_ids and add new
+        (vector_id, text) pairs. Only the new pages are tokenized: the
+        postings of the pages that stay are filtered and merged with the
+        new ones as arrays, so the cost is one pass over the postings
+        instead of reading and tokenizing every stored page again.
+        """
+        keep = ~np.isin(self.vector_ids, np.asarray(remove_ids, dtype="int64"))
+        # Position of every kept page once the removed ones are gone
+        positions = (np.cumsum(keep) - 1).astype("uint32")
+        old_terms = sorted(self.terms, key=self.terms.get)
+        entry_terms = np.repeat(np.arange(len(old_terms), dtype="int64"), np.diff(self.offsets))
+        kept = keep[self.doc_pos]
+        entry_terms = entry_terms[kept]
+        live = np.bincount(entry_terms, minlength=len(old_terms)) > 0
+
+        terms, offsets, doc_pos, tfs, doc_lengths, vector_ids = invert(pages)
+        # Terms only found in removed pages are dropped
+        vocabulary = sorted({term for term, used in zip(old_terms, live) if used} | set(terms))
+        numbers = {term: i for i, term in enumerate(vocabulary)}
+        old_numbers = np.array([numbers.get(term, -1) for term in old_terms], dtype="int64")
+        new_numbers = np.array([numbers[term] for term in terms], dtype="int64")
+
+        all_terms = np.concatenate([
+            old_numbers[entry_terms], np.repeat(new_numbers, np.diff(offsets)),
+        ])
+        all_pos = np.concatenate([positions[self.doc_pos[kept]], doc_pos + np.uint32(keep.sum())])
+        all_tfs = np.concatenate([self.tfs[kept], tfs])
+        order = np.lexsort((all_pos, all_terms))
+
+        self.terms = numbers
+        self.offsets = np.concatenate(
+            [[0], np.cumsum(np.bincount(all_terms, minlength=len(vocabulary)))]
+        ).astype("int64")
+        self.doc_pos = all_pos[order].astype("uint32")
+        self.tfs = all_tfs[order].astype("uint16")
+        self.doc_lengths = np.concatenate([self.doc_lengths[keep], doc_lengths]).astype("uint32")
+        self.vector_ids = np.concatenate([self.vector_ids[keep], vector_ids]).astype("int64")
+
+        log.info("Lexical index updated", removed=int((~keep).sum()), added=len(vector_ids),
+                 pages=len(self), terms=len(vocabulary))
+        return self
+
+    def search(self, query, k=5, id_mask=None):
+        """
+        Rank pages by BM25 score for the query.
+        id_mask: optional boolean array over vector IDs restricting the pages.
+        Returns a list of (vector_id, score), best first.
+        """
+        if not len(self.vector_ids):
+            return []
+
+        scores = np.zeros(len(self.vector_ids), dtype="float32")
+        avg_length = max(float(self.doc_lengths.mean()), 1.0)
+        n_docs = len(self.vector_ids)
+
+        for token in set(tokenize(query)):
+            term = self.terms.get(token)
+            if term is None:
+                continue
+            start, end = self.offsets[term], self.offsets[term + 1]
+            pos = self.doc_pos[start:end]
+            tf = self.tfs[start:end].astype("float32")
+
+            idf = np.log(1.0 + (n_docs - len(pos) + 0.5) / (len(pos) + 0.5))
+            norm = self.k1 * (1.0 - self.b + self.b * self.doc_lengths[pos] / avg_length)
+            scores[pos] += idf * tf * (self.k1 + 1.0) / (tf + norm)
+
+        if id_mask is not None:
+            id_mask = np.asarray(id_mask, dtype=bool)
+            in_range = self.vector_ids < len(id_mask)
+            allowed = np.zeros(len(self.vector_ids), dtype=bool)
+            allowed[in_range] = id_mask[self.vector_ids[in_range]]
+            scores[~allowed] = 0.0
+
+        matched = np.flatnonzero(scores)
+        if not len(matched):
+            return []
+
+        top = matched[np.argsort(-scores[matched], kind="stable")[:k]]
+        return [(int(self.vector_ids[pos]), float(scores[pos])) for pos in top]
+
+    def save(self, path):
+        """Save the index as a compressed .npz file, replacing it atomically."""
+        terms = np.array(sorted(self.terms, key=self.terms.get))
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(
+                f,
+                terms=terms,
+                offsets=self.offsets,
+                doc_pos=self.doc_pos,
+                tfs=self.tfs,
+                doc_lengths=self.doc_lengths,
+                vector_ids=self.vector_ids,
+                params=np.array([self.k1, self.b]),
+            )
+        os.replace(tmp_path, path)
+        log.info("Lexical index saved", path=path)
+
+    @classmethod
+    def load(cls, path):
+        """Load an index written by save."""
+        with np.load(path) as data:
+            k1, b = data["params"]
+            index = cls(k1=float(k1), b=float(b))
+            index.terms = {str(term): i for i, term in enumerate(data["terms"])}
+            index.offsets = data["offsets"]
+            index.doc_pos = data["doc_pos"]
+            index.tfs = data["tfs"]
+            index.doc_lengths = data["doc_lengths"]
+            index.vector_ids = data["vector_ids"]
+        return index
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """
+    Fuse several rankings of vector IDs into one.
+    Returns a list of (vector_id, fused score), best first.
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, vector_id in enumerate(ranking):
+            scores[vector_id] = scores.get(vector_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the BM25 lexical index from the page store.")
+    parser.add_argument("--pages", default="data/index/pages.db", help="Page store path")
+    parser.add_argument("--output", default="data/index/lexical.npz", help="Output lexical index path")
+    args = parser.parse_args()
+    configure()
+
+    # Imported here: the page store itself uses this module's tokenizer
+    from page_store import PageStore
+
+    page_store = PageStore(args.pages)
+    LexicalIndex.build(page_store.iter_pages()).save(args.output)
+    page_store.close()
+
+
+if __name__ == "__main__":
+    main()
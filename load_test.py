@@ -0,0 +1,127 @@
+import json
+import time
+import random
+import asyncio
+import argparse
+
+import numpy as np
+
+
+DEFAULT_QUERIES = [
+    "engine failure on takeoff",
+    "carburetor icing",
+    "loss of control in crosswind landing",
+    "fuel exhaustion",
+    "student pilot hard landing",
+    "bird strike",
+    "spatial disorientation at night",
+    "NYC08CA055",
+]
+
+
+async def post_json(reader, writer, host, path, payload):
+    """Send one POST over a keep-alive connection; returns (status, body)."""
+    body = json.dumps(payload).encode("utf-8")
+    writer.write(
+        (
+            f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n"
+        ).encode("latin-1") + body
+    )
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+async def client(host, port, queries, n_requests, options, latencies, statuses):
+    """One connection sending n_requests queries back to back."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(n_requests):
+            payload = dict(options, query=random.choice(queries))
+            start = time.perf_counter()
+            try:
+                status, _ = await post_json(reader, writer, host, "/search", payload)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                statuses["connection_error"] = statuses.get("connection_error", 0) + 1
+                break
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, queries, concurrency, total_requests, options):
+    """
+    Run total_requests searches from `concurrency` concurrent connections.
+    Returns a summary with latency percentiles (ms), throughput and status counts.
+    """
+    latencies = []
+    statuses = {}
+    per_client = [total_requests // concurrency + (i < total_requests % concurrency) for i in range(concurrency)]
+
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        client(host, port, queries, n, options, latencies, statuses) for n in per_client if n
+    ))
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array(latencies) if latencies else np.zeros(1)
+    return {
+        "concurrency": concurrency,
+        "requests": int(sum(statuses.values())),
+        "throughput_rps": sum(statuses.values()) / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "max_ms": float(latencies.max()),
+        "statuses": {str(status): count for status, count in statuses.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure search_service.py latency under concurrent load.")
+    parser.add_argument("--host", default="127.0.0.1", help="Service host")
+    parser.add_argument("--port", type=int, default=8000, help="Service port")
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8, 32],
+                        help="Concurrent connections; one run per value")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per run")
+    parser.add_argument("--queries", help="File with one query per line (default: built-in sample)")
+    parser.add_argument("--k", type=int, default=5, help="Results per query")
+    parser.add_argument("--mode", default="semantic", help="Search mode")
+    parser.add_argument("--output", help="Write the results as JSON to this path")
+    args = parser.parse_args()
+
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        with open(args.queries, "r", encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    rows = []
+    for concurrency in args.concurrency:
+        row = asyncio.run(run_load(
+            args.host, args.port, queries, concurrency, args.requests, {"k": args.k, "mode": args.mode}
+        ))
+        rows.append(row)
+        print(
+            f"concurrency {concurrency:>4}: {row['throughput_rps']:8.1f} req/s  "
+            f"p50 {row['p50_ms']:7.2f} ms  p99 {row['p99_ms']:7.2f} ms  statuses {row['statuses']}"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=4)
+        print(f"[INFO] Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import os
+import sys
+import json
+import time
+import logging
+
+
+ROOT_LOGGER = "pdf_search"
+
+LOG_FORMATS = ("text", "json")
+
+# Attributes every LogRecord has; anything else was passed as a field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def _fields(record):
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES}
+
+
+def _format_value(value):
+    text = str(value)
+    if not text or any(c in text for c in ' "='):
+        return json.dumps(text)
+    return text
+
+
+class TextFormatter(logging.Formatter):
+    """time LEVEL logger: message key=value ... (logfmt-style fields)."""
+
+    def format(self, record):
+        timestamp = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created))
+        line = f"{timestamp} {record.levelname:<7} {record.name}: {record.getMessage()}"
+        fields = _fields(record)
+        if fields:
+            line += " " + " ".join(f"{key}={_format_value(value)}" for key, value in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, fields at the top level."""
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(_fields(record))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class StructuredLogger(logging.LoggerAdapter):
+    """
+    Logger taking structured fields as keyword arguments:
+    log.info("Index saved", path=index_path, vectors=12).
+    """
+
+    _KEYWORDS = ("exc_info", "stack_info", "stacklevel", "extra")
+
+    def process(self, msg, kwargs):
+        fields = {}
+        for key in [key for key in kwargs if key not in self._KEYWORDS]:
+            # LogRecord attribute names (e.g. filename) cannot be fields
+            fields[key + "_" if key in _RECORD_ATTRIBUTES else key] = kwargs.pop(key)
+        if fields:
+            kwargs["extra"] = dict(kwargs.get("extra") or {}, **fields)
+        return msg, kwargs
+
+
+def configure(level=None, fmt=None, stream=None):
+    """
+    Set up the package logger: one handler on stderr (stdout stays free for
+    results). level / fmt default to the PDF_SEARCH_LOG_LEVEL (INFO) and
+    PDF_SEARCH_LOG_FORMAT ("text" or "json") environment variables.
+    Calling it again replaces the previous setup.
+
+    Only entry points (the main() of each script, the Streamlit app) call
+    it; applications importing the modules route the "pdf_search" logger
+    with their own logging setup.
+    """
+    level = level or os.environ.get("PDF_SEARCH_LOG_LEVEL", "INFO")
+    fmt = fmt or os.environ.get("PDF_SEARCH_LOG_FORMAT", "text")
+    if fmt not in LOG_FORMATS:
+        raise ValueError(f"[ERROR] Unknown log format '{fmt}', expected one of {LOG_FORMATS}.")
+
+    logger = logging.getLogger(ROOT_LOGGER)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+    logger.addHandler(handler)
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    logger.propagate = False
+    return logger
+
+
+def get_logger(name):
+    """Structured logger for a module, under the package logger."""
+    return StructuredLogger(logging.getLogger(f"{ROOT_LOGGER}.{name}"), {})
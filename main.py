@@ -1,8 +1,13 @@
 import os
+import sys
 import json
+import argparse
 from datetime import datetime
+from logs import configure, get_logger
 from search_engine import SearchEngine
 
+log = get_logger("main")
+
 
 def save_results_to_json(query, results, output_dir="data/results"):
     """
@@ -18,6 +23,7 @@ def save_results_to_json(query, results, output_dir="data/results"):
                 "score": res["distance"],
                 "filename": res["metadata"]["filename"],
                 "page": res["metadata"]["page"],
+                "also_in": res["also_in"],
             }
             for res in results
         ],
@@ -33,12 +39,95 @@ def save_results_to_json(query, results, output_dir="data/results"):
     print(f"\n[INFO] Results saved to: {output_path}\n")
 
 
-def main():
+def iter_query_batches(lines, batch_size):
+    """Group non-empty query lines into lists of at most batch_size queries."""
+    batch = []
+    for line in lines:
+        query = line.strip()
+        if not query:
+            continue
+        batch.append(query)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def document_to_json(document):
+    """One report of a document-level search, with its best pages."""
+    return {
+        "score": document["distance"],
+        "filename": document["filename"],
+        "pages": [
+            {"page": res["metadata"]["page"], "score": res["distance"], "snippet": res["snippet"]}
+            for res in document["pages"]
+        ],
+    }
+
+
+def run_batch(query_file, k=5, threshold=1.2, batch_size=64, output=None, mode="semantic",
+              filters=None, shards_path=None, by_document=False):
+    """
+    Non-interactive mode: read one query per line from a file (or stdin
+    when query_file is "-") and stream one JSON line of results per query.
+    by_document=True writes one result per report ("documents") instead
+    of one per page, see SearchEngine.search_documents.
+    """
+    output = output or sys.stdout
+
+    # Engine diagnostics are logged to stderr, off the JSONL stream
+    engine = SearchEngine(shards_path=shards_path)
+
+    source = sys.stdin if query_file == "-" else open(query_file, "r", encoding="utf-8")
+
+    try:
+        for queries in iter_query_batches(source, batch_size):
+            if by_document:
+                for query in queries:
+                    documents = engine.search_documents(query, k=k, threshold=threshold, filters=filters)
+                    record = {"query": query, "documents": [document_to_json(d) for d in documents]}
+                    output.write(json.dumps(record) + "\n")
+                output.flush()
+                continue
+
+            batch_results = engine.search_batch(
+                queries, k=k, threshold=threshold, mode=mode, filters=filters
+            )
+
+            for query, results in zip(queries, batch_results):
+                record = {
+                    "query": query,
+                    "results": [
+                        {
+                            "score": res["distance"],
+                            "filename": res["metadata"]["filename"],
+                            "page": res["metadata"]["page"],
+                            "snippet": res["snippet"],
+                            "also_in": res["also_in"],
+                        }
+                        for res in results
+                    ],
+                }
+                output.write(json.dumps(record) + "\n")
+            output.flush()
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+    for name, stats in engine.cache_stats().items():
+        log.info(
+            "Cache hit ratio", cache=name, hit_rate=round(stats["hit_rate"], 3),
+            **{key: value for key, value in stats.items() if key != "hit_rate"},
+        )
+
+
+def interactive(mode="semantic", filters=None, shards_path=None, by_document=False):
     print("\n===============================")
     print("   AI PDF Semantic Search")
     print("===============================\n")
 
-    engine = SearchEngine()
+    engine = SearchEngine(shards_path=shards_path)
 
     while True:
         query = input("\nEnter your question (or type 'exit' to quit):\n>> ")
@@ -51,7 +140,20 @@ def main():
             print("[WARN] Empty query, please type something.")
             continue
 
-        results = engine.search(query, k=5)
+        if by_document:
+            documents = engine.search_documents(query, k=5, filters=filters)
+            print("\n=== TOP REPORTS ===\n")
+            if not documents:
+                print("No results found.")
+            for document in documents:
+                print(f"File: {document['filename']}")
+                print(f"Score: {document['distance']:.4f}")
+                for res in document["pages"]:
+                    print(f"  Page {res['metadata']['page']} ({res['distance']:.4f}): {res['snippet']}")
+                print("-----------------------------")
+            continue
+
+        results = engine.search(query, k=5, mode=mode, filters=filters)
 
         print("\n=== TOP RESULTS ===\n")
 
@@ -62,9 +164,15 @@ def main():
         for res in results:
             print(f"File: {res['metadata']['filename']}")
             print(f"Page: {res['metadata']['page']}")
-            print(f"Score: {res['distance']:.4f}")
+            if res["distance"] is not None:
+                print(f"Score: {res['distance']:.4f}")
+            else:
+                # Lexical-only hits have no embedding distance
+                print(f"Lexical score: {res['score']:.4f}")
 
             print(f"Snippet: {res['snippet']}")
+            if res["also_in"]:
+                print("Also appears in: " + ", ".join(f"{a['filename']} p.{a['page']}" for a in res["also_in"]))
             print("-----------------------------")
 
 
@@ -74,5 +182,46 @@ def main():
             save_results_to_json(query, results)
 
 
+def main():
+    parser = argparse.ArgumentParser(description="AI PDF Semantic Search CLI")
+    parser.add_argument(
+        "--queries",
+        help="Run non-interactively: file with one query per line ('-' for stdin). "
+             "Results are written to stdout as JSON Lines.",
+    )
+    parser.add_argument("--k", type=int, default=5, help="Number of results per query")
+    parser.add_argument("--threshold", type=float, default=1.2, help="Relevance threshold")
+    parser.add_argument("--batch-size", type=int, default=64, help="Queries encoded per model call")
+    parser.add_argument(
+        "--mode",
+        choices=["semantic", "lexical", "hybrid"],
+        default="semantic",
+        help="Retrieval mode: embeddings only, BM25 only, or both fused",
+    )
+    parser.add_argument("--date-from", help="Only reports on or after this date (YYYY-MM-DD)")
+    parser.add_argument("--date-to", help="Only reports on or before this date (YYYY-MM-DD)")
+    parser.add_argument("--state", help="Only reports from this state or country, e.g. FL")
+    parser.add_argument("--make", help="Only reports whose aircraft matches this make/model")
+    parser.add_argument("--part", dest="operation_part", help="Only flights under this part, e.g. 91")
+    parser.add_argument("--shards", help="Search the sharded index described by this shard manifest")
+    parser.add_argument("--by-document", action="store_true",
+                        help="One result per report with its best pages (semantic, two-stage)")
+    args = parser.parse_args()
+    configure()
+
+    filters = {
+        key: getattr(args, key)
+        for key in ("date_from", "date_to", "state", "make", "operation_part")
+        if getattr(args, key)
+    }
+
+    if args.queries:
+        run_batch(args.queries, k=args.k, threshold=args.threshold,
+                  batch_size=args.batch_size, mode=args.mode, filters=filters, shards_path=args.shards,
+                  by_document=args.by_document)
+    else:
+        interactive(mode=args.mode, filters=filters, shards_path=args.shards, by_document=args.by_document)
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,96 @@
+import os
+import json
+import hashlib
+
+from logs import get_logger
+
+log = get_logger("manifest")
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """Return the SHA-256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """
+    Records, for every indexed document, the hash of the source file it was
+    built from and the vector IDs it owns in the FAISS index.
+    Used to decide which documents need re-embedding on the next build.
+    """
+
+    def __init__(self):
+        self.documents = {}  # {filename: {"hash": str, "ids": [int, ...]}}
+
+    def __contains__(self, filename):
+        return filename in self.documents
+
+    def __len__(self):
+        return len(self.documents)
+
+    def diff(self, hashes):
+        """
+        Compare the manifest against the current source hashes.
+        hashes: {filename: content hash}
+        Returns (changed, removed): documents that are new or whose content
+        changed, and documents that no longer exist.
+        """
+        changed = [
+            name for name, digest in hashes.items()
+            if self.documents.get(name, {}).get("hash") != digest
+        ]
+        removed = [name for name in self.documents if name not in hashes]
+        return changed, removed
+
+    def ids_for(self, filenames):
+        """Return all vector IDs owned by the given documents."""
+        ids = []
+        for name in filenames:
+            ids.extend(self.documents.get(name, {}).get("ids", []))
+        return ids
+
+    def set_document(self, filename, digest=None):
+        """
+        Start (or restart) tracking a document with no vectors yet.
+        A document without a hash is incomplete and is rebuilt next time.
+        """
+        self.documents[filename] = {"hash": digest, "ids": []}
+
+    def complete(self, filename, digest):
+        """Mark a document as fully indexed from content with this hash."""
+        self.documents.setdefault(filename, {"hash": None, "ids": []})["hash"] = digest
+
+    def all_ids(self):
+        """Return the set of vector IDs owned by any document."""
+        return {i for entry in self.documents.values() for i in entry["ids"]}
+
+    def add_ids(self, filename, ids):
+        """Record vector IDs owned by a document."""
+        entry = self.documents.setdefault(filename, {"hash": None, "ids": []})
+        entry["ids"].extend(int(i) for i in ids)
+
+    def drop(self, filenames):
+        """Stop tracking the given documents."""
+        for name in filenames:
+            self.documents.pop(name, None)
+
+    def save(self, path):
+        """Write the manifest atomically so a crash never leaves it half-written."""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "documents": self.documents}, f)
+        os.replace(tmp_path, path)
+        log.info("Manifest saved", path=path, documents=len(self.documents))
+
+    @classmethod
+    def load(cls, path):
+        """Load a manifest from disk, or return an empty one if it does not exist."""
+        manifest = cls()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                manifest.documents = json.load(f)["documents"]
+        return manifest
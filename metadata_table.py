@@ -0,0 +1,229 @@
+import os
+import json
+import argparse
+
+import numpy as np
+
+from logs import configure, get_logger
+
+log = get_logger("metadata_table")
+
+MAGIC = b"PDFMETA1"
+
+# One fixed-size record per vector: document ID (-1 once removed) and page
+RECORD = np.dtype([("doc", "<i4"), ("page", "<i4")])
+
+
+class MetadataTable:
+    """
+    Compact per-vector metadata.
+
+    Filenames are interned into a document table and every vector only
+    stores an int32 document ID and page number, so millions of pages cost
+    8 bytes each instead of a Python dict. Indexing the table by vector ID
+    builds the {"filename", "page"} dict on demand (None for removed
+    vectors), which keeps it a drop-in replacement for the old list.
+    """
+
+    def __init__(self):
+        self.filenames = []
+        self._doc_lookup = {}
+        self.records = np.zeros(0, dtype=RECORD)
+        self._size = 0
+
+    @classmethod
+    def from_records(cls, metadata):
+        """Build a table from a list of {"filename", "page"} dicts (or None)."""
+        table = cls()
+        table.extend(metadata)
+        return table
+
+    @property
+    def doc_ids(self):
+        return self.records["doc"][:self._size]
+
+    @property
+    def pages(self):
+        return self.records["page"][:self._size]
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, vector_id):
+        if vector_id < 0 or vector_id >= self._size:
+            raise IndexError(vector_id)
+        doc, page = self.records[vector_id]
+        if doc < 0:
+            return None
+        return {"filename": self.filenames[doc], "page": int(page)}
+
+    def __iter__(self):
+        for vector_id in range(self._size):
+            yield self[vector_id]
+
+    def _doc_id(self, filename):
+        """Intern a filename and return its document ID."""
+        doc = self._doc_lookup.get(filename)
+        if doc is None:
+            doc = self._doc_lookup[filename] = len(self.filenames)
+            self.filenames.append(filename)
+        return doc
+
+    def _reserve(self, size):
+        """Grow the record array (geometrically) and make it writable."""
+        if size <= len(self.records) and self.records.flags.writeable:
+            return
+        capacity = max(size, 2 * len(self.records), 1024)
+        records = np.zeros(capacity, dtype=RECORD)
+        records[:self._size] = self.records[:self._size]
+        self.records = records
+
+    def extend(self, metadata_list):
+        """Append metadata dicts (or None for removed vectors)."""
+        metadata_list = list(metadata_list)
+        self._reserve(self._size + len(metadata_list))
+        for offset, meta in enumerate(metadata_list):
+            if meta is None:
+                self.records[self._size + offset] = (-1, 0)
+            else:
+                self.records[self._size + offset] = (self._doc_id(meta["filename"]), meta["page"])
+        self._size += len(metadata_list)
+
+    def remove(self, vector_id):
+        """Mark a vector's metadata as removed."""
+        if 0 <= vector_id < self._size:
+            self._reserve(self._size)
+            self.records["doc"][vector_id] = -1
+
+    def __setitem__(self, vector_id, meta):
+        if meta is not None:
+            raise ValueError("[ERROR] Metadata entries can only be cleared, not replaced.")
+        self.remove(vector_id)
+
+    def save(self, path, start=0):
+        """
+        Write the table in the binary format.
+        With start > 0 only records from that vector ID on are appended to
+        an existing file. A file hard-linked into another index snapshot
+        (see snapshots.seed) that holds records past start, which belong
+        to that snapshot, is rewritten instead.
+
+        Layout: `path` holds the magic header followed by fixed-size
+        records; `path + ".names"` holds one filename per line, in
+        document ID order.
+        """
+        names_path = path + ".names"
+
+        # The filename table is small (one line per document): always
+        # rewritten, and before the records so each record has its filename
+        tmp_names = names_path + ".tmp"
+        with open(tmp_names, "w", encoding="utf-8") as f:
+            f.writelines(name + "\n" for name in self.filenames)
+        os.replace(tmp_names, names_path)
+
+        end = len(MAGIC) + start * RECORD.itemsize
+        if start == 0 or not os.path.exists(path) or is_shared_past(path, end):
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(MAGIC)
+                f.write(self.records[:self._size].tobytes())
+            os.replace(tmp_path, path)
+            return
+
+        with open(path, "r+b") as f:
+            # Drop a partial record left by a killed build before appending
+            f.truncate(end)
+            f.seek(0, os.SEEK_END)
+            f.write(self.records[start:self._size].tobytes())
+
+    @classmethod
+    def load(cls, path, mmap=False, size=None):
+        """
+        Load a table written by save. With mmap=True the records are
+        memory-mapped read-only and only copied if the table is modified.
+        A partial trailing record left by a killed build is ignored, and
+        so are records past size (appended by a later index snapshot).
+        """
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"[ERROR] {path} is not a binary metadata file.")
+
+        stored = (os.path.getsize(path) - len(MAGIC)) // RECORD.itemsize
+        size = stored if size is None else min(size, stored)
+
+        table = cls()
+        with open(path + ".names", "r", encoding="utf-8") as f:
+            table.filenames = f.read().splitlines()
+        table._doc_lookup = {name: doc for doc, name in enumerate(table.filenames)}
+
+        if size == 0:
+            return table
+        if mmap:
+            table.records = np.memmap(path, dtype=RECORD, mode="r", offset=len(MAGIC), shape=(size,))
+        else:
+            table.records = np.fromfile(path, dtype=RECORD, count=size, offset=len(MAGIC))
+        table._size = size
+        return table
+
+
+def is_shared_past(path, end):
+    """
+    True when a file is hard-linked elsewhere and holds bytes past end:
+    appending at end would overwrite what another snapshot appended.
+    """
+    stat = os.stat(path)
+    return stat.st_nlink > 1 and stat.st_size > end
+
+
+def is_binary_metadata(path):
+    """True for metadata paths that use the binary format."""
+    return path.endswith(".bin")
+
+
+def load_json_metadata(metadata_path):
+    """
+    Read metadata stored as JSON Lines (one entry per vector, null for
+    removed vectors) or as the single JSON array written by older versions.
+    A truncated last line left by a killed build is ignored.
+    """
+    with open(metadata_path, "r", encoding="utf-8") as f:
+        content = f.read()
+
+    if content.lstrip().startswith("["):
+        return json.loads(content)
+
+    metadata = []
+    lines = content.split("\n")
+    for i, line in enumerate(lines):
+        if not line:
+            continue
+        try:
+            metadata.append(json.loads(line))
+        except json.JSONDecodeError:
+            if i == len(lines) - 1:
+                log.warning("Ignoring truncated last line", path=metadata_path)
+                break
+            raise
+    return metadata
+
+
+def migrate(json_path, binary_path):
+    """Convert metadata.json (JSON array or JSON Lines) to the binary format."""
+    table = MetadataTable.from_records(load_json_metadata(json_path))
+    table.save(binary_path)
+    log.info("Migrated metadata", entries=len(table), source=json_path, target=binary_path)
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert JSON index metadata to the compact binary format.")
+    parser.add_argument("source", nargs="?", default="data/index/metadata.json", help="Existing JSON metadata")
+    parser.add_argument("target", nargs="?", default="data/index/metadata.bin", help="Binary metadata to write")
+    args = parser.parse_args()
+    configure()
+
+    migrate(args.source, args.target)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import zlib
+
+import numpy as np
+
+from lexical_index import IDENTIFIER_PATTERN, tokenize
+
+# Mersenne prime 2^31 - 1 for the universal hash family: a * x + b
+# stays below 2^63 for a, b, x < 2^31, so uint64 arithmetic never overflows
+PRIME = (1 << 31) - 1
+
+
+def shingles(text, size=5):
+    """
+    Hashes of the overlapping size-word shingles of a text. Pages shorter
+    than one shingle are a single shingle; empty pages have none.
+    """
+    tokens = tokenize(text)
+    if not tokens:
+        return np.zeros(0, dtype="uint64")
+    if len(tokens) <= size:
+        grams = [" ".join(tokens)]
+    else:
+        grams = [" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)]
+    return np.unique(np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype="uint64", count=len(grams)))
+
+
+class MinHasher:
+    """
+    MinHash signatures: for each of num_perm random hash functions, the
+    smallest hash of any shingle. The fraction of equal components of two
+    signatures estimates the Jaccard similarity of their shingle sets.
+    """
+
+    def __init__(self, num_perm=64, shingle_size=5, seed=0):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, PRIME, size=num_perm, dtype="uint64")
+        self.b = rng.integers(0, PRIME, size=num_perm, dtype="uint64")
+        self.shingle_size = shingle_size
+
+    def signature(self, text):
+        """uint32 signature of a page text, or None for a page without words."""
+        hashes = shingles(text, self.shingle_size) % PRIME
+        if not len(hashes):
+            return None
+        permuted = (self.a[:, None] * hashes[None, :] + self.b[:, None]) % PRIME
+        return permuted.min(axis=1).astype("uint32")
+
+
+def identifiers(text):
+    """
+    Identifier tokens of a page (accident numbers, registrations): words
+    that are only searchable on the page itself, so a page is only stored
+    as an alias of a page carrying all of them.
+    """
+    return frozenset(token for token in tokenize(text) if IDENTIFIER_PATTERN.match(token))
+
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.mean(a == b))
+
+
+class DuplicateIndex:
+    """
+    Locality-sensitive hashing over MinHash signatures.
+
+    Signatures are cut into bands; pages sharing any whole band land in
+    the same bucket and become candidates, which are then checked against
+    the similarity threshold. With 64 hashes in 8 bands, pages above 0.9
+    similarity collide with near certainty while unrelated pages rarely do.
+
+    Keys identify canonical pages (here (filename, page)); only canonical
+    pages are added, so a duplicate always points at a page that was
+    embedded. A page only matches a canonical page that has all of its
+    identifiers (see identifiers): the accident number of a boilerplate
+    page must stay findable. load_identifiers(key) returns those of a page
+    added without them, e.g. read from the page store.
+    """
+
+    def __init__(self, threshold=0.9, bands=8, load_identifiers=None):
+        self.threshold = threshold
+        self.bands = bands
+        self.load_identifiers = load_identifiers
+        self._buckets = {}
+        self._signatures = {}
+        self._identifiers = {}
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def _band_keys(self, signature):
+        return [hash((band, part.tobytes())) for band, part in enumerate(np.array_split(signature, self.bands))]
+
+    def _canonical_identifiers(self, key):
+        if key not in self._identifiers:
+            self._identifiers[key] = self.load_identifiers(key) if self.load_identifiers else frozenset()
+        return self._identifiers[key]
+
+    def find(self, signature, identifiers=frozenset()):
+        """
+        Key of the most similar canonical page above the threshold that
+        has all the given identifiers, or None.
+        """
+        best, best_similarity = None, self.threshold
+        seen = set()
+        for band_key in self._band_keys(signature):
+            for key in self._buckets.get(band_key, ()):
+                if key in seen:
+                    continue
+                seen.add(key)
+                score = similarity(signature, self._signatures[key])
+                if score >= best_similarity and identifiers <= self._canonical_identifiers(key):
+                    best, best_similarity = key, score
+        return best
+
+    def add(self, key, signature, identifiers=None):
+        """Register a canonical page; identifiers None: ask load_identifiers when needed."""
+        self._signatures[key] = signature
+        if identifiers is not None:
+            self._identifiers[key] = identifiers
+        for band_key in self._band_keys(signature):
+            self._buckets.setdefault(band_key, []).append(key)
+
+    def remove(self, key):
+        signature = self._signatures.pop(key, None)
+        self._identifiers.pop(key, None)
+        if signature is None:
+            return
+        for band_key in self._band_keys(signature):
+            bucket = self._buckets.get(band_key)
+            if bucket is not None and key in bucket:
+                bucket.remove(key)
@@ -0,0 +1,300 @@
+import os
+import json
+import sqlite3
+import argparse
+import threading
+from functools import lru_cache
+
+import numpy as np
+
+from logs import configure, get_logger
+from metadata_table import MetadataTable
+from metrics import BYTES_READ
+from snippets import analyze_page, decode_analysis, encode_analysis
+from vector_store import load_metadata
+
+log = get_logger("page_store")
+
+
+class PageStore:
+    """
+    Page text keyed by vector ID, stored in SQLite.
+    Lets the search engine fetch the text of a hit without opening and
+    parsing the extracted JSON of the whole document.
+
+    Alongside each page it keeps the snippet data computed at index time:
+    sentence offsets, per-sentence token sets and, optionally, float16
+    sentence embeddings.
+
+    Near-duplicate detection (see near_duplicates) adds the MinHash
+    signature of every embedded page and the aliases: pages that were not
+    embedded because they duplicate an indexed one, keyed by its vector ID.
+    """
+
+    def __init__(self, path, cache_size=4096):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages (id INTEGER PRIMARY KEY, text TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sentences ("
+            "id INTEGER PRIMARY KEY, bounds BLOB NOT NULL, tokens TEXT NOT NULL, vectors BLOB)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS signatures (id INTEGER PRIMARY KEY, signature BLOB NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS aliases (canonical INTEGER NOT NULL, filename TEXT NOT NULL, "
+            "page INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS aliases_canonical ON aliases (canonical)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS aliases_filename ON aliases (filename)")
+        self._conn.commit()
+
+        # Per-instance LRU caches over the SQLite lookups
+        self.get_text = lru_cache(maxsize=cache_size)(self._fetch_text)
+        self.get_analysis = lru_cache(maxsize=cache_size)(self._fetch_analysis)
+        self.get_aliases = lru_cache(maxsize=cache_size)(self._fetch_aliases)
+
+    def _fetch_text(self, vector_id):
+        """Return the text of a page by vector ID, or None if unknown."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text FROM pages WHERE id = ?", (int(vector_id),)
+            ).fetchone()
+        if row is None:
+            return None
+        BYTES_READ.inc(len(row[0].encode("utf-8")), source="page_store")
+        return row[0]
+
+    def _fetch_analysis(self, vector_id):
+        """
+        Return the precomputed snippet data of a page as
+        ((bounds, token_sets), sentence_vectors or None), or None if the
+        page was stored before snippet data existed.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT bounds, tokens, vectors FROM sentences WHERE id = ?", (int(vector_id),)
+            ).fetchone()
+        if row is None:
+            return None
+        bounds, tokens, vectors = row
+        analysis = decode_analysis(bounds, tokens)
+        if vectors is not None:
+            vectors = np.frombuffer(vectors, dtype="float16").reshape(len(analysis[0]), -1)
+        return analysis, vectors
+
+    def _fetch_aliases(self, vector_id):
+        """Duplicates of a page as a tuple of (filename, page), in document order."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT filename, page FROM aliases WHERE canonical = ? ORDER BY filename, page",
+                (int(vector_id),),
+            ).fetchall()
+        return tuple(rows)
+
+    def add_signatures(self, ids, signatures):
+        """Store the MinHash signature of embedded pages (None entries are skipped)."""
+        rows = [
+            (int(vector_id), np.asarray(signature, dtype="uint32").tobytes())
+            for vector_id, signature in zip(ids, signatures)
+            if signature is not None
+        ]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO signatures (id, signature) VALUES (?, ?)", rows)
+
+    def iter_signatures(self):
+        """Yield (vector_id, uint32 signature) for every stored page that has one."""
+        with self._lock:
+            rows = self._conn.execute("SELECT id, signature FROM signatures ORDER BY id").fetchall()
+        for vector_id, signature in rows:
+            yield vector_id, np.frombuffer(signature, dtype="uint32")
+
+    def add_aliases(self, aliases):
+        """Record duplicate pages: (canonical vector ID, filename, page) tuples."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO aliases (canonical, filename, page) VALUES (?, ?, ?)",
+                [(int(canonical), filename, int(page)) for canonical, filename, page in aliases],
+            )
+        self.get_aliases.cache_clear()
+
+    def alias_documents(self, ids):
+        """Documents with a page that duplicates one of the given vector IDs."""
+        ids = [int(i) for i in ids]
+        names = set()
+        with self._lock:
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT DISTINCT filename FROM aliases WHERE canonical IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                names.update(name for name, in rows)
+        return names
+
+    def remove_aliases(self, filenames):
+        """Forget the duplicate pages of these documents."""
+        with self._lock:
+            self._conn.executemany("DELETE FROM aliases WHERE filename = ?", [(name,) for name in filenames])
+        self.get_aliases.cache_clear()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def ids(self):
+        """Vector IDs of every stored page, sorted."""
+        with self._lock:
+            rows = self._conn.execute("SELECT id FROM pages ORDER BY id").fetchall()
+        return np.array([vector_id for vector_id, in rows], dtype="int64")
+
+    def iter_pages(self, chunk_size=1000, after=-1):
+        """Yield (vector_id, text) for every stored page with an ID above after, ordered by ID."""
+        last_id = after
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT id, text FROM pages WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, chunk_size),
+                ).fetchall()
+            if not rows:
+                return
+            yield from rows
+            last_id = rows[-1][0]
+
+    def add_pages(self, ids, texts, analyses=None, sentence_vectors=None):
+        """
+        Store page texts under their vector IDs, with their snippet data.
+        analyses: analyze_page output per page (computed here if omitted)
+        sentence_vectors: optional per-page arrays of sentence embeddings
+        """
+        ids = [int(i) for i in ids]
+        texts = list(texts)
+        if analyses is None:
+            analyses = [analyze_page(text) for text in texts]
+        if sentence_vectors is None:
+            sentence_vectors = [None] * len(texts)
+
+        rows = []
+        for vector_id, analysis, vectors in zip(ids, analyses, sentence_vectors):
+            bounds, tokens = encode_analysis(*analysis)
+            if vectors is not None:
+                vectors = np.asarray(vectors, dtype="float16").tobytes()
+            rows.append((vector_id, bounds, tokens, vectors))
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO pages (id, text) VALUES (?, ?)", zip(ids, texts)
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO sentences (id, bounds, tokens, vectors) VALUES (?, ?, ?, ?)", rows
+            )
+        self._clear_caches()
+
+    def analyze_all(self):
+        """
+        Compute the snippet data of stored pages that have none, e.g. in a
+        page store built before it existed. Returns the number of pages analyzed.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, text FROM pages WHERE id NOT IN (SELECT id FROM sentences)"
+            ).fetchall()
+        for start in range(0, len(rows), 1000):
+            chunk = rows[start:start + 1000]
+            self.add_pages([i for i, _ in chunk], [t for _, t in chunk])
+        self.commit()
+        return len(rows)
+
+    def remove_ids(self, ids):
+        """Delete page texts by vector ID."""
+        ids = [(int(i),) for i in ids]
+        with self._lock:
+            self._conn.executemany("DELETE FROM pages WHERE id = ?", ids)
+            self._conn.executemany("DELETE FROM sentences WHERE id = ?", ids)
+            self._conn.executemany("DELETE FROM signatures WHERE id = ?", ids)
+        self._clear_caches()
+
+    def clear(self):
+        """Delete every stored page."""
+        with self._lock:
+            self._conn.execute("DELETE FROM pages")
+            self._conn.execute("DELETE FROM sentences")
+            self._conn.execute("DELETE FROM signatures")
+            self._conn.execute("DELETE FROM aliases")
+        self._clear_caches()
+
+    def _clear_caches(self):
+        self.get_text.cache_clear()
+        self.get_analysis.cache_clear()
+        self.get_aliases.cache_clear()
+
+    def commit(self):
+        """Make pending writes durable."""
+        with self._lock:
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+
+def backfill(page_store, metadata, extracted_folder="data/extracted"):
+    """
+    Fill a page store for an existing index from the extracted JSON files,
+    without re-embedding anything. Each document's JSON is read only once.
+    Returns the number of pages stored.
+    """
+    if not isinstance(metadata, MetadataTable):
+        metadata = MetadataTable.from_records(metadata)
+
+    ids_by_file = {}
+    for vector_id in np.flatnonzero(metadata.doc_ids >= 0):
+        filename = metadata.filenames[metadata.doc_ids[vector_id]]
+        ids_by_file.setdefault(filename, []).append((int(vector_id), int(metadata.pages[vector_id])))
+
+    stored = 0
+    for filename, entries in ids_by_file.items():
+        json_path = os.path.join(extracted_folder, filename.replace(".pdf", ".json"))
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            log.warning("Could not read extracted JSON", path=json_path, error=e)
+            continue
+
+        texts = {page["page"]: page["text"] for page in data["pages"]}
+        found = [(vector_id, texts[page]) for vector_id, page in entries if page in texts]
+        page_store.add_pages([i for i, _ in found], [t for _, t in found])
+        stored += len(found)
+
+    page_store.commit()
+    log.info("Stored pages", pages=stored, path=page_store.path)
+    return stored
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build the page-text store for an existing index from extracted JSON."
+    )
+    parser.add_argument("--metadata", default="data/index/metadata.bin", help="Index metadata path")
+    parser.add_argument("--extracted", default="data/extracted", help="Folder of extracted JSON files")
+    parser.add_argument("--pages", default="data/index/pages.db", help="Output page store path")
+    args = parser.parse_args()
+    configure()
+
+    metadata = load_metadata(args.metadata)
+
+    page_store = PageStore(args.pages)
+    page_store.clear()
+    backfill(page_store, metadata, args.extracted)
+    page_store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,26 @@
 import fitz  # PyMuPDF
 import os
+import re
 import json
 
+from logs import get_logger
+
+log = get_logger("pdf_processor")
+
+
+# Labels of the header block on the first page of an NTSB report
+HEADER_LABELS = re.compile(
+    r"(Location|Accident Number|Date & Time|Registration|Aircraft Damage|Aircraft|"
+    r"Defining Event|Injuries|Flight Conducted Under):"
+)
+
+OPERATION_PATTERN = re.compile(
+    r"Flight Conducted Under:\s*(Part\s+(\d+\w*)(?::\s*[A-Za-z ]+?(?:\s-\s[A-Za-z]+)?)?|"
+    r"Non-U\.S\.,\s*(?:Non-)?Commercial)(?=\s{2}|\s+Analysis|\s+On\s|\s*$)"
+)
+
+INJURY_LEVELS = ["None", "Minor", "Serious", "Fatal"]
+
 
 def extract_text_from_pdf(pdf_path):
     """
@@ -9,12 +28,12 @@ def extract_text_from_pdf(pdf_path):
     Returns a dictionary with filename and pages.
     """
 
-    print(f"[INFO] Opening PDF: {pdf_path}")
+    log.debug("Opening PDF", path=pdf_path)
 
     try:
         pdf = fitz.open(pdf_path)
     except Exception as e:
-        print(f"[ERROR] Could not open PDF: {e}")
+        log.error("Could not open PDF", path=pdf_path, error=e)
         return None
 
     extracted_pages = []
@@ -39,11 +58,61 @@ def extract_text_from_pdf(pdf_path):
     }
 
 
+def parse_report_header(text):
+    """
+    Parse the structured header of an NTSB report from its first page.
+    Returns a dict with location, state, accident_number, date (YYYY-MM-DD),
+    registration, aircraft, injuries, injury_level and operation_part.
+    Fields that cannot be found are None.
+    """
+    fields = dict.fromkeys([
+        "location", "state", "accident_number", "date", "registration",
+        "aircraft", "injuries", "injury_level", "operation", "operation_part",
+    ])
+
+    matches = list(HEADER_LABELS.finditer(text))
+    values = {}
+    for current, following in zip(matches, matches[1:] + [None]):
+        end = following.start() if following else len(text)
+        values.setdefault(current.group(1), text[current.end():end].strip())
+
+    location = values.get("Location")
+    if location:
+        fields["location"] = location
+        # "Tallahassee, FL" -> FL, "Chevroux, France" -> France
+        fields["state"] = location.rsplit(",", 1)[-1].strip()
+
+    fields["accident_number"] = values.get("Accident Number") or None
+    fields["registration"] = values.get("Registration") or None
+
+    date_match = re.match(r"(\d{2})/(\d{2})/(\d{4})", values.get("Date & Time", ""))
+    if date_match:
+        month, day, year = date_match.groups()
+        fields["date"] = f"{year}-{month}-{day}"
+
+    aircraft = values.get("Aircraft")
+    if aircraft:
+        fields["aircraft"] = aircraft
+
+    injuries = values.get("Injuries")
+    if injuries:
+        fields["injuries"] = injuries
+        levels = [i for i, level in enumerate(INJURY_LEVELS) if level in injuries]
+        fields["injury_level"] = INJURY_LEVELS[max(levels)] if levels else None
+
+    operation = OPERATION_PATTERN.search(text)
+    if operation:
+        fields["operation"] = operation.group(1).strip()
+        fields["operation_part"] = operation.group(2) or "Non-U.S."
+
+    return fields
+
+
 def save_extracted_json(data, output_path):
     """Save extracted PDF content as a JSON file."""
     with open(output_path, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=4)
-    print(f"[INFO] JSON saved to {output_path}")
+    log.info("JSON saved", path=output_path)
 
 
 def save_extracted_text(data, output_path):
@@ -52,4 +121,4 @@ def save_extracted_text(data, output_path):
         for page in data["pages"]:
             f.write(f"--- Page {page['page']} ---\n")
             f.write(page["text"] + "\n\n")
-    print(f"[INFO] Text file saved to {output_path}")
+    log.info("Text file saved", path=output_path)
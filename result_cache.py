@@ -0,0 +1,152 @@
+import copy
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from embedding_cache import normalize_query
+from metrics import REGISTRY
+
+
+RESULT_CACHE_LOOKUPS = REGISTRY.counter(
+    "result_cache_lookups_total", "Search result cache lookups by result (exact_hit, semantic_hit, miss)."
+)
+
+
+def search_params_key(k, threshold, mode, filters, snippets=True):
+    """Hashable form of the search parameters results depend on."""
+    return (int(k), threshold, mode, json.dumps(filters, sort_keys=True) if filters else None, bool(snippets))
+
+
+class ResultCache:
+    """
+    Bounded LRU cache of search results for one index version.
+
+    Level 1 is keyed by (normalized query, search parameters), so repeated
+    queries skip encoding, FAISS and snippets entirely. Level 2 is
+    semantic: a query whose embedding lies within semantic_distance
+    (squared L2, the index's metric) of a cached query searched with the
+    same parameters reuses its hits. Only the engine knows whether a
+    query's results depend on its embedding alone, so it decides which
+    entries are offered to level 2.
+
+    Entries are tied to an index version; a lookup with a different
+    version empties the cache. Results are deep-copied on the way in and
+    out, so callers may modify the result dicts they get (snippets,
+    metadata, also_in) without changing the cached entry.
+    """
+
+    def __init__(self, capacity=1024, semantic_distance=0.05):
+        self.capacity = capacity
+        self.semantic_distance = semantic_distance
+        self.version = None
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+        # (query key, params key) -> results
+        self._entries = OrderedDict()
+        # params key -> {query key: embedding}, for the semantic level
+        self._embeddings = {}
+        # params key -> (query keys, stacked embeddings), rebuilt on change
+        self._matrices = {}
+        self._lock = threading.Lock()
+
+    def _check_version(self, version):
+        if version != self.version:
+            self._entries.clear()
+            self._embeddings.clear()
+            self._matrices.clear()
+            self.version = version
+
+    def _forget(self, key):
+        query_key, params = key
+        embeddings = self._embeddings.get(params)
+        if embeddings is not None and embeddings.pop(query_key, None) is not None:
+            self._matrices.pop(params, None)
+
+    def get(self, query, params, version):
+        """Cached results for exactly this query and parameters, or None."""
+        key = (normalize_query(query), params)
+        with self._lock:
+            self._check_version(version)
+            results = self._entries.get(key)
+            if results is None:
+                return None
+            self._entries.move_to_end(key)
+            self.exact_hits += 1
+        RESULT_CACHE_LOOKUPS.inc(result="exact_hit")
+        return copy.deepcopy(results)
+
+    def get_similar(self, embedding, params, version):
+        """
+        Results of the closest cached query searched with the same
+        parameters, if its embedding is within semantic_distance; else None.
+        """
+        if self.semantic_distance is None:
+            return None
+        with self._lock:
+            self._check_version(version)
+            embeddings = self._embeddings.get(params)
+            if not embeddings:
+                return None
+            matrix = self._matrices.get(params)
+            if matrix is None:
+                matrix = self._matrices[params] = (list(embeddings), np.stack(list(embeddings.values())))
+            query_keys, vectors = matrix
+
+            distances = ((vectors - np.asarray(embedding, dtype="float32")) ** 2).sum(axis=1)
+            best = int(np.argmin(distances))
+            if distances[best] > self.semantic_distance:
+                return None
+            key = (query_keys[best], params)
+            self._entries.move_to_end(key)
+            self.semantic_hits += 1
+            results = self._entries[key]
+        RESULT_CACHE_LOOKUPS.inc(result="semantic_hit")
+        return copy.deepcopy(results)
+
+    def miss(self):
+        """Count a lookup that found nothing at either level."""
+        with self._lock:
+            self.misses += 1
+        RESULT_CACHE_LOOKUPS.inc(result="miss")
+
+    def put(self, query, params, version, results, embedding=None):
+        """
+        Store the results of a query. With its embedding, the entry also
+        serves near-duplicate queries (level 2).
+        """
+        key = (normalize_query(query), params)
+        results = copy.deepcopy(results)
+        with self._lock:
+            self._check_version(version)
+            self._forget(key)
+            self._entries[key] = results
+            self._entries.move_to_end(key)
+            if embedding is not None and self.semantic_distance is not None:
+                self._embeddings.setdefault(params, {})[key[0]] = np.asarray(embedding, dtype="float32")
+                self._matrices.pop(params, None)
+            while len(self._entries) > self.capacity:
+                evicted, _ = self._entries.popitem(last=False)
+                self._forget(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._embeddings.clear()
+            self._matrices.clear()
+
+    def stats(self):
+        """Hit counters per level, the overall hit ratio and the current size."""
+        with self._lock:
+            hits = self.exact_hits + self.semantic_hits
+            lookups = hits + self.misses
+            return {
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+            }
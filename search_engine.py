@@ -1,153 +1,893 @@
 import os
 import json
-from embedder import Embedder
-from vector_store import VectorStore
-import re
+import time
+import heapq
+import itertools
+import weakref
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-import re
+import numpy as np
 
-def generate_snippet(text, query, max_length=250):
-    """
-    Extract the most relevant sentence(s) based on the query.
-    Highlights query words.
-    """
+from embedder import Embedder, check_compatible
+from shards import Shard, ShardManifest, ShardSet
+from snapshots import SnapshotStore
+from embedding_cache import EmbeddingCache
+from lexical_index import is_identifier_query, reciprocal_rank_fusion
+from result_cache import ResultCache, search_params_key
+from snippets import generate_snippet
+from logs import get_logger
+from metrics import BYTES_READ, REGISTRY, stage
 
-    if not text or not text.strip():
-        return "[No text available]"
 
-    # 1. Split text into sentences
-    sentences = re.split(r'(?<=[.!?]) +', text)
+SEARCH_MODES = ("semantic", "lexical", "hybrid")
 
-    query_words = [w.lower() for w in query.split()]
+WARMUP_MODES = ("eager", "background", "lazy")
 
-    # 2. Score each sentence based on occurrence of query words
-    best_sentence = None
-    best_score = 0
+log = get_logger("search_engine")
 
-    for sentence in sentences:
-        sent_lower = sentence.lower()
-        score = sum(1 for w in query_words if w in sent_lower)
+SEARCH_REQUESTS = REGISTRY.counter("search_requests_total", "search_batch calls by retrieval mode.")
+SEARCH_QUERIES = REGISTRY.counter("search_queries_total", "Queries searched by the mode they took.")
+SEARCH_RESULTS = REGISTRY.counter("search_results_total", "Results returned after the threshold.")
+SEARCH_EMPTY = REGISTRY.counter("search_empty_total", "Queries with no result above the threshold.")
+SEARCH_LATENCY = REGISTRY.histogram("search_latency_seconds", "search_batch latency by retrieval mode.")
+STARTUP_SECONDS = REGISTRY.gauge("startup_seconds", "Search engine startup time per phase.")
+SNAPSHOT_SWITCHES = REGISTRY.counter("snapshot_switches_total", "Switches of a running engine to a new index snapshot.")
 
-        if score > best_score:
-            best_score = score
-            best_sentence = sentence
 
-    # 3. If no sentence matched query, fallback to first part of text
-    if not best_sentence:
-        best_sentence = text[:max_length]
+def result_key(result):
+    """Identity of a hit across shards."""
+    return result["shard"], result["id"]
 
-    # 4. If sentence is too long, trim it
-    if len(best_sentence) > max_length:
-        best_sentence = best_sentence[:max_length] + "..."
 
-    # 5. Highlight query words
-    snippet = best_sentence
-    for w in query_words:
-        snippet = re.sub(
-            rf"\b({re.escape(w)})\b",
-            r"**\1**",
-            snippet,
-            flags=re.IGNORECASE
-        )
+def index_version(shards):
+    """Changes whenever one of the shards' indexes does."""
+    return tuple(shard.vector_store.version for shard in shards)
 
-    return snippet
 
+class ResultCursor:
+    """
+    Ordered results of a radius search, computed lazily.
 
+    The range search itself only yields distances and vector IDs; result
+    dicts, snippets and duplicate lists are built for the items that are
+    actually read, by index, slice, page or iteration.
 
-class SearchEngine:
-    def __init__(self, index_path="data/index/faiss.index", metadata_path="data/index/metadata.json"):
-        print("[INFO] Initializing Search Engine...")
+    The cursor holds the shards it searched, so results stay readable
+    after a snapshot switch; close it (or drop it) to let the engine
+    close those shards once they are retired.
+    """
 
-        # Check index existence
-        if not os.path.exists(index_path):
-            raise FileNotFoundError(
-                f"[ERROR] FAISS index not found at '{index_path}'. "
-                "Please run build_index.py first."
-            )
+    def __init__(self, engine, shard_set, query, distances, shards, ids, query_embedding=None, filters=None):
+        self.engine = engine
+        self.index_shards = shard_set.shards
+        self._release = weakref.finalize(self, shard_set.release)
+        self.query = query
+        self.filters = filters
+        self.distances = distances
+        self.shards = shards
+        self.ids = ids
+        self.query_embedding = query_embedding
+
+    def __len__(self):
+        return len(self.ids)
+
+    def hits(self, start=0, stop=None):
+        """Results start..stop without snippets: metadata, distance and also_in."""
+        results = []
+        for i in range(*slice(start, stop).indices(len(self))):
+            shard, vector_id = int(self.shards[i]), int(self.ids[i])
+            meta = self.index_shards[shard].vector_store.metadata[vector_id]
+            result = {"id": vector_id, "distance": float(self.distances[i]), "metadata": meta, "shard": shard}
+            results.append(dict(result, also_in=self.engine._aliases(self.index_shards, result)))
+        return self.engine._filter_aliases(self.index_shards, results, self.filters)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            if index.step not in (None, 1):
+                raise ValueError("[ERROR] Result cursors only support contiguous slices.")
+            hits = self.hits(index.start or 0, index.stop)
+        else:
+            if index < 0:
+                index += len(self)
+            if not 0 <= index < len(self):
+                raise IndexError(index)
+            hits = self.hits(index, index + 1)
+        results = self.engine._enhance_results(
+            self.index_shards, self.query, hits, threshold=None, query_embedding=self.query_embedding,
+            filters=self.filters,
+        ) if hits else []
+        return results if isinstance(index, slice) else results[0]
+
+    def page(self, number, size=10):
+        """Results of page number (0-based) with size results per page, with snippets."""
+        return self[number * size:(number + 1) * size]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def close(self):
+        """Release the searched shards; the cursor cannot be read afterwards."""
+        self._release()
 
-        # Check metadata existence
-        if not os.path.exists(metadata_path):
-            raise FileNotFoundError(
-                f"[ERROR] Metadata file not found at '{metadata_path}'. "
-                "Please run build_index.py first."
-            )
+
+class SearchEngine:
+    def __init__(self, index_path="data/index/faiss.index", metadata_path="data/index/metadata.bin",
+                 pages_path="data/index/pages.db", cache_size=10000,
+                 cache_path="data/cache/query_embeddings.db", nprobe=None, ef_search=None,
+                 lexical_path="data/index/lexical.npz", fields_path="data/index/fields.npz",
+                 documents_path="data/index/documents.npz",
+                 mmap_metadata=True, mmap_index=True, warmup="background",
+                 model_name="all-MiniLM-L6-v2", backend="torch", local_files_only=False, embedder=None,
+                 result_cache_size=1024, semantic_cache_distance=0.05, shards_path=None,
+                 search_workers=None, rerank_factor=None, reload_interval=None):
+        """
+        Startup options:
+        mmap_index / mmap_metadata = memory-map the index files instead of
+            reading them into RAM
+        warmup = "eager" loads the model before returning, "background"
+            loads and warms it in a thread (lexical and cached queries are
+            served meanwhile), "lazy" loads it on the first query needing it
+        model_name / backend / local_files_only = query embedder (see
+            Embedder); the model must match the one the index was built with
+        embedder = use this embedder instead of creating one (e.g. a stub
+            in benchmarks); model_name, backend and warmup are then ignored
+        result_cache_size = search results kept for repeated queries
+            (0 disables the result cache)
+        semantic_cache_distance = squared L2 distance under which a new
+            query's embedding reuses a cached query's hits (None disables
+            near-duplicate reuse)
+        documents_path = per-document vector index used by
+            search_documents (optional)
+        shards_path = shard manifest written by shards.py; its shards are
+            searched instead of index_path, metadata_path, pages_path,
+            lexical_path, fields_path and documents_path
+        search_workers = threads searching shards in parallel (default:
+            one per shard)
+        nprobe / ef_search / rerank_factor = override the query-time knobs
+            saved with the index (see VectorStore.set_search_params)
+        reload_interval = seconds between checks for a new index snapshot
+            in a background thread (None: only when refresh() is called)
+
+        When the directory of index_path holds snapshots written by
+        build_index.py (see snapshots.py), the files of its current
+        snapshot are loaded instead, and refresh() switches to a newer one;
+        with shards_path, refresh() switches to the shards of a rewritten
+        shard manifest.
+        The time spent in each startup phase is kept in startup_timings.
+        """
+        log.info("Initializing search engine", index=shards_path or index_path)
+        if warmup not in WARMUP_MODES:
+            raise ValueError(f"[ERROR] Unknown warmup mode '{warmup}', expected one of {WARMUP_MODES}.")
+        self.startup_timings = {}
+        started = time.perf_counter()
 
         try:
-            self.embedder = Embedder()
+            self.embedder = embedder or Embedder(
+                model_name,
+                lazy=warmup != "eager",
+                backend=backend,
+                local_files_only=local_files_only,
+            )
+            # Repeated queries skip the model; pass cache_path=None to keep
+            # the cache in memory only
+            self.embedder.cache = EmbeddingCache(
+                self.embedder.cache_key, capacity=cache_size, path=cache_path
+            )
         except Exception as e:
             raise RuntimeError(
                 f"[ERROR] Could not load embedding model: {e}\n"
                 "Make sure your environment is set correctly."
             )
+        self.startup_timings["model" if warmup == "eager" else "embedding_cache"] = time.perf_counter() - started
+
+        self._shard_options = {"mmap_metadata": mmap_metadata, "mmap_index": mmap_index}
+        self._search_params = {"nprobe": nprobe, "ef_search": ef_search, "rerank_factor": rerank_factor}
+        # Versioned snapshots next to the index, if builds write them
+        self.snapshots = None
+        self._shards_path = shards_path
+        self._paths = {
+            "index_path": index_path, "metadata_path": metadata_path, "pages_path": pages_path,
+            "lexical_path": lexical_path, "fields_path": fields_path, "documents_path": documents_path,
+        }
+        if shards_path is None:
+            # An index built in place switches to snapshots with its next build
+            self.snapshots = SnapshotStore(os.path.dirname(index_path) or ".")
+        self.snapshot, layout = self._current()
+        if shards_path is not None and not layout:
+            raise FileNotFoundError(
+                f"[ERROR] No shards listed in '{shards_path}'. Please run shards.py first."
+            )
+        if self.snapshot is not None:
+            log.info("Using index snapshot", snapshot=self.snapshot)
 
-        self.vector_store = VectorStore()
+        self._shard_set = ShardSet(self._open_shards(layout, self.startup_timings))
+        self._swap_lock = threading.Lock()
 
-        try:
-            self.vector_store.load(index_path, metadata_path)
-        except Exception as e:
-            raise RuntimeError(
-                f"[ERROR] Failed to load FAISS index or metadata: {e}"
+        # Shards are searched concurrently; FAISS releases the GIL
+        self._pool = None
+        if len(self.shards) > 1:
+            self._pool = ThreadPoolExecutor(
+                max_workers=search_workers or len(self.shards), thread_name_prefix="shard-search"
             )
 
-        print("[INFO] Search Engine ready!")
+        # Repeated and near-duplicate queries skip FAISS and snippets
+        self.result_cache = None
+        if result_cache_size:
+            self.result_cache = ResultCache(result_cache_size, semantic_distance=semantic_cache_distance)
+
+        self._reload_lock = threading.Lock()
+        self._failed_snapshot = None
+        if reload_interval:
+            threading.Thread(
+                target=self._watch_snapshots, args=(reload_interval,), name="snapshot-watch", daemon=True
+            ).start()
+
+        self.startup_timings["total"] = time.perf_counter() - started
+        if warmup == "background":
+            self.embedder.warmup(background=True)
+
+        for name, seconds in self.startup_timings.items():
+            STARTUP_SECONDS.set(seconds, phase=name)
+        log.info(
+            "Search engine ready",
+            shards=len(self.shards),
+            **{f"{name}_s": round(seconds, 3) for name, seconds in self.startup_timings.items()},
+        )
 
-    def search(self, query, k=5, threshold=1.2):
+    def _current(self):
+        """
+        (snapshot, [(shard name, file paths)]) of the index to serve: the
+        shards listed in the shard manifest, or the unsharded index or its
+        current snapshot.
         """
-        Perform semantic search on the index.
+        if self._shards_path is not None:
+            manifest = ShardManifest.load(self._shards_path)
+            return manifest.snapshot, [(shard["name"], manifest.paths(shard)) for shard in manifest.shards]
+        snapshot = self.snapshots.current()
+        if snapshot is None:
+            return None, [("index", self._paths)]
+        # Same file names inside the snapshot; files disabled with None stay disabled
+        return snapshot, [("index", self.snapshots.paths(snapshot, self._paths))]
+
+    def _open_shards(self, layout, timings):
+        shards = []
+        for name, paths in layout:
+            paths = {key: path for key, path in paths.items() if key != "manifest_path"}
+            shard = Shard.open(name, **paths, **self._shard_options, timings=timings)
+            check_compatible(shard.vector_store.embedding, self.embedder)
+            # Optional overrides of the tuning knobs saved with the index
+            shard.vector_store.set_search_params(**self._search_params)
+            shards.append(shard)
+        return shards
+
+    def refresh(self):
+        """
+        Switch to the current snapshot if a build has published a new one
+        (or a rollback went back to an older one), or to the shards of a
+        rewritten shard manifest. The new files are loaded
+        while queries keep running on the old ones; each query runs on
+        the shards it started with, so no query is dropped or sees a mix.
+        The old shards are closed once the last query or result cursor
+        using them is done.
+        Returns True if the engine switched.
+        """
+        snapshot, layout = self._current()
+        if snapshot is None or snapshot in (self.snapshot, self._failed_snapshot):
+            return False
+
+        with self._reload_lock:
+            if snapshot == self.snapshot:
+                return False
+            started = time.perf_counter()
+            try:
+                shards = self._open_shards(layout, {})
+            except Exception as e:
+                self._failed_snapshot = snapshot
+                log.error("Could not load index snapshot, still serving the previous one",
+                          snapshot=snapshot, serving=self.snapshot, error=e)
+                return False
+            with self._swap_lock:
+                retired, self._shard_set = self._shard_set, ShardSet(shards)
+                previous, self.snapshot = self.snapshot, snapshot
+        # Closed now, or by the last query or cursor still reading it
+        retired.retire()
+
+        SNAPSHOT_SWITCHES.inc()
+        log.info("Switched to index snapshot", snapshot=snapshot, previous=previous,
+                 load_s=round(time.perf_counter() - started, 3))
+        return True
+
+    def _watch_snapshots(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.refresh()
+            except Exception as e:
+                log.error("Snapshot check failed", error=e)
+
+    @property
+    def shards(self):
+        """Shards of the index version being served."""
+        return self._shard_set.shards
+
+    def _acquire(self):
+        """
+        The ShardSet being served, acquired so that a snapshot switch does
+        not close it; release it when done.
+        """
+        with self._swap_lock:
+            shard_set = self._shard_set
+            shard_set.acquire()
+        return shard_set
+
+    # The single shard of an unsharded index (the first one otherwise)
+    @property
+    def vector_store(self):
+        return self.shards[0].vector_store
+
+    @property
+    def page_store(self):
+        return self.shards[0].page_store
+
+    @property
+    def lexical_index(self):
+        return self.shards[0].lexical_index
+
+    @property
+    def field_table(self):
+        return self.shards[0].field_table
+
+    def _map_shards(self, function, shards):
+        """function(shard number) for every shard, in parallel when sharded."""
+        if self._pool is None or len(shards) == 1:
+            return [function(0)]
+        return list(self._pool.map(function, range(len(shards))))
+
+    def startup_report(self):
+        """
+        Seconds spent per startup phase, including the model phases
+        (import, load, warmup) once they have run.
+        """
+        report = dict(self.startup_timings)
+        report.update({f"model_{name}": seconds for name, seconds in self.embedder.timings.items()})
+        return report
+
+    @property
+    def index_version(self):
+        """Changes whenever the searched index does; cached results are tied to it."""
+        return index_version(self.shards)
+
+    def cache_stats(self):
+        """Hit counters of the query embedding cache and the result cache."""
+        stats = {"query_embeddings": self.embedder.cache.stats()}
+        if self.result_cache is not None:
+            stats["results"] = self.result_cache.stats()
+        return stats
+
+    def _page_text(self, shards, result):
+        """Return the text of the page behind a search result, or None."""
+        page_store = shards[result["shard"]].page_store
+        if page_store is not None:
+            return page_store.get_text(result["id"])
+
+        filename = result["metadata"]["filename"]
+        page_num = result["metadata"]["page"]
+        json_path = os.path.join("data", "extracted", filename.replace(".pdf", ".json"))
+
+        BYTES_READ.inc(os.path.getsize(json_path), source="extracted_json")
+        with open(json_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        # Find correct page text
+        for page in data["pages"]:
+            if page["page"] == page_num:
+                return page["text"]
+        return None
+
+    def search(self, query, k=5, threshold=1.2, mode="semantic", filters=None, snippets=True):
+        """
+        Search the index for one query.
         Applies a relevance threshold.
         Generates snippet for each result.
+
+        mode: "semantic" (FAISS only), "lexical" (BM25 only) or "hybrid"
+        (both rankings fused with reciprocal rank fusion). In hybrid mode,
+        queries made only of identifiers such as accident numbers or
+        registrations take the lexical path and never touch the embedder.
+
+        filters: optional report header filters, e.g.
+        {"date_from": "2007-12-01", "date_to": "2007-12-31", "state": "FL",
+        "make": "cessna", "operation_part": "91"}. They are applied inside
+        the FAISS and BM25 searches, so k results are returned whenever k
+        matching pages exist.
+
+        snippets=False returns the ranked hits without snippets, so a UI
+        can show them at once and fill snippets in with snippet().
         """
 
         if not query.strip():
-            print("[WARN] Query cannot be empty.")
+            log.warning("Query cannot be empty")
             return []
 
-        # Convert query to embedding
+        return self.search_batch(
+            [query], k=k, threshold=threshold, mode=mode, filters=filters, snippets=snippets
+        )[0]
+
+    def search_batch(self, queries, k=5, threshold=1.2, mode="semantic", filters=None, snippets=True):
+        """
+        Search the index for many queries at once.
+        All queries that need an embedding are encoded in one model call
+        and searched with one FAISS search over the query matrix (per
+        shard, shards in parallel). Per-shard top-k lists are merged by
+        distance before the threshold is applied.
+        Returns one result list per query, in the same order. Each result
+        carries the number of the shard it comes from in "shard", and in
+        "also_in" the near-duplicate pages that were stored as its aliases
+        at build time ({"filename", "page"} dicts, usually empty).
+
+        Every stage (embed, faiss, lexical, filters, page_fetch, snippet)
+        is timed through metrics.stage, see metrics.add_stage_hook.
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"[ERROR] Unknown search mode '{mode}', expected one of {SEARCH_MODES}.")
+
+        # Every step of the search uses the same shards, even if a new
+        # snapshot is switched to meanwhile
+        shard_set = self._acquire()
         try:
-            query_embedding = self.embedder.embed_text(query)
+            shards = shard_set.shards
+            if mode != "semantic" and all(shard.lexical_index is None for shard in shards):
+                log.warning("Lexical index not available, falling back to semantic search", mode=mode)
+                mode = "semantic"
+
+            started = time.perf_counter()
+            SEARCH_REQUESTS.inc(mode=mode)
+            batch_results = self._search_batch(shards, queries, k, threshold, mode, filters, snippets)
+        finally:
+            shard_set.release()
+        SEARCH_LATENCY.observe(time.perf_counter() - started, mode=mode)
+        SEARCH_RESULTS.inc(sum(len(results) for results in batch_results))
+        return batch_results
+
+    def _filter_masks(self, shards, filters):
+        """One boolean mask over vector IDs per shard (None: no filtering)."""
+        id_masks = [None] * len(shards)
+        if filters:
+            if all(shard.field_table is None for shard in shards):
+                log.warning("Field table not available, filters are ignored")
+            else:
+                with stage("filters", pipeline="search"):
+                    id_masks = [
+                        shard.field_table.mask(filters) if shard.field_table is not None else None
+                        for shard in shards
+                    ]
+        return id_masks
+
+    def _search_batch(self, shards, queries, k, threshold, mode, filters, snippets):
+        cache = self.result_cache
+        params = search_params_key(k, threshold, mode, filters, snippets)
+        version = index_version(shards)
+
+        batch_results = [[] for _ in queries]
+        query_modes = {}
+        for i, query in enumerate(queries):
+            if not query.strip():
+                continue
+            cached = cache.get(query, params, version) if cache is not None else None
+            if cached is not None:
+                batch_results[i] = cached
+                continue
+            if mode == "hybrid" and is_identifier_query(query):
+                query_modes[i] = "lexical"
+            else:
+                query_modes[i] = mode
+            SEARCH_QUERIES.inc(mode=query_modes[i])
+
+        if not query_modes:
+            return batch_results
+
+        id_masks = self._filter_masks(shards, filters)
+
+        # Semantic candidates for every query that needs them
+        semantic_results = {}
+        embeddings_by_query = {}
+        positions = [i for i, m in query_modes.items() if m != "lexical"]
+
+        if positions:
+            try:
+                with stage("embed", pipeline="search"):
+                    query_embeddings = self.embedder.embed_queries([queries[i] for i in positions])
+            except Exception as e:
+                # Only the queries needing an embedding fail (empty, not
+                # cached); those routed to the keyword index still run
+                log.error("Failed to embed queries", queries=len(positions), error=e)
+                for i in positions:
+                    del query_modes[i]
+                positions, query_embeddings = [], []
+            # Lets snippets pick sentences by embedding similarity
+            embeddings_by_query = dict(zip(positions, query_embeddings))
+
+            # Near-duplicates of a cached semantic query reuse its hits;
+            # hybrid results also depend on the exact words, so they don't
+            if cache is not None and mode == "semantic":
+                for i in list(positions):
+                    similar = cache.get_similar(embeddings_by_query[i], params, version)
+                    if similar is not None:
+                        # Same hits, snippets highlighting this query's words
+                        batch_results[i] = self._enhance_results(
+                            shards, queries[i], similar, threshold=None, query_embedding=embeddings_by_query[i],
+                            snippets=snippets, filters=filters,
+                        )
+                        cache.put(queries[i], params, version, batch_results[i])
+                        del query_modes[i]
+                        positions.remove(i)
+
+        if positions:
+            # Hybrid fusion needs a deeper candidate list than the final k
+            n_candidates = k if mode == "semantic" else max(k * 4, 20)
+            with stage("faiss", pipeline="search"):
+                raw_results = self._vector_search(
+                    shards, np.stack([embeddings_by_query[i] for i in positions]), n_candidates, id_masks
+                )
+            semantic_results = dict(zip(positions, raw_results))
+
+        for i, query_mode in query_modes.items():
+            query = queries[i]
+
+            if query_mode == "semantic":
+                batch_results[i] = self._enhance_results(
+                    shards, query, semantic_results[i], threshold, embeddings_by_query[i], snippets=snippets,
+                    filters=filters,
+                )
+            else:
+                with stage("lexical", pipeline="search"):
+                    lexical = self._lexical_results(
+                        shards, query, max(k * 4, 20) if query_mode == "hybrid" else k, id_masks
+                    )
+
+                if query_mode == "lexical":
+                    batch_results[i] = self._enhance_results(
+                        shards, query, lexical, threshold=None, snippets=snippets, filters=filters
+                    )
+                else:
+                    semantic = [r for r in semantic_results[i] if r["distance"] <= threshold]
+                    fused = reciprocal_rank_fusion(
+                        [[result_key(r) for r in semantic], [result_key(r) for r in lexical]]
+                    )[:k]
+
+                    by_key = {result_key(r): r for r in lexical}
+                    by_key.update({result_key(r): r for r in semantic})
+                    results = [dict(by_key[key], score=score) for key, score in fused]
+                    batch_results[i] = self._enhance_results(
+                        shards, query, results, threshold=None, query_embedding=embeddings_by_query.get(i),
+                        snippets=snippets, filters=filters,
+                    )
+
+            if cache is not None:
+                cache.miss()
+                cache.put(
+                    query, params, version, batch_results[i],
+                    embedding=embeddings_by_query[i] if query_mode == "semantic" else None,
+                )
+
+        return batch_results
+
+    def search_radius(self, query, threshold=1.2, filters=None):
+        """
+        Threshold-first semantic search: every page whose distance to the
+        query is at most threshold, found with a FAISS range search instead
+        of a top-k search, so no relevant page is cut off by k.
+
+        Returns a ResultCursor ordered by distance; snippets are only
+        computed for the results read from it, e.g. cursor.page(0, 20).
+        filters are the same report header filters as in search().
+        """
+        # Released by the cursor
+        shard_set = self._acquire()
+        if not query.strip():
+            log.warning("Query cannot be empty")
+            return ResultCursor(self, shard_set, query, np.zeros(0), np.zeros(0), np.zeros(0))
+
+        started = time.perf_counter()
+        SEARCH_REQUESTS.inc(mode="radius")
+        SEARCH_QUERIES.inc(mode="radius")
+        index_shards = shard_set.shards
+        try:
+            id_masks = self._filter_masks(index_shards, filters)
+            try:
+                with stage("embed", pipeline="search"):
+                    query_embedding = self.embedder.embed_queries([query])[0]
+            except Exception as e:
+                log.error("Failed to embed query", mode="radius", error=e)
+                return ResultCursor(self, shard_set, query, np.zeros(0), np.zeros(0), np.zeros(0))
+
+            def search_shard(number):
+                vector_store = index_shards[number].vector_store
+                distances, ids = vector_store.range_search(query_embedding, threshold, id_mask=id_masks[number])
+                # Vectors whose metadata was removed are dropped here, so
+                # the cursor's length is the number of results it yields
+                doc_ids = vector_store.metadata.doc_ids
+                live = ids < len(doc_ids)
+                live[live] = doc_ids[ids[live]] >= 0
+                return distances[live], ids[live]
+
+            with stage("faiss", pipeline="search"):
+                per_shard = self._map_shards(search_shard, index_shards)
+                distances = np.concatenate([d for d, _ in per_shard])
+                ids = np.concatenate([i for _, i in per_shard])
+                shards = np.concatenate([np.full(len(i), number) for number, (_, i) in enumerate(per_shard)])
+                order = np.argsort(distances, kind="stable")
+        except BaseException:
+            shard_set.release()
+            raise
+
+        SEARCH_LATENCY.observe(time.perf_counter() - started, mode="radius")
+        SEARCH_RESULTS.inc(len(ids))
+        if not len(ids):
+            SEARCH_EMPTY.inc()
+        return ResultCursor(
+            self, shard_set, query, distances[order], shards[order], ids[order], query_embedding, filters
+        )
+
+    def search_documents(self, query, k=5, threshold=1.2, filters=None, pages_per_doc=3, candidates=None):
+        """
+        Document-level semantic search: one result per report instead of
+        one per page, so a long report cannot take every slot.
+
+        Runs in two stages per shard. The document index (one pooled
+        vector per report) picks the candidates closest reports (default
+        max(4 * k, 20)), then FAISS searches only the pages of those
+        reports. Shards without a document index search all their pages.
+
+        Returns up to k documents, best first, as dicts with "filename",
+        "shard", "distance" (of the best page), "document_distance" (of
+        the pooled vector, None without a document index) and "pages": the
+        best pages_per_doc pages within threshold, with snippets, shaped
+        like search() results. filters are the same as in search().
+        """
+        if not query.strip():
+            log.warning("Query cannot be empty")
+            return []
+
+        started = time.perf_counter()
+        SEARCH_REQUESTS.inc(mode="documents")
+        SEARCH_QUERIES.inc(mode="documents")
+        shard_set = self._acquire()
+        try:
+            documents = self._search_documents(
+                shard_set.shards, query, k, threshold, filters, pages_per_doc, candidates or max(4 * k, 20)
+            )
+        finally:
+            shard_set.release()
+
+        SEARCH_LATENCY.observe(time.perf_counter() - started, mode="documents")
+        SEARCH_RESULTS.inc(len(documents))
+        if not documents:
+            SEARCH_EMPTY.inc()
+        return documents
+
+    def _search_documents(self, shards, query, k, threshold, filters, pages_per_doc, n_candidates):
+        id_masks = self._filter_masks(shards, filters)
+        try:
+            with stage("embed", pipeline="search"):
+                query_embedding = self.embedder.embed_queries([query])[0]
         except Exception as e:
-            print(f"[ERROR] Failed to embed query: {e}")
+            log.error("Failed to embed query", mode="documents", error=e)
+            return []
+
+        def search_shard(number):
+            shard = shards[number]
+            id_mask = id_masks[number]
+            documents = shard.document_index
+            document_distances = {}
+            if documents is not None and len(documents):
+                with stage("documents", pipeline="search"):
+                    doc_mask = documents.doc_mask(id_mask) if id_mask is not None else None
+                    distances, rows = documents.search(query_embedding, n_candidates, doc_mask)
+                    found = rows[0] >= 0
+                    rows = rows[0][found]
+                    if not len(rows):
+                        return []
+                    document_distances = {
+                        documents.filenames[row]: float(distance) for row, distance in zip(rows, distances[0][found])
+                    }
+                    # Only the candidates' pages are scored, exactly
+                    pages = documents.pages(rows)
+                    if id_mask is not None:
+                        pages = pages[pages < len(id_mask)]
+                        pages = pages[id_mask[pages]]
+                    hits = shard.vector_store.search_ids(query_embedding, pages, n_candidates * pages_per_doc)
+            else:
+                # Enough pages that most candidates contribute pages_per_doc
+                hits = shard.vector_store.search_batch(
+                    query_embedding, n_candidates * pages_per_doc, id_mask=id_mask
+                )[0]
+            grouped = {}
+            for hit in hits:
+                if hit["distance"] > threshold:
+                    break
+                filename = hit["metadata"]["filename"]
+                pages = grouped.setdefault(filename, [])
+                if len(pages) < pages_per_doc:
+                    pages.append(dict(hit, shard=number))
+            return [
+                {
+                    "filename": filename,
+                    "shard": number,
+                    "distance": pages[0]["distance"],
+                    "document_distance": document_distances.get(filename),
+                    "pages": pages,
+                }
+                for filename, pages in grouped.items()
+            ]
+
+        with stage("faiss", pipeline="search"):
+            documents = heapq.nsmallest(
+                k, itertools.chain.from_iterable(self._map_shards(search_shard, shards)), key=lambda d: d["distance"]
+            )
+        for document in documents:
+            document["pages"] = self._enhance_results(
+                shards, query, document["pages"], threshold=None, query_embedding=query_embedding, filters=filters
+            )
+        return documents
+
+    def _vector_search(self, shards, query_embeddings, k, id_masks):
+        """
+        Top-k FAISS hits of every query over all shards: each shard returns
+        its own top k, then the lists are merged by distance.
+        """
+        def search_shard(number):
+            vector_store = shards[number].vector_store
+            results = vector_store.search_batch(query_embeddings, k, id_mask=id_masks[number])
+            for row in results:
+                for result in row:
+                    result["shard"] = number
+            return results
+
+        per_shard = self._map_shards(search_shard, shards)
+        if len(per_shard) == 1:
+            return per_shard[0]
+        return [
+            heapq.nsmallest(k, itertools.chain.from_iterable(rows), key=lambda r: r["distance"])
+            for rows in zip(*per_shard)
+        ]
+
+    def _lexical_results(self, shards, query, k, id_masks):
+        """Top-k BM25 hits over all shards, shaped like VectorStore results (no distance)."""
+        def search_shard(number):
+            shard = shards[number]
+            if shard.lexical_index is None:
+                return []
+            results = []
+            for vector_id, score in shard.lexical_index.search(query, k, id_mask=id_masks[number]):
+                if vector_id >= len(shard.vector_store.metadata):
+                    continue
+                meta = shard.vector_store.metadata[vector_id]
+                if meta is None:
+                    continue
+                results.append(
+                    {"id": vector_id, "distance": None, "score": score, "metadata": meta, "shard": number}
+                )
+            return results
+
+        per_shard = self._map_shards(search_shard, shards)
+        if len(per_shard) == 1:
+            return per_shard[0]
+        # BM25 statistics are per shard, so scores are comparable only approximately
+        return heapq.nlargest(k, itertools.chain.from_iterable(per_shard), key=lambda r: r["score"])
+
+    def _aliases(self, shards, result):
+        """Pages that duplicate a hit, collapsed into it at build time."""
+        page_store = shards[result["shard"]].page_store
+        if page_store is None:
             return []
+        return [{"filename": filename, "page": page} for filename, page in page_store.get_aliases(result["id"])]
+
+    def _filter_aliases(self, shards, results, filters):
+        """
+        Keep only the duplicates in also_in whose reports pass filters, like
+        the hits themselves; reports without a field table row are dropped.
+        """
+        if not filters or not any(result["also_in"] for result in results):
+            return results
+        allowed = {}
+        for number, shard in enumerate(shards):
+            if shard.field_table is not None:
+                table = shard.field_table
+                allowed[number] = {table.filenames[row] for row in np.flatnonzero(table.document_mask(filters))}
+        for result in results:
+            documents = allowed.get(result["shard"])
+            if documents is not None:
+                result["also_in"] = [alias for alias in result["also_in"] if alias["filename"] in documents]
+        return results
+
+    def _snippet(self, shards, result, query, query_embedding=None):
+        """
+        Snippet of one hit, from the sentence data precomputed at index
+        time when the page store has it.
+        """
+        with stage("page_fetch", pipeline="search"):
+            text = self._page_text(shards, result)
+            if text is None:
+                return "[Snippet unavailable]"
+
+            analysis = sentence_vectors = None
+            page_store = shards[result["shard"]].page_store
+            if page_store is not None:
+                stored = page_store.get_analysis(result["id"])
+                if stored is not None:
+                    analysis, sentence_vectors = stored
+        with stage("snippet", pipeline="search"):
+            return generate_snippet(
+                text, query, analysis=analysis, sentence_vectors=sentence_vectors, query_embedding=query_embedding
+            )
 
-        # Get raw FAISS results
-        all_results = self.vector_store.search(query_embedding, k)
+    def snippet(self, result, query):
+        """
+        Snippet of one hit returned by search(..., snippets=False). For
+        semantic hits the query embedding comes from the query cache, so
+        snippets can pick sentences by embedding similarity.
+        """
+        query_embedding = None
+        if result.get("distance") is not None:
+            try:
+                query_embedding = self.embedder.embed_queries([query])[0]
+            except Exception as e:
+                log.warning("Could not embed query for snippet", error=e)
+        shard_set = self._acquire()
+        try:
+            return self._snippet(shard_set.shards, result, query, query_embedding)
+        except Exception as e:
+            log.warning("Could not generate snippet", file=result["metadata"]["filename"], error=e)
+            return "[Snippet unavailable]"
+        finally:
+            shard_set.release()
 
+    def _enhance_results(self, shards, query, all_results, threshold, query_embedding=None, snippets=True,
+                         filters=None):
+        """
+        Apply the relevance threshold to raw FAISS results
+        and attach a snippet to each remaining result.
+        threshold=None keeps every result (lexical and fused rankings).
+        query_embedding, when known, lets snippets use sentence embeddings.
+        snippets=False returns the remaining results without snippets.
+        filters: the search's report filters, also applied to also_in.
+        """
         # Filter based on threshold
-        filtered = [r for r in all_results if r["distance"] <= threshold]
+        if threshold is None:
+            filtered = all_results
+        else:
+            filtered = [r for r in all_results if r["distance"] <= threshold]
 
         if not filtered:
-            print("[INFO] No relevant results found (all scores above threshold).")
+            log.debug("No relevant results found (all scores above threshold)", query=query)
+            SEARCH_EMPTY.inc()
             return []
+        filtered = self._filter_aliases(
+            shards, [dict(res, also_in=self._aliases(shards, res)) for res in filtered], filters
+        )
+        if not snippets:
+            return filtered
 
         # --------- ENHANCE RESULTS WITH SNIPPETS ----------
         enhanced_results = []
 
         for res in filtered:
             filename = res["metadata"]["filename"]
-            page_num = res["metadata"]["page"]
-
-            json_path = os.path.join("data", "extracted", filename.replace(".pdf", ".json"))
 
             snippet = "[Snippet unavailable]"
 
             try:
-                with open(json_path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-
-                # Find correct page text
-                for page in data["pages"]:
-                    if page["page"] == page_num:
-                        snippet = generate_snippet(page["text"], query)
-                        break
+                snippet = self._snippet(shards, res, query, query_embedding)
 
             except Exception as e:
-                print(f"[WARN] Could not generate snippet for {filename}: {e}")
+                log.warning("Could not generate snippet", file=filename, error=e)
 
             # Add snippet to result
-            enhanced_results.append({
-                "distance": res["distance"],
-                "metadata": res["metadata"],
-                "snippet": snippet
-            })
+            enhanced = dict(res)
+            enhanced["snippet"] = snippet
+            enhanced_results.append(enhanced)
 
         return enhanced_results
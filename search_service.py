@@ -0,0 +1,418 @@
+import json
+import time
+import asyncio
+import argparse
+import contextlib
+
+from logs import configure, get_logger
+from metrics import REGISTRY
+from search_engine import SEARCH_MODES
+
+
+log = get_logger("search_service")
+
+HTTP_REQUESTS = REGISTRY.counter("http_requests_total", "HTTP requests by path and status.")
+BATCH_SIZE = REGISTRY.histogram(
+    "batch_size", "Queries per micro-batch.", buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)
+)
+QUEUE_DEPTH = REGISTRY.gauge("queue_depth", "Requests waiting for a micro-batch.")
+
+# Larger k values (and radius page sizes) are clamped: every result costs a snippet
+MAX_K = 100
+
+
+def is_integer(value):
+    """True for JSON integers; bools, floats and numeric strings are rejected."""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+class Overloaded(Exception):
+    """Raised when the request queue is full."""
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent search requests into batched engine calls.
+
+    Requests wait in a bounded queue. A single worker takes the first
+    waiting request, keeps collecting until max_batch_size requests are
+    gathered or max_wait seconds have passed, then runs one
+    SearchEngine.search_batch per group of requests sharing the same
+    parameters (k, threshold, mode, filters), in a worker thread so the
+    event loop keeps accepting connections.
+    """
+
+    def __init__(self, engine, max_batch_size=32, max_wait=0.005, max_queue=1024):
+        self.engine = engine
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.stats = {"requests": 0, "batches": 0, "rejected": 0, "timeouts": 0, "errors": 0}
+        self._worker = None
+
+    def start(self):
+        if self._worker is None:
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._worker
+            self._worker = None
+
+    async def search(self, query, k=5, threshold=1.2, mode="semantic", filters=None, timeout=None):
+        """
+        Queue one query and wait for its results.
+        Raises Overloaded when the queue is full (backpressure) and
+        asyncio.TimeoutError when no result arrives within timeout seconds.
+        """
+        future = asyncio.get_running_loop().create_future()
+        params = (k, threshold, mode, json.dumps(filters or {}, sort_keys=True))
+        try:
+            self.queue.put_nowait((query, params, future))
+        except asyncio.QueueFull:
+            self.stats["rejected"] += 1
+            raise Overloaded()
+
+        self.stats["requests"] += 1
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            # The worker skips requests whose future is already done
+            self.stats["timeouts"] += 1
+            raise
+
+    async def _collect(self):
+        """Wait for one request, then gather more until the batch is full or max_wait expires."""
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [item for item in await self._collect() if not item[2].done()]
+            if not batch:
+                continue
+
+            groups = {}
+            for query, params, future in batch:
+                groups.setdefault(params, []).append((query, future))
+
+            for (k, threshold, mode, filters), items in groups.items():
+                self.stats["batches"] += 1
+                BATCH_SIZE.observe(len(items))
+                queries = [query for query, _ in items]
+                try:
+                    batch_results = await loop.run_in_executor(
+                        None,
+                        lambda: self.engine.search_batch(
+                            queries, k=k, threshold=threshold, mode=mode, filters=json.loads(filters) or None
+                        ),
+                    )
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    for _, future in items:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+
+                for (_, future), results in zip(items, batch_results):
+                    if not future.done():
+                        future.set_result(results)
+
+    def snapshot(self):
+        """Counters plus the current queue depth and mean batch size."""
+        stats = dict(self.stats)
+        stats["queued"] = self.queue.qsize()
+        stats["mean_batch_size"] = stats["requests"] / stats["batches"] if stats["batches"] else 0.0
+        return stats
+
+
+def result_to_json(res):
+    """The JSON form of one search hit."""
+    return {
+        "id": res["id"],
+        "shard": res.get("shard"),
+        "distance": res["distance"],
+        "score": res.get("score"),
+        "filename": res["metadata"]["filename"],
+        "page": res["metadata"]["page"],
+        "snippet": res["snippet"],
+        "also_in": res.get("also_in", []),
+    }
+
+
+REASONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    408: "Request Timeout", 413: "Payload Too Large", 500: "Internal Server Error",
+    503: "Service Unavailable", 504: "Gateway Timeout",
+}
+
+
+class SearchService:
+    """
+    Minimal HTTP/1.1 JSON server on asyncio streams.
+
+    POST /search  {"query": ..., "k": 5, "threshold": 1.2, "mode": "semantic",
+                   "filters": {...}}  -> {"query": ..., "results": [...]}
+                  k must be a positive integer and is capped at max_k
+    POST /search/radius  {"query": ..., "threshold": 1.2, "filters": {...},
+                          "offset": 0, "limit": 20}
+                  -> {"query": ..., "total": n, "offset": 0, "results": [...]}
+                  limit is capped at max_k like k
+                  every page within threshold, one page of them at a time
+    GET  /health  -> status, model readiness, index snapshot, batching counters
+                     and cache hit ratios
+    GET  /metrics -> every metric in the Prometheus text format
+
+    Connections are kept alive between requests. A full request queue
+    answers 503, a search exceeding request_timeout answers 504 and a
+    client that stalls while sending a request is disconnected after
+    read_timeout seconds.
+    """
+
+    def __init__(self, engine, max_batch_size=32, max_wait=0.005, max_queue=1024,
+                 request_timeout=10.0, read_timeout=30.0, max_body=65536, max_k=MAX_K):
+        self.engine = engine
+        self.batcher = MicroBatcher(engine, max_batch_size, max_wait, max_queue)
+        self.request_timeout = request_timeout
+        self.read_timeout = read_timeout
+        self.max_body = max_body
+        self.max_k = max_k
+        self.server = None
+
+    async def start(self, host="127.0.0.1", port=8000):
+        self.batcher.start()
+        self.server = await asyncio.start_server(self._handle_connection, host, port)
+        return self.server
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        await self.batcher.stop()
+
+    async def _read_request(self, reader):
+        """Read one request; returns (method, path, headers, body) or None on EOF."""
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        method, path, _ = request_line.decode("latin-1").split(" ", 2)
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get("content-length", 0))
+        if length > self.max_body:
+            raise ValueError(413)
+        body = await reader.readexactly(length) if length else b""
+        return method, path, headers, body
+
+    async def _dispatch(self, method, path, body):
+        """Route a request; returns (status, payload). A str payload is sent as plain text."""
+        if path == "/metrics":
+            QUEUE_DEPTH.set(self.batcher.queue.qsize())
+            return 200, REGISTRY.render()
+        if path == "/health":
+            return 200, {
+                "status": "ok",
+                "model_ready": self.engine.embedder.ready,
+                "snapshot": self.engine.snapshot,
+                "batching": self.batcher.snapshot(),
+                "caches": self.engine.cache_stats(),
+            }
+        if path == "/search/radius":
+            if method != "POST":
+                return 405, {"error": "Use POST /search/radius"}
+            return await self._search_radius(body)
+        if path != "/search":
+            return 404, {"error": f"Unknown path {path}"}
+        if method != "POST":
+            return 405, {"error": "Use POST /search"}
+
+        try:
+            request = json.loads(body or b"{}")
+            query = request["query"]
+            k = request.get("k", 5)
+            threshold = float(request.get("threshold", 1.2))
+            mode = request.get("mode", "semantic")
+            filters = request.get("filters")
+        except (ValueError, KeyError, TypeError) as e:
+            return 400, {"error": f"Invalid request: {e}"}
+        if not isinstance(query, str) or not query.strip():
+            return 400, {"error": "Query cannot be empty"}
+        if not is_integer(k) or k <= 0:
+            return 400, {"error": f"k must be a positive integer, got {k!r}"}
+        k = min(k, self.max_k)
+        if mode not in SEARCH_MODES:
+            return 400, {"error": f"Unknown mode '{mode}', expected one of {list(SEARCH_MODES)}"}
+
+        try:
+            results = await self.batcher.search(
+                query, k=k, threshold=threshold, mode=mode, filters=filters, timeout=self.request_timeout
+            )
+        except Overloaded:
+            return 503, {"error": "Too many queued requests, retry later"}
+        except asyncio.TimeoutError:
+            return 504, {"error": f"Search timed out after {self.request_timeout}s"}
+        except ValueError as e:
+            return 400, {"error": str(e)}
+        except Exception as e:
+            return 500, {"error": str(e)}
+
+        return 200, {"query": query, "results": [result_to_json(res) for res in results]}
+
+    async def _search_radius(self, body):
+        """
+        One page of a radius search. Radius searches are not micro-batched:
+        each request runs its own range search and only snippets the
+        requested page.
+        """
+        try:
+            request = json.loads(body or b"{}")
+            query = request["query"]
+            threshold = float(request.get("threshold", 1.2))
+            filters = request.get("filters")
+            offset = request.get("offset", 0)
+            limit = request.get("limit", 20)
+        except (ValueError, KeyError, TypeError) as e:
+            return 400, {"error": f"Invalid request: {e}"}
+        if not isinstance(query, str) or not query.strip():
+            return 400, {"error": "Query cannot be empty"}
+        if not is_integer(offset) or not is_integer(limit) or offset < 0 or limit <= 0:
+            return 400, {"error": f"offset must be an integer >= 0 and limit an integer > 0, got {offset!r}, {limit!r}"}
+        limit = min(limit, self.max_k)
+
+        def run():
+            cursor = self.engine.search_radius(query, threshold=threshold, filters=filters)
+            return len(cursor), cursor[offset:offset + limit]
+
+        try:
+            total, results = await asyncio.wait_for(
+                asyncio.get_running_loop().run_in_executor(None, run), self.request_timeout
+            )
+        except asyncio.TimeoutError:
+            return 504, {"error": f"Search timed out after {self.request_timeout}s"}
+        except ValueError as e:
+            return 400, {"error": str(e)}
+        except Exception as e:
+            return 500, {"error": str(e)}
+
+        return 200, {
+            "query": query,
+            "total": total,
+            "offset": offset,
+            "results": [result_to_json(res) for res in results],
+        }
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), self.read_timeout)
+                except asyncio.TimeoutError:
+                    break
+                except ValueError as e:
+                    status = e.args[0] if e.args and e.args[0] in REASONS else 400
+                    await self._respond(writer, status, {"error": REASONS[status]}, keep_alive=False)
+                    break
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                if request is None:
+                    break
+
+                method, path, headers, body = request
+                status, payload = await self._dispatch(method, path, body)
+                HTTP_REQUESTS.inc(path=path if status != 404 else "other", status=status)
+                if status >= 500:
+                    log.warning("Request failed", path=path, status=status, error=payload.get("error"))
+                keep_alive = headers.get("connection", "").lower() != "close"
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def _respond(self, writer, status, payload, keep_alive=True):
+        if isinstance(payload, str):
+            body, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4"
+        else:
+            body, content_type = json.dumps(payload).encode("utf-8"), "application/json"
+        head = (
+            f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        with contextlib.suppress(ConnectionError):
+            await writer.drain()
+
+
+async def serve(args):
+    from search_engine import SearchEngine
+
+    engine = SearchEngine(
+        warmup="eager" if args.eager_warmup else "background",
+        shards_path=args.shards,
+        reload_interval=args.reload_interval,
+    )
+    service = SearchService(
+        engine,
+        max_batch_size=args.max_batch_size,
+        max_wait=args.max_wait_ms / 1000,
+        max_queue=args.max_queue,
+        request_timeout=args.timeout,
+        max_k=args.max_k,
+    )
+    server = await service.start(args.host, args.port)
+    log.info("Search service listening", url=f"http://{args.host}:{args.port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP/JSON search service with dynamic micro-batching.")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on")
+    parser.add_argument("--max-batch-size", type=int, default=32, help="Most queries coalesced into one batch")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0, help="Longest wait for a batch to fill")
+    parser.add_argument("--max-queue", type=int, default=1024, help="Queued requests before answering 503")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Per-request search timeout in seconds")
+    parser.add_argument("--max-k", type=int, default=MAX_K, help="Most results a /search request can ask for")
+    parser.add_argument("--eager-warmup", action="store_true", help="Load the model before accepting requests")
+    parser.add_argument("--shards", help="Serve the sharded index described by this shard manifest")
+    parser.add_argument("--reload-interval", type=float, default=5.0,
+                        help="Seconds between checks for a newly built index snapshot (0 disables)")
+    args = parser.parse_args()
+    configure()
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        log.info("Search service stopped")
+
+
+if __name__ == "__main__":
+    main()
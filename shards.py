@@ -0,0 +1,401 @@
+import os
+import json
+import time
+import argparse
+import threading
+
+from embedder import BACKENDS, Embedder
+from document_index import POOLINGS, DocumentIndex
+from field_table import FieldTable
+from lexical_index import LexicalIndex
+from logs import configure, get_logger
+from manifest import Manifest
+from page_store import PageStore
+from vector_store import VectorStore
+
+log = get_logger("shards")
+
+
+# Files of one shard, named by the update_index argument they are passed as
+SHARD_FILES = {
+    "index_path": "faiss.index",
+    "metadata_path": "metadata.bin",
+    "manifest_path": "manifest.json",
+    "pages_path": "pages.db",
+    "lexical_path": "lexical.npz",
+    "fields_path": "fields.npz",
+    "documents_path": "documents.npz",
+}
+
+
+def shard_paths(directory):
+    """Paths of the files of the shard stored in a directory."""
+    return {key: os.path.join(directory, name) for key, name in SHARD_FILES.items()}
+
+
+class ShardManifest:
+    """
+    Describes a sharded index: the shards it is made of, each a directory
+    (relative to the manifest) holding a complete index of its own
+    documents, built and updated independently of the others. snapshot
+    names the version of the whole layout; it changes with every update
+    that changed a shard.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.snapshot = None
+        self.shards = []  # [{"name": str, "path": str, "documents": int, "vectors": int}]
+
+    @property
+    def directory(self):
+        return os.path.dirname(os.path.abspath(self.path))
+
+    def paths(self, shard):
+        """File paths of a shard entry."""
+        return shard_paths(os.path.join(self.directory, shard["path"]))
+
+    def add_shard(self):
+        """Append a new, empty shard and return its entry."""
+        name = f"shard-{len(self.shards):04d}"
+        shard = {"name": name, "path": name, "documents": 0, "vectors": 0}
+        self.shards.append(shard)
+        return shard
+
+    def save(self):
+        """Write the manifest atomically; readers see the old or the new layout."""
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "snapshot": self.snapshot, "shards": self.shards}, f, indent=4)
+        os.replace(tmp_path, self.path)
+        log.info("Shard manifest saved", path=self.path, shards=len(self.shards))
+
+    @classmethod
+    def load(cls, path):
+        """Load a shard manifest, or return an empty one if it does not exist."""
+        manifest = cls(path)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            manifest.snapshot = data.get("snapshot")
+            manifest.shards = data["shards"]
+        return manifest
+
+
+class Shard:
+    """
+    One partition of the corpus: a FAISS index plus the page texts, BM25
+    index, field table and document index of the same documents. Vector IDs are local to
+    the shard.
+    """
+
+    def __init__(self, name, vector_store, page_store=None, lexical_index=None, field_table=None,
+                 document_index=None):
+        self.name = name
+        self.vector_store = vector_store
+        self.page_store = page_store
+        self.lexical_index = lexical_index
+        self.field_table = field_table
+        self.document_index = document_index
+
+    @classmethod
+    def open(cls, name, index_path, metadata_path, pages_path=None, lexical_path=None, fields_path=None,
+             documents_path=None, mmap_metadata=True, mmap_index=True, timings=None):
+        """
+        Load a shard's files; the page store, lexical index, field table
+        and document index are optional. Seconds spent per part are added to timings.
+        """
+        timings = timings if timings is not None else {}
+        phase_start = time.perf_counter()
+
+        def phase_done(phase):
+            nonlocal phase_start
+            now = time.perf_counter()
+            timings[phase] = timings.get(phase, 0.0) + now - phase_start
+            phase_start = now
+
+        # Check index existence
+        if not os.path.exists(index_path):
+            raise FileNotFoundError(
+                f"[ERROR] FAISS index not found at '{index_path}'. "
+                "Please run build_index.py first."
+            )
+
+        # Indexes built before the binary metadata format keep working
+        legacy_path = os.path.splitext(metadata_path)[0] + ".json"
+        if not os.path.exists(metadata_path) and os.path.exists(legacy_path):
+            log.warning(
+                "Using legacy JSON metadata; run metadata_table.py to convert it to the compact format",
+                path=legacy_path,
+            )
+            metadata_path = legacy_path
+
+        # Check metadata existence
+        if not os.path.exists(metadata_path):
+            raise FileNotFoundError(
+                f"[ERROR] Metadata file not found at '{metadata_path}'. "
+                "Please run build_index.py first."
+            )
+
+        vector_store = VectorStore()
+        try:
+            vector_store.load(index_path, metadata_path, mmap_metadata=mmap_metadata, mmap_index=mmap_index)
+        except Exception as e:
+            raise RuntimeError(
+                f"[ERROR] Failed to load FAISS index or metadata: {e}"
+            )
+        phase_done("index")
+
+        # Page texts for snippets; indexes built before the page store
+        # existed fall back to reading the extracted JSON per hit
+        page_store = None
+        if pages_path and os.path.exists(pages_path):
+            page_store = PageStore(pages_path)
+        else:
+            log.warning(
+                "Page store not found, snippets will be read from extracted JSON; "
+                "run page_store.py to build it",
+                path=pages_path,
+            )
+        phase_done("page_store")
+
+        # BM25 index for lexical and hybrid search (optional)
+        lexical_index = None
+        if lexical_path and os.path.exists(lexical_path):
+            lexical_index = LexicalIndex.load(lexical_path)
+        phase_done("lexical")
+
+        # Report header fields for filtered search (optional)
+        field_table = None
+        if fields_path and os.path.exists(fields_path):
+            field_table = FieldTable.load(fields_path)
+        phase_done("fields")
+
+        # Per-document vectors for document-level search (optional)
+        document_index = None
+        if documents_path and os.path.exists(documents_path):
+            document_index = DocumentIndex.load(documents_path)
+        phase_done("documents")
+
+        return cls(name, vector_store, page_store, lexical_index, field_table, document_index)
+
+    def close(self):
+        """
+        Close the page store and drop the index, metadata and tables, so
+        their memory maps are released once nothing else references them.
+        """
+        if self.page_store is not None:
+            self.page_store.close()
+        self.vector_store = self.page_store = self.lexical_index = None
+        self.field_table = self.document_index = None
+
+
+class ShardSet:
+    """
+    The shards of one loaded index version. Queries and result cursors
+    acquire it while they use its shards. Once retired (the engine has
+    switched to another version) it is closed as soon as its last user
+    releases it.
+    """
+
+    def __init__(self, shards):
+        self.shards = shards
+        self.users = 0
+        self.retired = False
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            if self.closed:
+                raise RuntimeError("[ERROR] Shards were closed after a snapshot switch.")
+            self.users += 1
+        return self.shards
+
+    def release(self):
+        with self._lock:
+            self.users -= 1
+            unused = self.retired and self.users == 0
+        if unused:
+            self.close()
+
+    def retire(self):
+        with self._lock:
+            self.retired = True
+            unused = self.users == 0
+        if unused:
+            self.close()
+
+    def close(self):
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+        for shard in self.shards:
+            shard.close()
+
+
+def partition(filenames, owners, manifest, shard_size):
+    """
+    Assign documents to shards. Documents already indexed stay in their
+    shard; new ones fill the last shard up to shard_size documents, then
+    new shards are opened, so existing shards are never repartitioned.
+    owners: {filename: shard name} of the documents already indexed
+    Returns {shard name: [filename, ...]} covering every shard.
+    """
+    assignment = {shard["name"]: [] for shard in manifest.shards}
+    new = []
+    for name in sorted(filenames):
+        if owners.get(name) in assignment:
+            assignment[owners[name]].append(name)
+        else:
+            new.append(name)
+
+    if new and not manifest.shards:
+        assignment[manifest.add_shard()["name"]] = []
+    for name in new:
+        last = manifest.shards[-1]["name"]
+        if len(assignment[last]) >= shard_size:
+            last = manifest.add_shard()["name"]
+            assignment[last] = []
+        assignment[last].append(name)
+    return assignment
+
+
+def update_shards(sources, load_documents, manifest_path, shard_size=50000, only=None, embedder=None,
+                  embedder_options=None, keep=2, **update_options):
+    """
+    Bring a sharded index in line with the current set of source files.
+
+    Documents are partitioned with partition() and every shard is updated
+    on its own with update_index (incremental, checkpointed), so adding
+    documents only touches the last shard or creates new ones.
+    Like an unsharded build, each shard is updated in a new snapshot of
+    its directory (see snapshots.SnapshotStore; keep snapshots per shard),
+    and the manifest pointing at the new snapshots replaces the old one
+    atomically: readers see the old shards or the new ones, never a mix.
+    only: optional list of shard names to update; the others are left as is.
+    Other keyword arguments are passed to update_index.
+
+    Returns {shard name: (documents re-indexed, documents removed)}.
+    """
+    # Imported here: ingest imports the whole build pipeline, and
+    # snapshots imports this module
+    from ingest import update_index
+    from snapshots import SnapshotStore
+
+    manifest = ShardManifest.load(manifest_path)
+    owners = {}
+    for shard in manifest.shards:
+        for name in Manifest.load(manifest.paths(shard)["manifest_path"]).documents:
+            owners[name] = shard["name"]
+    assignment = partition(sources, owners, manifest, shard_size)
+
+    # One model for every shard, loaded only if something needs embedding
+    owns_embedder = embedder is None
+    if owns_embedder:
+        embedder = Embedder(**{"lazy": True, **(embedder_options or {})})
+
+    changes = {}
+    built = []
+    try:
+        for shard in manifest.shards:
+            if only and shard["name"] not in only:
+                continue
+            # Shards of manifests written before snapshots were built in place
+            store = SnapshotStore(os.path.join(manifest.directory, shard["name"]), keep=keep)
+            os.makedirs(store.root, exist_ok=True)
+            existing = store.names()
+            snapshot, paths = store.begin()
+            log.info("Updating shard", shard=shard["name"], snapshot=snapshot,
+                     documents=len(assignment[shard["name"]]))
+            updated, removed = changes[shard["name"]] = update_index(
+                {name: sources[name] for name in assignment[shard["name"]]},
+                load_documents,
+                embedder=embedder,
+                **paths,
+                **update_options,
+            )
+            # A first or resumed snapshot is used even if this run had
+            # nothing left to do
+            if updated or removed or store.current() is None or snapshot in existing:
+                shard["path"] = os.path.relpath(store.path(snapshot), manifest.directory)
+                shard["documents"] = len(assignment[shard["name"]])
+                shard["vectors"] = len(Manifest.load(paths["manifest_path"]).all_ids())
+                built.append((store, snapshot))
+            else:
+                store.discard(snapshot)
+    finally:
+        if owns_embedder:
+            embedder.close()
+
+    if built:
+        # Marked published before the manifest switches to them, so a run
+        # killed in between starts from them instead of building into them
+        for store, snapshot in built:
+            store.publish(snapshot, collect=False)
+        number = int(manifest.snapshot[1:]) + 1 if manifest.snapshot else 1
+        manifest.snapshot = f"v{number:06d}"
+        manifest.save()
+        for store, _ in built:
+            store.collect()
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build or update a sharded index from extracted JSON files, partitioned by document."
+    )
+    parser.add_argument("--extracted", default="data/extracted", help="Folder of extracted JSON files")
+    parser.add_argument("--manifest", default="data/shards/shards.json", help="Shard manifest path")
+    parser.add_argument("--shard-size", type=int, default=50000, help="Documents per shard")
+    parser.add_argument("--shards", nargs="+", help="Only update these shards")
+    parser.add_argument("--index-spec", default=None, help="FAISS index type, e.g. Flat, IVF1024,Flat, HNSW32, SQ8")
+    parser.add_argument("--rerank-dtype", choices=["float16", "float32"], default=None,
+                        help="Keep exact vectors on disk and re-rank candidates of a compressed index (SQ8, PQ48)")
+    parser.add_argument("--encode-batch-size", type=int, default=32, help="Pages per model forward pass")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="Embedding model name or local directory")
+    parser.add_argument("--backend", default="torch", choices=BACKENDS, help="Embedding backend")
+    parser.add_argument("--local-files-only", action="store_true", help="Load the model from disk, no network")
+    parser.add_argument("--dedup-threshold", type=float, default=0.9,
+                        help="Store pages at least this similar (MinHash) to an indexed page with the same "
+                             "identifiers as aliases; 0 disables")
+    parser.add_argument("--document-pooling", choices=POOLINGS, default="centroid",
+                        help="How page vectors are pooled into each shard's document index")
+    parser.add_argument("--keep-snapshots", type=int, default=2,
+                        help="Snapshots kept per shard, the new one included (the others allow rollback)")
+    args = parser.parse_args()
+    configure()
+
+    # Imported here: ingest imports the whole build pipeline
+    from ingest import iter_extracted_json, list_extracted_json
+
+    sources = {
+        os.path.basename(path).replace(".json", ".pdf"): path
+        for path in list_extracted_json(args.extracted)
+    }
+    changes = update_shards(
+        sources,
+        iter_extracted_json,
+        args.manifest,
+        shard_size=args.shard_size,
+        only=args.shards,
+        index_spec=args.index_spec,
+        rerank_dtype=args.rerank_dtype,
+        dedup_threshold=args.dedup_threshold,
+        document_pooling=args.document_pooling,
+        keep=args.keep_snapshots,
+        embedder_options={
+            "model_name": args.model,
+            "backend": args.backend,
+            "local_files_only": args.local_files_only,
+            "batch_size": args.encode_batch_size,
+        },
+    )
+    for name, (updated, removed) in changes.items():
+        log.info("Shard updated", shard=name, indexed=updated, removed=removed)
+
+
+if __name__ == "__main__":
+    main()
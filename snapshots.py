@@ -0,0 +1,269 @@
+import os
+import shutil
+import argparse
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from logs import configure, get_logger
+from shards import shard_paths
+
+log = get_logger("snapshots")
+
+# Name of the file holding the name of the snapshot being served
+POINTER = "CURRENT"
+
+# Written into a snapshot once it has been served, so a snapshot without
+# it is an unfinished build that the next build resumes
+PUBLISHED = ".published"
+
+# Name of the snapshot a snapshot was seeded from, the one rollback returns to
+PARENT = ".parent"
+
+# Files a build never writes through (FAISS index, build manifest, index
+# info, metadata names, lexical, field and document tables are replaced
+# with os.replace) or only appends to (binary metadata records and exact
+# vectors; each snapshot's index info records how many of their records
+# it uses, and an append never overwrites records of another snapshot,
+# see MetadataTable.save): a new snapshot shares them with the previous
+# one via hard links. Anything else (the SQLite page store, updated in
+# place) is cloned.
+LINKED_SUFFIXES = (".index", "manifest.json", "_info.json", ".names", ".npz", ".bin")
+
+# Linux ioctl cloning a file's extents (copy-on-write), see ioctl_ficlone(2)
+FICLONE = 0x40049409
+
+
+def clone(source, destination):
+    """
+    Copy a file sharing its blocks with source where the filesystem can
+    (reflinks on Btrfs, XFS, ...): only blocks written later are copied.
+    Elsewhere it is a plain copy.
+    """
+    if fcntl is not None:
+        try:
+            with open(source, "rb") as src, open(destination, "wb") as dst:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            shutil.copystat(source, destination)
+            return
+        except OSError:
+            pass
+    shutil.copy2(source, destination)
+
+
+def seed(source, target):
+    """Fill the new snapshot directory target with the index files of source."""
+    os.makedirs(target)
+    for entry in os.scandir(source):
+        if not entry.is_file() or entry.name in (POINTER, PUBLISHED, PARENT) or entry.name.endswith(".tmp"):
+            continue
+        destination = os.path.join(target, entry.name)
+        if entry.name.endswith(LINKED_SUFFIXES):
+            try:
+                os.link(entry.path, destination)
+                continue
+            except OSError:
+                # Filesystem without hard links
+                pass
+        clone(entry.path, destination)
+
+
+class SnapshotStore:
+    """
+    Versioned copies of an index directory.
+
+    Every build writes a complete new snapshot under <root>/snapshots/
+    (seeded from the current one, so builds stay incremental; see seed for
+    which files are shared rather than copied) and then switches the
+    CURRENT pointer file to it with one atomic rename: readers see the old
+    snapshot or the new one, never a mix. The keep - 1 snapshots the
+    current one descends from are kept for rollback; every other
+    finished snapshot is deleted.
+    """
+
+    def __init__(self, root, keep=2):
+        self.root = root
+        self.keep = max(keep, 1)
+
+    @property
+    def directory(self):
+        return os.path.join(self.root, "snapshots")
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def paths(self, name, template=None):
+        """
+        File paths inside a snapshot, keyed like the arguments of
+        update_index: the standard file names (see shards.SHARD_FILES), or
+        the file names of template ({argument: path}; None stays None).
+        """
+        if template is None:
+            return shard_paths(self.path(name))
+        return {
+            key: os.path.join(self.path(name), os.path.basename(path)) if path else None
+            for key, path in template.items()
+        }
+
+    def names(self):
+        """Snapshot names, oldest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name for name in os.listdir(self.directory) if name.startswith("v"))
+
+    def current(self):
+        """Name of the snapshot being served, or None before the first one."""
+        try:
+            with open(os.path.join(self.root, POINTER), "r", encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _is_published(self, name):
+        return os.path.exists(os.path.join(self.path(name), PUBLISHED))
+
+    def parent(self, name):
+        """
+        Snapshot a snapshot was seeded from, or None. Snapshots written
+        before parents were recorded descend from the newest published
+        snapshot older than them.
+        """
+        try:
+            with open(os.path.join(self.path(name), PARENT), "r", encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            older = [other for other in self.names() if other < name and self._is_published(other)]
+            return older[-1] if older else None
+
+    def begin(self, template=None):
+        """
+        Directory for the next build. An unfinished snapshot left by a
+        killed build is resumed; otherwise a new one is seeded from the
+        current snapshot (or, the first time, from the index files found
+        directly in root).
+        Returns (snapshot name, paths(name, template)).
+        """
+        current = self.current()
+        names = self.names()
+        unfinished = [name for name in names if name > (current or "") and not self._is_published(name)]
+        if unfinished:
+            name = unfinished[-1]
+            log.info("Resuming unfinished snapshot", snapshot=name)
+            return name, self.paths(name, template)
+
+        number = int(names[-1][1:]) + 1 if names else 1
+        name = f"v{number:06d}"
+        # The first snapshot starts from an index built before snapshots existed
+        seed(self.path(current) if current is not None else self.root, self.path(name))
+        with open(os.path.join(self.path(name), PARENT), "w", encoding="utf-8") as f:
+            f.write((current or "") + "\n")
+        log.info("Snapshot started", snapshot=name, seeded_from=current or self.root)
+        return name, self.paths(name, template)
+
+    def publish(self, name, collect=True):
+        """Atomically make a snapshot the current one, then (by default) collect old ones."""
+        open(os.path.join(self.path(name), PUBLISHED), "w").close()
+        self._point_to(name)
+        log.info("Snapshot published", snapshot=name)
+        if collect:
+            self.collect()
+
+    def discard(self, name):
+        """Delete a snapshot that is not being served (e.g. a build that changed nothing)."""
+        if name == self.current():
+            raise ValueError(f"[ERROR] Snapshot '{name}' is being served and cannot be discarded.")
+        shutil.rmtree(self.path(name), ignore_errors=True)
+
+    def rollback(self):
+        """Serve the snapshot the current one was seeded from again."""
+        current = self.current()
+        previous = self.parent(current) if current is not None else None
+        if previous is None or not self._is_published(previous):
+            raise ValueError("[ERROR] No previous snapshot to roll back to.")
+        self._point_to(previous)
+        log.info("Rolled back", snapshot=previous, previous=current)
+        return previous
+
+    def collect(self):
+        """
+        Delete every snapshot but the current one, the keep - 1 it
+        descends from, and unfinished builds newer than it (which the
+        next build resumes). Snapshots rolled back from and builds
+        abandoned before the current one was published are deleted too.
+        Engines still reading a deleted snapshot keep their open files
+        until they switch.
+        """
+        current = self.current()
+        if current is None:
+            return []
+        names = self.names()
+        kept = []
+        name = current
+        while name in names and name not in kept and len(kept) < self.keep:
+            kept.append(name)
+            name = self.parent(name)
+        removed = [
+            name for name in names
+            if name not in kept and (self._is_published(name) or name < current)
+        ]
+        for name in removed:
+            shutil.rmtree(self.path(name), ignore_errors=True)
+        if removed:
+            log.info("Old snapshots removed", snapshots=removed)
+        return removed
+
+    def _point_to(self, name):
+        pointer = os.path.join(self.root, POINTER)
+        tmp_path = pointer + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(name + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, pointer)
+
+
+def build_snapshot(root, build, keep=2, template=None):
+    """
+    Run build(paths) into a new snapshot of root and publish it when it
+    changed anything. paths are as in SnapshotStore.paths(name, template);
+    build returns (documents re-indexed, removed), like update_index.
+    Returns the same.
+    """
+    store = SnapshotStore(root, keep=keep)
+    existing = store.names()
+    name, paths = store.begin(template)
+    updated, removed = build(paths)
+    # A first or resumed snapshot is published even if this run had
+    # nothing left to do
+    if updated or removed or store.current() is None or name in existing:
+        store.publish(name)
+    else:
+        store.discard(name)
+    return updated, removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List, roll back or clean up index snapshots.")
+    parser.add_argument("--root", default="data/index", help="Index directory holding the snapshots")
+    parser.add_argument("--keep", type=int, default=2, help="Snapshots kept by --collect, current included")
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument("--rollback", action="store_true", help="Serve the previous snapshot again")
+    action.add_argument("--collect", action="store_true", help="Delete snapshots beyond --keep")
+    args = parser.parse_args()
+    configure()
+
+    store = SnapshotStore(args.root, keep=args.keep)
+    if args.rollback:
+        store.rollback()
+    elif args.collect:
+        store.collect()
+    current = store.current()
+    for name in store.names():
+        state = "current" if name == current else "published" if store._is_published(name) else "unfinished"
+        print(f"{name}  {state}")
+
+
+if __name__ == "__main__":
+    main()
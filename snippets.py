@@ -0,0 +1,138 @@
+import re
+import argparse
+from functools import lru_cache
+
+import numpy as np
+
+from lexical_index import tokenize
+from logs import configure, get_logger
+
+log = get_logger("snippets")
+
+
+# Same sentence split the snippet code has always used
+SENTENCE_END = re.compile(r"(?<=[.!?]) +")
+
+
+def split_sentences(text):
+    """Return the (start, end) character offsets of every sentence of a text."""
+    bounds = []
+    start = 0
+    for match in SENTENCE_END.finditer(text):
+        bounds.append((start, match.start()))
+        start = match.end()
+    bounds.append((start, len(text)))
+    return np.array(bounds, dtype="int32").reshape(-1, 2)
+
+
+def analyze_page(text):
+    """
+    Precompute what snippet generation needs for a page: sentence offsets
+    and the normalized token set of every sentence.
+    Returns (bounds, token_sets).
+    """
+    bounds = split_sentences(text)
+    token_sets = [frozenset(tokenize(text[start:end])) for start, end in bounds]
+    return bounds, token_sets
+
+
+def encode_analysis(bounds, token_sets):
+    """Serialize analyze_page output for storage: (bytes, str)."""
+    return bounds.astype("int32").tobytes(), "\n".join(" ".join(sorted(tokens)) for tokens in token_sets)
+
+
+def decode_analysis(bounds_blob, tokens_text):
+    """Inverse of encode_analysis."""
+    bounds = np.frombuffer(bounds_blob, dtype="int32").reshape(-1, 2)
+    token_sets = [frozenset(line.split()) for line in tokens_text.split("\n")]
+    return bounds, token_sets
+
+
+@lru_cache(maxsize=1024)
+def query_matcher(query):
+    """
+    The normalized token set of a query and one compiled pattern matching
+    any of its tokens as whole words (None when the query has no tokens).
+    Built once per distinct query and shared by all its hits.
+    """
+    tokens = frozenset(tokenize(query))
+    if not tokens:
+        return tokens, None
+    # Longest first, so a longer token wins over its own prefix
+    alternatives = "|".join(re.escape(t) for t in sorted(tokens, key=len, reverse=True))
+    return tokens, re.compile(rf"\b(?:{alternatives})\b", re.IGNORECASE)
+
+
+def best_sentence(query_tokens, token_sets, sentence_vectors=None, query_embedding=None):
+    """
+    Index of the sentence that best matches the query, or None if no
+    sentence shares a token with it. With precomputed sentence vectors and
+    the query embedding, the sentence closest to the query wins instead.
+    """
+    if sentence_vectors is not None and query_embedding is not None and len(sentence_vectors):
+        similarities = sentence_vectors.astype("float32") @ np.asarray(query_embedding, dtype="float32")
+        return int(np.argmax(similarities))
+
+    best, best_score = None, 0
+    for i, tokens in enumerate(token_sets):
+        score = len(query_tokens & tokens)
+        if score > best_score:
+            best, best_score = i, score
+    return best
+
+
+def generate_snippet(text, query, max_length=250, analysis=None, sentence_vectors=None,
+                     query_embedding=None):
+    """
+    Extract the most relevant sentence based on the query.
+    Highlights query words.
+
+    analysis: (bounds, token_sets) precomputed by analyze_page at index
+    time; computed on the fly when missing.
+    sentence_vectors / query_embedding: optional sentence embeddings of
+    the page and the query embedding, to pick the sentence by similarity.
+    """
+    if not text or not text.strip():
+        return "[No text available]"
+
+    bounds, token_sets = analysis if analysis is not None else analyze_page(text)
+    query_tokens, pattern = query_matcher(query)
+
+    best = best_sentence(query_tokens, token_sets, sentence_vectors, query_embedding)
+
+    # If no sentence matched the query, fall back to the start of the text
+    if best is None:
+        sentence = text[:max_length]
+    else:
+        start, end = bounds[best]
+        sentence = text[start:end]
+
+    if len(sentence) > max_length:
+        sentence = sentence[:max_length] + "..."
+
+    # Highlight every query word in a single pass
+    if pattern is not None:
+        sentence = pattern.sub(lambda m: f"**{m.group(0)}**", sentence)
+
+    return sentence
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Precompute snippet sentence data for every page of an existing page store."
+    )
+    parser.add_argument("--pages", default="data/index/pages.db", help="Page store path")
+    args = parser.parse_args()
+    configure()
+
+    # Imported here: the page store imports this module
+    from page_store import PageStore
+
+    page_store = PageStore(args.pages)
+    analyzed = page_store.analyze_all()
+    page_store.close()
+    log.info("Precomputed snippet data", pages=analyzed)
+
+
+if __name__ == "__main__":
+    main()
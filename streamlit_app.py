@@ -1,72 +1,107 @@
 import os
 import json
 import streamlit as st
-import re
+from logs import configure
 from search_engine import SearchEngine
 
+DATASET_DIR = "dataset"
 
-# ============================
-# IMPROVED SNIPPET FUNCTION
-# ============================
-def generate_snippet(text, query, max_length=250):
-    """
-    Extract the most relevant sentence(s) based on the query.
-    Highlights the query words.
-    """
 
-    if not text or not text.strip():
-        return "[No text available]"
+# ==================================
+# Streamlit cache for performance
+# ==================================
+@st.cache_resource
+def load_engine():
+    return SearchEngine()
 
-    # 1. Split text into sentences based on punctuation
-    sentences = re.split(r'(?<=[.!?]) +', text)
 
-    query_words = [w.lower() for w in query.split()]
+# Streamlit reruns the whole script on every widget interaction; everything
+# below is cached so a rerun only redraws. index_version ties entries to the
+# loaded index.
+@st.cache_data(max_entries=256, show_spinner=False)
+def cached_search(query, k, threshold, mode, filters_json, index_version):
+    """Ranked hits of a search, without snippets."""
+    return load_engine().search(
+        query, k=k, threshold=threshold, mode=mode, filters=json.loads(filters_json), snippets=False
+    )
 
-    # 2. Score each sentence by presence of query words
-    best_sentence = None
-    best_score = 0
 
-    for sentence in sentences:
-        sent_lower = sentence.lower()
-        score = sum(1 for w in query_words if w in sent_lower)
+@st.cache_data(max_entries=256, show_spinner=False)
+def cached_document_search(query, k, threshold, filters_json, index_version):
+    """One result per report, with the best pages and their snippets."""
+    return load_engine().search_documents(query, k=k, threshold=threshold, filters=json.loads(filters_json))
 
-        if score > best_score:
-            best_score = score
-            best_sentence = sentence
 
-    # 3. Fallback if no matching sentence found
-    if not best_sentence:
-        best_sentence = text[:max_length]
+# Only plain result pages are cached: a cursor would keep the shards of
+# its snapshot open after the engine switched to a newer one
+@st.cache_data(max_entries=256, show_spinner=False)
+def cached_radius_page(query, threshold, filters_json, offset, limit, index_version):
+    """Number of pages within the threshold, and hits offset..offset+limit of them."""
+    cursor = load_engine().search_radius(query, threshold=threshold, filters=json.loads(filters_json))
+    try:
+        return len(cursor), cursor.hits(offset, offset + limit)
+    finally:
+        cursor.close()
 
-    # 4. Trim if needed
-    if len(best_sentence) > max_length:
-        best_sentence = best_sentence[:max_length] + "..."
 
-    # 5. Highlight matched words
-    snippet = best_sentence
-    for w in query_words:
-        snippet = re.sub(
-            rf"\b({re.escape(w)})\b",
-            r"**\1**",
-            snippet,
-            flags=re.IGNORECASE
-        )
+@st.cache_data(max_entries=2048, show_spinner=False)
+def cached_snippet(query, result, index_version):
+    return load_engine().snippet(result, query)
 
-    return snippet
 
+def pdf_path(filename):
+    return os.path.join(DATASET_DIR, filename)
+
+
+# Keyed by modification time so an updated PDF is read again
+@st.cache_data(max_entries=8, show_spinner=False)
+def pdf_bytes(path, mtime):
+    """Whole PDF for a download; only read once its button was clicked."""
+    with open(path, "rb") as pdf_file:
+        return pdf_file.read()
 
-# ==================================
-# Streamlit cache for performance
-# ==================================
-@st.cache_resource
-def load_engine():
-    return SearchEngine()
+
+@st.cache_data(max_entries=512, show_spinner=False)
+def page_thumbnail(path, page, mtime, width=240):
+    """PNG of one page; PyMuPDF only parses the page it renders."""
+    import fitz  # PyMuPDF, only loaded once a thumbnail is shown
+
+    with fitz.open(path) as doc:
+        pdf_page = doc[page - 1]
+        zoom = width / pdf_page.rect.width
+        return pdf_page.get_pixmap(matrix=fitz.Matrix(zoom, zoom)).tobytes("png")
+
+
+def render_download(filename, key):
+    """
+    Download button for a result's PDF. The file is only read after
+    "Prepare PDF" is clicked, not on every rerun for every result.
+    """
+    path = pdf_path(filename)
+    requested = st.session_state.setdefault("requested_downloads", set())
+    if filename not in requested and not st.button("📥 Prepare PDF", key=f"prepare_{key}"):
+        return
+    requested.add(filename)
+
+    try:
+        data = pdf_bytes(path, os.path.getmtime(path))
+    except OSError as e:
+        st.warning(f"Could not load PDF for download: {e}")
+        return
+    st.download_button(
+        label="📥 Download PDF",
+        data=data,
+        file_name=filename,
+        mime="application/pdf",
+        key=f"download_{key}"
+    )
 
 
 # ============================
 # MAIN STREAMLIT INTERFACE
 # ============================
 def main():
+    configure()
     st.set_page_config(page_title="AI PDF Semantic Search", layout="wide")
 
     st.title("📄 AI PDF Semantic Search Engine")
@@ -84,6 +119,12 @@ def main():
     if "last_results" not in st.session_state:
         st.session_state.last_results = []
 
+    if "last_radius" not in st.session_state:
+        st.session_state.last_radius = None
+
+    if "last_documents" not in st.session_state:
+        st.session_state.last_documents = None
+
     # Load search engine
     try:
         engine = load_engine()
@@ -91,6 +132,12 @@ def main():
         st.error("❌ Failed to initialize search engine. Run `build_index.py` first.")
         st.code(str(e))
         return
+    # The cached engine switches to a newly built index snapshot here;
+    # index_version changes with it, so cached searches are not reused
+    if engine.refresh():
+        st.session_state.last_results = []
+        st.session_state.last_radius = None
+        st.session_state.last_documents = None
 
     # Sidebar
     st.sidebar.header("⚙️ Search Options")
@@ -104,6 +151,47 @@ def main():
         step=0.1
     )
 
+    mode = st.sidebar.radio(
+        "Retrieval mode",
+        ["semantic", "hybrid", "lexical"],
+        help="Hybrid fuses embeddings with keyword (BM25) matching; "
+             "identifier queries like accident numbers use keywords only.",
+    )
+
+    show_thumbnails = st.sidebar.checkbox("Show page thumbnails")
+
+    by_document = st.sidebar.checkbox(
+        "One result per report",
+        help="Semantic only: picks the closest reports first, then shows "
+             "the best pages of each.",
+    )
+
+    all_within_threshold = st.sidebar.checkbox(
+        "All pages within the threshold",
+        help="Semantic only: returns every page closer than the threshold, "
+             "shown a page of results at a time.",
+    )
+
+
+    # Report header filters
+    st.sidebar.header("🗂 Filters")
+    state = st.sidebar.text_input("State / country", placeholder="e.g. FL")
+    make = st.sidebar.text_input("Aircraft make or model", placeholder="e.g. Cessna")
+    operation_part = st.sidebar.text_input("Flight conducted under part", placeholder="e.g. 91")
+    use_dates = st.sidebar.checkbox("Filter by date")
+    date_from = date_to = None
+    if use_dates:
+        date_from = st.sidebar.date_input("From")
+        date_to = st.sidebar.date_input("To")
+
+    filters = {
+        "state": state.strip(),
+        "make": make.strip(),
+        "operation_part": operation_part.strip(),
+        "date_from": date_from.isoformat() if date_from else None,
+        "date_to": date_to.isoformat() if date_to else None,
+    }
+    filters = {key: value for key, value in filters.items() if value}
 
     # Search input
     query = st.text_input(
@@ -120,54 +208,106 @@ def main():
             st.warning("⚠️ Please enter a query before searching.")
             return
 
+        filters_json = json.dumps(filters, sort_keys=True)
         with st.spinner("Searching the indexed documents..."):
-            results = engine.search(query, k=top_k, threshold=threshold)
+            radius = documents = None
+            results = []
+            if all_within_threshold:
+                # Pages of the radius search are fetched when displayed
+                radius = (query, threshold, filters_json)
+            elif by_document:
+                documents = cached_document_search(query, top_k, threshold, filters_json, engine.index_version)
+            else:
+                results = cached_search(query, top_k, threshold, mode, filters_json, engine.index_version)
 
 
         # Save results in session state
         st.session_state.last_query = query
         st.session_state.last_results = results
+        st.session_state.last_radius = radius
+        st.session_state.last_documents = documents
 
     # ====================================
     # DISPLAY RESULTS (FROM SESSION STATE)
     # ====================================
     results = st.session_state.last_results
+    radius = st.session_state.last_radius
+    documents = st.session_state.last_documents
+
+    if documents:
+        st.subheader(f"🔍 Reports for: **{st.session_state.last_query}**")
+        for i, document in enumerate(documents, start=1):
+            st.markdown(f"### {i}. 📄 {document['filename']}")
+            st.markdown(f"**Best page score:** `{document['distance']:.4f}`")
+            for res in document["pages"]:
+                st.markdown(f"**Page {res['metadata']['page']}** (`{res['distance']:.4f}`)")
+                st.markdown(f"> {res['snippet']}")
+            render_download(document["filename"], key=f"doc_{i}")
+            st.markdown("---")
+        return
+
+    # Radius searches show one page of their results; only its snippets are made
+    offset = 0
+    if radius is not None:
+        total, results = cached_radius_page(*radius, 0, top_k, engine.index_version)
+        pages = (total + top_k - 1) // top_k
+        if total:
+            st.caption(f"{total} pages within the threshold")
+        page_number = st.number_input("Result page", min_value=1, max_value=pages, value=1) if pages > 1 else 1
+        offset = (page_number - 1) * top_k
+        if offset:
+            total, results = cached_radius_page(*radius, offset, top_k, engine.index_version)
 
     if results:
         st.subheader(f"🔍 Results for: **{st.session_state.last_query}**")
 
-        for i, res in enumerate(results, start=1):
+        # Ranked hits are drawn first; snippets and thumbnails fill their
+        # placeholders afterwards, best hit first
+        placeholders = []
+        for i, res in enumerate(results, start=offset + 1):
             filename = res["metadata"]["filename"]
             page = res["metadata"]["page"]
             score = res["distance"]
-            snippet = res.get("snippet", "[Snippet unavailable]")
-
-            pdf_file_path = f"./dataset/{filename}"
 
             with st.container():
                 st.markdown(f"### {i}. 📄 {filename} — Page {page}")
-                st.markdown(f"**Relevance Score:** `{score:.4f}`")
-
-                # Snippet
-                st.markdown(f"> {snippet}")
+                if score is not None:
+                    st.markdown(f"**Relevance Score:** `{score:.4f}`")
+                else:
+                    st.markdown(f"**Keyword Score:** `{res['score']:.4f}`")
+
+                if show_thumbnails:
+                    text_column, thumbnail_column = st.columns([3, 1])
+                    with text_column:
+                        snippet_slot = st.empty()
+                    with thumbnail_column:
+                        thumbnail_slot = st.empty()
+                else:
+                    snippet_slot, thumbnail_slot = st.empty(), None
+                snippet_slot.markdown("> _Loading snippet..._")
+                if res.get("also_in"):
+                    st.caption(
+                        "Also appears in: " + ", ".join(f"{a['filename']} p. {a['page']}" for a in res["also_in"])
+                    )
+                placeholders.append((res, snippet_slot, thumbnail_slot))
 
                 # PDF download button
-                try:
-                    with open(pdf_file_path, "rb") as pdf_file:
-                        pdf_bytes = pdf_file.read()
-
-                    st.download_button(
-                        label="📥 Download PDF",
-                        data=pdf_bytes,
-                        file_name=filename,
-                        mime="application/pdf",
-                        key=f"download_{i}"
-                    )
-                except Exception as e:
-                    st.warning(f"Could not load PDF for download: {e}")
+                render_download(filename, key=i)
 
                 st.markdown("---")
 
+        for res, snippet_slot, thumbnail_slot in placeholders:
+            if "snippet" not in res:
+                res["snippet"] = cached_snippet(st.session_state.last_query, res, engine.index_version)
+            snippet_slot.markdown(f"> {res['snippet']}")
+
+            if thumbnail_slot is not None:
+                path = pdf_path(res["metadata"]["filename"])
+                try:
+                    thumbnail_slot.image(page_thumbnail(path, res["metadata"]["page"], os.path.getmtime(path)))
+                except Exception as e:
+                    thumbnail_slot.caption(f"No preview: {e}")
+
         # ==========================
         # EXPORT ALL RESULTS (JSON)
         # ==========================
@@ -179,6 +319,7 @@ def main():
                     "filename": r["metadata"]["filename"],
                     "page": r["metadata"]["page"],
                     "snippet": r.get("snippet", "[Snippet unavailable]"),
+                    "also_in": r.get("also_in", []),
                 }
                 for r in results
             ],
@@ -0,0 +1,248 @@
+import os
+import json
+import zlib
+import argparse
+
+import numpy as np
+
+from logs import configure, get_logger
+
+log = get_logger("synthetic_corpus")
+
+
+CITIES = [
+    ("Tallahassee", "FL"), ("Anchorage", "AK"), ("Phoenix", "AZ"), ("Denver", "CO"), ("Fresno", "CA"),
+    ("Wichita", "KS"), ("Bangor", "ME"), ("Reno", "NV"), ("Boise", "ID"), ("Tulsa", "OK"),
+    ("Burlington", "VT"), ("Lubbock", "TX"), ("Chevroux", "France"), ("Oshkosh", "WI"), ("Ocala", "FL"),
+]
+
+AIRCRAFT = [
+    "Piper PA-22-150", "Cessna 172N", "Cessna 150M", "Beech A36", "Piper PA-28-181",
+    "Mooney M20J", "Cirrus SR22", "Bell 206B", "Robinson R44", "Air Tractor AT-502",
+]
+
+OPERATIONS = [
+    "Part 91: General Aviation - Personal", "Part 91: General Aviation - Instructional",
+    "Part 137: Agricultural", "Part 135: Air Taxi - Commuter", "Non-U.S., Non-Commercial",
+]
+
+INJURIES = ["None", "1 Minor", "1 Serious", "2 Minor", "1 Fatal"]
+
+DAMAGE = ["Substantial", "Minor", "Destroyed"]
+
+# Narrative building blocks in the register of NTSB final reports
+SUBJECTS = [
+    "The pilot", "The student pilot", "The flight instructor", "The airplane", "The helicopter",
+    "A witness", "The operator", "The mechanic",
+]
+EVENTS = [
+    "reported a partial loss of engine power shortly after takeoff",
+    "encountered carburetor icing during the descent",
+    "lost directional control in a gusting crosswind",
+    "reported that fuel exhaustion led to a forced landing",
+    "flared high and the airplane landed hard on the runway",
+    "struck a flock of birds during the initial climb",
+    "became spatially disoriented while flying at night in instrument conditions",
+    "observed oil streaming from the engine cowling",
+    "attempted a go-around after a bounced landing",
+    "collided with power lines during an aerial application pass",
+]
+DETAILS = [
+    "The reported weather included calm winds and visibility 10 statute miles.",
+    "Examination of the engine revealed no preexisting mechanical malfunctions.",
+    "The left wing and fuselage sustained substantial damage.",
+    "The fuel tanks were found empty and the fuel lines were intact.",
+    "The density altitude at the time of the accident was about 7,200 feet.",
+    "A postaccident examination of the flight controls established continuity.",
+    "The pilot held a private pilot certificate with an airplane single-engine land rating.",
+    "Toxicology testing was not performed.",
+]
+CAUSES = [
+    "The pilot's failure to maintain directional control during the landing roll.",
+    "A total loss of engine power due to fuel exhaustion as a result of inadequate preflight planning.",
+    "The pilot's improper landing flare, which resulted in a hard landing.",
+    "The pilot's failure to use carburetor heat, which resulted in a loss of engine power.",
+    "The pilot's failure to maintain clearance from wires during the agricultural application flight.",
+]
+
+
+def _document_rng(seed, index):
+    """Independent, reproducible random stream per document."""
+    return np.random.default_rng([seed, index])
+
+
+def make_document(index, pages_per_doc=4, seed=0, page_words=220):
+    """
+    Generate one NTSB-like report in the extracted JSON format
+    ({"filename", "pages": [{"page", "text"}]}). The first page carries the
+    report header parsed by parse_report_header; the same (index, seed)
+    always yields the same document.
+    """
+    rng = _document_rng(seed, index)
+    city, state = CITIES[rng.integers(len(CITIES))]
+    aircraft = AIRCRAFT[rng.integers(len(AIRCRAFT))]
+    year = 2005 + int(rng.integers(15))
+    month, day = 1 + int(rng.integers(12)), 1 + int(rng.integers(28))
+    accident_number = f"{state[:2].upper()}{year % 100:02d}CA{index % 1000:03d}"
+    registration = f"N{int(rng.integers(100, 99999))}{'ABCDEFGH'[rng.integers(8)]}"
+
+    header = (
+        f"National Transportation Safety Board Aviation Accident Final Report "
+        f"Location: {city}, {state} Accident Number: {accident_number} "
+        f"Date & Time: {month:02d}/{day:02d}/{year}, {int(rng.integers(600, 2000)):04d} EST  "
+        f"Registration: {registration} Aircraft: {aircraft} "
+        f"Aircraft Damage: {DAMAGE[rng.integers(len(DAMAGE))]} Defining Event: "
+        f"Injuries: {INJURIES[rng.integers(len(INJURIES))]} "
+        f"Flight Conducted Under: {OPERATIONS[rng.integers(len(OPERATIONS))]} Analysis  "
+    )
+
+    pages = []
+    for page in range(1, pages_per_doc + 1):
+        sentences = []
+        words = 0
+        while words < page_words:
+            if rng.random() < 0.4:
+                sentence = DETAILS[rng.integers(len(DETAILS))]
+            else:
+                sentence = f"{SUBJECTS[rng.integers(len(SUBJECTS))]} {EVENTS[rng.integers(len(EVENTS))]}."
+            sentences.append(sentence)
+            words += len(sentence.split())
+        if page == pages_per_doc:
+            sentences.append(f"Probable Cause and Findings {CAUSES[rng.integers(len(CAUSES))]}")
+
+        prefix = f"Page {page} of {pages_per_doc} " + (header if page == 1 else f"{accident_number} ")
+        pages.append({"page": page, "text": prefix + "  ".join(sentences)})
+
+    return {"filename": f"SYN{seed:02d}{index:09d}.pdf", "pages": pages}
+
+
+def iter_documents(n_pages, pages_per_doc=4, seed=0):
+    """Stream enough synthetic documents to reach n_pages pages."""
+    n_docs = -(-n_pages // pages_per_doc)
+    for index in range(n_docs):
+        yield make_document(index, pages_per_doc, seed)
+
+
+def write_extracted(documents, output_dir):
+    """
+    Write documents as extracted JSON files, the input of build_index.py.
+    Returns the list of written paths.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for data in documents:
+        path = os.path.join(output_dir, data["filename"].replace(".pdf", ".json"))
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        paths.append(path)
+    return paths
+
+
+def write_pdfs(documents, output_dir):
+    """
+    Render documents as PDFs (one text page per page), the input of
+    pdf_processor. Returns the list of written paths.
+    """
+    import fitz  # PyMuPDF
+
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for data in documents:
+        pdf = fitz.open()
+        for page in data["pages"]:
+            pdf.new_page().insert_textbox(fitz.Rect(50, 50, 545, 792), page["text"], fontsize=9)
+        path = os.path.join(output_dir, data["filename"])
+        pdf.save(path)
+        pdf.close()
+        paths.append(path)
+    return paths
+
+
+class StubEmbedder:
+    """
+    Deterministic stand-in for Embedder that needs no model.
+
+    Texts are embedded by feature hashing: every token adds +-1 to a
+    hashed dimension, then the vector is L2-normalised. Texts sharing
+    words land close together, which keeps search results and snippets
+    meaningful, while index-side scaling can be measured at millions of
+    pages without the model's cost.
+    """
+
+    model_name = "stub-hash"
+
+    def __init__(self, dim=384, cache=None):
+        self.dim = dim
+        self.cache = cache
+        self.backend = "stub"
+        self.timings = {}
+        self.ready = True
+        # token -> signed bucket; the vocabulary is small next to the corpus
+        self._buckets = {}
+
+    def _bucket(self, token):
+        bucket = self._buckets.get(token)
+        if bucket is None:
+            h = zlib.crc32(token.encode("utf-8"))
+            bucket = self._buckets[token] = (h % self.dim, 1.0 if h & 0x80000000 else -1.0)
+        return bucket
+
+    @property
+    def space(self):
+        return {"model": self.model_name, "backend": self.backend}
+
+    @property
+    def cache_key(self):
+        return self.model_name
+
+    def warmup(self, background=True):
+        return None
+
+    def close(self):
+        pass
+
+    def encode_sorted(self, texts):
+        from lexical_index import tokenize
+
+        vectors = np.zeros((len(texts), self.dim), dtype="float32")
+        for row, text in enumerate(texts):
+            for token in tokenize(text):
+                column, sign = self._bucket(token)
+                vectors[row, column] += sign
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def embed_text(self, text):
+        return self.encode_sorted([text])[0]
+
+    def embed_texts(self, texts):
+        return self.encode_sorted(list(texts))
+
+    def embed_queries(self, queries):
+        return self.embed_texts(queries)
+
+    def embed_pages(self, pages):
+        return self.encode_sorted([page["text"] for page in pages])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic NTSB-like corpus.")
+    parser.add_argument("--pages", type=int, default=10000, help="Number of pages to generate")
+    parser.add_argument("--pages-per-doc", type=int, default=4, help="Pages per report")
+    parser.add_argument("--seed", type=int, default=0, help="Corpus seed")
+    parser.add_argument("--format", choices=["json", "pdf"], default="json",
+                        help="Extracted JSON (for build_index.py) or PDFs (for extraction)")
+    parser.add_argument("--output", default="data/synthetic", help="Output folder")
+    args = parser.parse_args()
+    configure()
+
+    documents = iter_documents(args.pages, args.pages_per_doc, args.seed)
+    if args.format == "pdf":
+        paths = write_pdfs(documents, args.output)
+    else:
+        paths = write_extracted(documents, args.output)
+    log.info("Wrote synthetic reports", count=len(paths), path=args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+from ingest import iter_extracted_json, list_extracted_json, update_index
+from search_engine import SearchEngine
+from synthetic_corpus import StubEmbedder, iter_documents, write_extracted
+
+
+# update_index / SearchEngine argument of each index file
+INDEX_FILES = {
+    "faiss.index": "index_path",
+    "metadata.bin": "metadata_path",
+    "pages.db": "pages_path",
+    "lexical.npz": "lexical_path",
+    "fields.npz": "fields_path",
+    "documents.npz": "documents_path",
+}
+
+
+@pytest.fixture
+def synthetic_sources(tmp_path):
+    """
+    Factory writing enough synthetic reports for n_pages pages as
+    extracted JSON under tmp_path. Returns {filename: path}, the sources
+    of update_index.
+    """
+    def write(n_pages, pages_per_doc=4):
+        extracted = str(tmp_path / "extracted")
+        write_extracted(iter_documents(n_pages, pages_per_doc=pages_per_doc), extracted)
+        return {os.path.basename(path).replace(".json", ".pdf"): path for path in list_extracted_json(extracted)}
+
+    return write
+
+
+@pytest.fixture
+def build_engine(tmp_path):
+    """
+    Factory indexing sources under tmp_path with a StubEmbedder and
+    opening a SearchEngine on the index, without query or result caches.
+    files: index files to build, the others are disabled (see INDEX_FILES);
+    engine_options override SearchEngine arguments (e.g. another embedder);
+    other keyword arguments go to update_index.
+    """
+    def build(sources, load_documents=iter_extracted_json, files=("faiss.index", "metadata.bin", "pages.db"),
+              engine_options=None, **update_options):
+        embedder = StubEmbedder()
+        paths = {argument: None for argument in INDEX_FILES.values()}
+        paths.update({INDEX_FILES[name]: str(tmp_path / name) for name in files})
+        update_index(
+            sources, load_documents, manifest_path=str(tmp_path / "manifest.json"), embedder=embedder,
+            dim=embedder.dim, **paths, **update_options,
+        )
+        options = {"cache_path": None, "embedder": embedder, "result_cache_size": 0, **(engine_options or {})}
+        return SearchEngine(**paths, **options)
+
+    return build
@@ -0,0 +1,91 @@
+import numpy as np
+
+from document_index import DocumentIndex
+from synthetic_corpus import StubEmbedder
+from vector_store import VectorStore
+
+
+DOCUMENT_INDEX_FILES = ("faiss.index", "metadata.bin", "pages.db", "documents.npz")
+
+
+def test_pooled_vectors_skip_removed_pages():
+    store = VectorStore(dim=2)
+    vectors = np.array([[1, 0], [0, 1], [1, 1], [0, -1]], dtype="float32")
+    store.add_embeddings(vectors, [
+        {"filename": "a.pdf", "page": 1}, {"filename": "a.pdf", "page": 2},
+        {"filename": "b.pdf", "page": 1}, {"filename": "b.pdf", "page": 2},
+    ])
+    store.remove_ids([3])
+
+    centroid = DocumentIndex.build(store, "centroid")
+    assert centroid.filenames == ["a.pdf", "b.pdf"]
+    assert np.allclose(centroid.vectors, [[0.7071, 0.7071], [0.7071, 0.7071]], atol=1e-4)
+    assert centroid.vector_docs.tolist() == [0, 0, 1, -1]
+
+    pooled = DocumentIndex.build(store, "max")
+    assert np.allclose(pooled.vectors[0], [0.7071, 0.7071], atol=1e-4)
+    assert pooled.pages([1]).tolist() == [2]
+    assert pooled.pages([1, 0]).tolist() == [2, 0, 1]
+
+
+def test_rebuild_only_pools_changed_documents(monkeypatch):
+    store = VectorStore(dim=2)
+    vectors = np.array([[1, 0], [0, 1], [1, 1], [0, -1]], dtype="float32")
+    store.add_embeddings(vectors, [
+        {"filename": "a.pdf", "page": 1}, {"filename": "a.pdf", "page": 2},
+        {"filename": "b.pdf", "page": 1}, {"filename": "b.pdf", "page": 2},
+    ])
+    previous = DocumentIndex.build(store, "centroid")
+
+    # b.pdf re-indexed, c.pdf added
+    store.remove_ids([2, 3])
+    store.add_embeddings(np.array([[-1, 0], [1, 2]], dtype="float32"), [
+        {"filename": "b.pdf", "page": 1}, {"filename": "c.pdf", "page": 1},
+    ])
+    read = []
+    get_vectors = store.get_vectors
+    monkeypatch.setattr(store, "get_vectors", lambda ids=None: read.append(ids) or get_vectors(ids))
+
+    table = DocumentIndex.build(store, "centroid", previous=previous)
+
+    assert [ids.tolist() for ids in read] == [[4, 5]]
+    assert table.filenames == ["a.pdf", "b.pdf", "c.pdf"]
+    full = DocumentIndex.build(store, "centroid")
+    assert np.allclose(table.vectors, full.vectors)
+    assert table.vector_docs.tolist() == full.vector_docs.tolist()
+
+
+def test_document_search_returns_one_row_per_report(synthetic_sources, build_engine):
+    sources = synthetic_sources(12, pages_per_doc=5)
+    engine = build_engine(sources, files=DOCUMENT_INDEX_FILES, dedup_threshold=None)
+    assert len(engine.shards[0].document_index) == len(sources)
+
+    query = "carburetor icing during descent"
+    documents = engine.search_documents(query, k=3, threshold=4.0, pages_per_doc=2, candidates=3)
+    assert len(documents) == 3
+    assert len({d["filename"] for d in documents}) == 3
+    for document in documents:
+        assert 1 <= len(document["pages"]) <= 2
+        assert all(page["metadata"]["filename"] == document["filename"] for page in document["pages"])
+        assert all(page["snippet"] for page in document["pages"])
+        assert document["distance"] == document["pages"][0]["distance"]
+        assert document["document_distance"] is not None
+
+    # With every report a candidate, the ranking is the page ranking grouped by report
+    exhaustive = engine.search_documents(query, k=3, threshold=4.0, pages_per_doc=2, candidates=len(sources))
+    pages = engine.search(query, k=60, threshold=4.0, snippets=False)
+    best = list(dict.fromkeys(page["metadata"]["filename"] for page in pages))[:3]
+    assert [d["filename"] for d in exhaustive] == best
+
+
+def test_document_search_survives_embedding_errors(synthetic_sources, build_engine):
+    class FailingEmbedder(StubEmbedder):
+        def embed_queries(self, queries):
+            raise RuntimeError("model unavailable")
+
+    engine = build_engine(
+        synthetic_sources(4, pages_per_doc=2), files=DOCUMENT_INDEX_FILES,
+        engine_options={"embedder": FailingEmbedder()},
+    )
+
+    assert engine.search_documents("carburetor icing", k=2, threshold=4.0) == []
@@ -1,5 +1,6 @@
-from embedder import Embedder
+from embedder import Embedder, check_compatible
 import numpy as np
+import pytest
 
 
 def test_embedding_dimension():
@@ -8,3 +9,25 @@ def test_embedding_dimension():
 
     assert isinstance(vector, np.ndarray)
     assert vector.shape == (384,)  # MiniLM-L6-v2 output size
+
+
+def test_length_sorted_encoding_keeps_input_order():
+    model = Embedder(batch_size=2)
+    texts = ["a much longer sentence about engine failure on takeoff", "icing", "crosswind landing"]
+
+    sorted_vectors = model.encode_sorted(texts)
+
+    for text, vector in zip(texts, sorted_vectors):
+        assert np.allclose(vector, model.embed_text(text), atol=1e-5)
+
+
+def test_index_compatibility_follows_the_model():
+    # Lazy embedders never load the model, so this runs offline
+    quantized = Embedder("models/all-MiniLM-L6-v2", lazy=True, backend="torch-int8")
+    other = Embedder("all-mpnet-base-v2", lazy=True)
+
+    # Indexes without a recorded embedding were built with the default model
+    check_compatible(None, quantized)
+    with pytest.raises(ValueError):
+        check_compatible({"model": "all-MiniLM-L6-v2", "backend": "torch"}, other)
+    assert quantized.cache_key != Embedder(lazy=True).cache_key
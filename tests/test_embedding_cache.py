@@ -0,0 +1,36 @@
+import numpy as np
+
+from embedding_cache import EmbeddingCache
+
+
+def test_cache_normalizes_queries_and_counts_hits():
+    cache = EmbeddingCache("test-model", capacity=2)
+
+    assert cache.get("Engine failure") is None
+    cache.put("Engine failure", np.ones(4))
+
+    assert np.array_equal(cache.get("  engine   FAILURE "), np.ones(4, dtype="float32"))
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_cache_evicts_least_recently_used():
+    cache = EmbeddingCache("test-model", capacity=2)
+    cache.put("a", np.zeros(2))
+    cache.put("b", np.zeros(2))
+    cache.get("a")
+    cache.put("c", np.zeros(2))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+
+
+def test_disk_cache_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = EmbeddingCache("test-model", path=path)
+    cache.put("icing", np.arange(3))
+    cache.close()
+
+    reopened = EmbeddingCache("test-model", path=path)
+    assert np.array_equal(reopened.get("icing"), np.arange(3, dtype="float32"))
+    assert EmbeddingCache("other-model", path=path).get("icing") is None
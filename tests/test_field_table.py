@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from field_table import FieldTable
+from page_store import PageStore
+from pdf_processor import parse_report_header
+
+
+HEADER = (
+    "Page 1 of 4 National Transportation Safety Board Aviation Accident Final Report "
+    "Location: Tallahassee, FL Accident Number: NYC08CA055 Date & Time: 12/08/2007, 1730 EST  "
+    "Registration: N5921D Aircraft: Piper PA-22-150 Aircraft Damage: Substantial Defining Event: "
+    "Injuries: 1 Minor Flight Conducted Under: Part 91: General Aviation - Personal Analysis  The pilot"
+)
+
+
+def test_parse_report_header():
+    fields = parse_report_header(HEADER)
+
+    assert fields["state"] == "FL"
+    assert fields["date"] == "2007-12-08"
+    assert fields["accident_number"] == "NYC08CA055"
+    assert fields["aircraft"] == "Piper PA-22-150"
+    assert fields["injury_level"] == "Minor"
+    assert fields["operation_part"] == "91"
+
+
+def test_filters_become_vector_mask(tmp_path):
+    page_store = PageStore(str(tmp_path / "pages.db"))
+    page_store.add_pages([0, 1, 2], [HEADER, "second page", HEADER.replace("FL", "CA")])
+    metadata = [
+        {"filename": "a.pdf", "page": 1},
+        {"filename": "a.pdf", "page": 2},
+        {"filename": "b.pdf", "page": 1},
+    ]
+
+    table = FieldTable.build(metadata, page_store)
+    path = str(tmp_path / "fields.npz")
+    table.save(path)
+    table = FieldTable.load(path)
+
+    assert table.mask({"state": "fl"}).tolist() == [True, True, False]
+    assert table.mask({"make": "PA-22", "operation_part": "91"}).all()
+    assert not table.mask({"date_from": "2008-01-01"}).any()
+    assert table.mask({"date_from": "2007-12-08", "date_to": "2007-12-08"}).all()
+    for date in ("2007-12", "12/08/2007"):
+        with pytest.raises(ValueError):
+            table.mask({"date_to": date})
+
+
+def test_rebuild_only_parses_changed_documents(tmp_path, monkeypatch):
+    page_store = PageStore(str(tmp_path / "pages.db"))
+    page_store.add_pages([0, 1, 2], [HEADER, "second page", HEADER.replace("FL", "CA")])
+    metadata = [
+        {"filename": "a.pdf", "page": 1},
+        {"filename": "a.pdf", "page": 2},
+        {"filename": "b.pdf", "page": 1},
+    ]
+    previous = FieldTable.build(metadata, page_store)
+
+    # b.pdf re-indexed under a new vector ID, c.pdf added
+    metadata[2] = None
+    metadata += [{"filename": "b.pdf", "page": 1}, {"filename": "c.pdf", "page": 1}]
+    page_store.add_pages([3, 4], [HEADER.replace("FL", "TX"), HEADER.replace("FL", "GA")])
+    read = []
+    fetch = page_store.get_text
+    monkeypatch.setattr(page_store, "get_text", lambda vector_id: read.append(vector_id) or fetch(vector_id))
+
+    table = FieldTable.build(metadata, page_store, previous=previous)
+
+    assert sorted(read) == [3, 4]
+    assert table.mask({"state": "fl"}).tolist() == [True, True, False, False, False]
+    assert table.mask({"state": "tx"}).tolist() == [False, False, False, True, False]
+    assert table.mask({"state": "ga"}).tolist() == [False, False, False, False, True]
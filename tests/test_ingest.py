@@ -0,0 +1,162 @@
+import os
+
+import numpy as np
+import pytest
+
+from ingest import iter_extracted_pdfs, list_pdfs, run_pipeline, update_index
+from lexical_index import LexicalIndex
+from page_store import PageStore
+from vector_store import VectorStore
+
+
+class FakeEmbedder:
+    def embed_pages(self, pages):
+        return np.array([[len(p["text"])] * 4 for p in pages], dtype="float32")
+
+
+def test_pipeline_indexes_every_page():
+    documents = [
+        {"filename": f"doc{i}.pdf", "pages": [{"page": p, "text": "x" * p} for p in range(1, 4)]}
+        for i in range(5)
+    ]
+    store = VectorStore(dim=4)
+
+    total = run_pipeline(iter(documents), FakeEmbedder(), store, batch_size=4, queue_size=2)
+
+    assert total == 15
+    assert store.index.ntotal == 15
+    assert {m["filename"] for m in store.metadata} == {f"doc{i}.pdf" for i in range(5)}
+
+
+def test_extraction_pool_writes_output(tmp_path):
+    pdf_paths = list_pdfs("dataset")[:2]
+
+    documents = list(iter_extracted_pdfs(pdf_paths, str(tmp_path), workers=2))
+
+    assert len(documents) == 2
+    for data in documents:
+        assert data["pages"]
+        assert (tmp_path / data["filename"].replace(".pdf", ".json")).exists()
+
+
+def test_update_index_only_reembeds_changed_documents(tmp_path):
+    sources = {}
+    for name in ["a", "b", "c"]:
+        path = tmp_path / f"{name}.txt"
+        path.write_text(name)
+        sources[f"{name}.pdf"] = str(path)
+
+    def load_documents(paths):
+        for path in paths:
+            name = os.path.basename(path).replace(".txt", ".pdf")
+            yield {"filename": name, "pages": [{"page": 1, "text": open(path).read()}]}
+
+    paths = [str(tmp_path / f) for f in ["faiss.index", "metadata.json", "manifest.json"]]
+
+    assert update_index(sources, load_documents, *paths, embedder=FakeEmbedder(), dim=4) == (3, 0)
+    assert update_index(sources, load_documents, *paths, embedder=FakeEmbedder(), dim=4) == (0, 0)
+
+    (tmp_path / "a.txt").write_text("changed")
+    del sources["c.pdf"]
+    assert update_index(sources, load_documents, *paths, embedder=FakeEmbedder(), dim=4) == (1, 1)
+
+    store = VectorStore(dim=4)
+    store.load(paths[0], paths[1])
+    live = [m["filename"] for m in store.metadata if m is not None]
+    assert sorted(live) == ["a.pdf", "b.pdf"]
+    assert store.index.ntotal == 2
+
+
+def test_incremental_build_updates_the_lexical_index(tmp_path):
+    sources = {}
+    for name in ["a", "b", "c"]:
+        path = tmp_path / f"{name}.txt"
+        path.write_text(f"report {name} carburetor")
+        sources[f"{name}.pdf"] = str(path)
+
+    def load_documents(paths):
+        for path in paths:
+            name = os.path.basename(path).replace(".txt", ".pdf")
+            yield {"filename": name, "pages": [{"page": 1, "text": open(path).read()}]}
+
+    paths = [str(tmp_path / f) for f in ["faiss.index", "metadata.json", "manifest.json"]]
+    pages_path, lexical_path = str(tmp_path / "pages.db"), str(tmp_path / "lexical.npz")
+
+    def build():
+        return update_index(sources, load_documents, *paths, pages_path=pages_path, lexical_path=lexical_path,
+                            embedder=FakeEmbedder(), dim=4, dedup_threshold=None)
+
+    assert build() == (3, 0)
+    (tmp_path / "a.txt").write_text("report a icing")
+    del sources["c.pdf"]
+    assert build() == (1, 1)
+
+    page_store = PageStore(pages_path)
+    expected = LexicalIndex.build(page_store.iter_pages())
+    page_store.close()
+    index = LexicalIndex.load(lexical_path)
+    assert sorted(index.vector_ids.tolist()) == sorted(expected.vector_ids.tolist())
+    assert index.terms == expected.terms
+    assert [i for i, _ in index.search("icing", k=3)] == [i for i, _ in expected.search("icing", k=3)]
+    assert index.search("c", k=3) == []
+
+
+def test_killed_build_resumes_from_checkpoint(tmp_path):
+    sources = {}
+    for i in range(6):
+        path = tmp_path / f"doc{i}.txt"
+        path.write_text(f"document {i}")
+        sources[f"doc{i}.pdf"] = str(path)
+
+    def load_documents(paths):
+        for path in paths:
+            name = os.path.basename(path).replace(".txt", ".pdf")
+            yield {"filename": name, "pages": [{"page": p, "text": open(path).read()} for p in (1, 2)]}
+
+    class CrashingEmbedder(FakeEmbedder):
+        calls = 0
+
+        def embed_pages(self, pages):
+            CrashingEmbedder.calls += 1
+            if CrashingEmbedder.calls > 3:
+                raise RuntimeError("killed")
+            return super().embed_pages(pages)
+
+    paths = [str(tmp_path / f) for f in ["faiss.index", "metadata.bin", "manifest.json", "pages.db"]]
+    # Both pages of a document are identical; keep them as separate vectors
+    options = {"dim": 4, "checkpoint_every": 2, "batch_size": 1, "queue_size": 1, "dedup_threshold": None}
+
+    with pytest.raises(RuntimeError):
+        update_index(sources, load_documents, *paths, embedder=CrashingEmbedder(), **options)
+
+    resumed, _ = update_index(sources, load_documents, *paths, embedder=FakeEmbedder(), **options)
+    assert 0 < resumed < 6
+
+    store = VectorStore(dim=4)
+    store.load(paths[0], paths[1])
+    live = sorted(store.metadata[i]["filename"] for i in store.ids())
+    assert live == sorted(name for name in sources for _ in (1, 2))
+
+
+def test_changing_the_embedding_model_rebuilds(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("a")
+    sources = {"a.pdf": str(path)}
+
+    def load_documents(paths):
+        for p in paths:
+            yield {"filename": "a.pdf", "pages": [{"page": 1, "text": open(p).read()}]}
+
+    class SpaceEmbedder(FakeEmbedder):
+        def __init__(self, model):
+            self.space = {"model": model, "backend": "torch"}
+
+    paths = [str(tmp_path / f) for f in ["faiss.index", "metadata.bin", "manifest.json"]]
+    assert update_index(sources, load_documents, *paths, embedder=SpaceEmbedder("m1"), dim=4) == (1, 0)
+    assert update_index(sources, load_documents, *paths, embedder=SpaceEmbedder("m1"), dim=4) == (0, 0)
+    assert update_index(sources, load_documents, *paths, embedder=SpaceEmbedder("m2"), dim=4) == (1, 0)
+
+    store = VectorStore(dim=4)
+    store.load(paths[0], paths[1])
+    assert store.embedding == {"model": "m2", "backend": "torch"}
+    assert store.index.ntotal == 1
@@ -0,0 +1,48 @@
+from lexical_index import LexicalIndex, is_identifier_query, reciprocal_rank_fusion
+
+
+PAGES = [
+    (10, "Accident Number: NYC08CA055 Registration: N5921D Aircraft: Piper PA-22-150"),
+    (11, "The weather included calm winds and visibility 10 miles."),
+    (12, "Engine failure on takeoff. The engine lost power."),
+]
+
+
+def test_bm25_finds_exact_identifiers():
+    index = LexicalIndex.build(PAGES)
+
+    assert index.search("NYC08CA055", k=3)[0][0] == 10
+    assert index.search("engine power", k=3)[0][0] == 12
+    assert index.search("helicopter", k=3) == []
+
+
+def test_lexical_index_roundtrip(tmp_path):
+    path = str(tmp_path / "lexical.npz")
+    LexicalIndex.build(PAGES).save(path)
+
+    loaded = LexicalIndex.load(path)
+
+    assert loaded.search("n5921d", k=1) == LexicalIndex.build(PAGES).search("n5921d", k=1)
+
+
+def test_update_matches_a_full_build():
+    index = LexicalIndex.build(PAGES)
+    new_pages = [(13, "Engine power was restored after carburetor heat."), (14, "Registration N5921D")]
+
+    index.update([10, 12], new_pages)
+    expected = LexicalIndex.build([PAGES[1]] + new_pages)
+
+    assert index.vector_ids.tolist() == [11, 13, 14]
+    # NYC08CA055 only occurred on a removed page
+    assert index.terms == expected.terms and "nyc08ca055" not in index.terms
+    for query in ("engine power", "n5921d", "calm winds", "nyc08ca055"):
+        assert index.search(query, k=3) == expected.search(query, k=3)
+
+
+def test_identifier_detection_and_fusion():
+    assert is_identifier_query("NYC08CA055")
+    assert is_identifier_query("N5921D PA-22-150")
+    assert not is_identifier_query("engine failure")
+
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1]])
+    assert [vector_id for vector_id, _ in fused] == [1, 3, 2]
@@ -0,0 +1,68 @@
+import json
+
+import numpy as np
+
+from metadata_table import MetadataTable, migrate
+from vector_store import VectorStore, load_metadata
+
+
+def test_table_behaves_like_metadata_list():
+    entries = [{"filename": "a.pdf", "page": 1}, None, {"filename": "b.pdf", "page": 3}]
+    table = MetadataTable.from_records(entries)
+
+    assert len(table) == 3
+    assert list(table) == entries
+    assert table.filenames == ["a.pdf", "b.pdf"]
+
+    table[0] = None
+    assert table[0] is None
+    assert table.doc_ids.tolist() == [-1, -1, 1]
+
+
+def test_binary_save_append_and_mmap(tmp_path):
+    path = str(tmp_path / "metadata.bin")
+    table = MetadataTable.from_records([{"filename": "a.pdf", "page": 1}])
+    table.save(path)
+
+    table.extend([{"filename": "b.pdf", "page": 1}, {"filename": "a.pdf", "page": 2}])
+    table.save(path, start=1)
+
+    # A killed build can leave a partial record behind
+    with open(path, "ab") as f:
+        f.write(b"\x01\x02")
+
+    loaded = MetadataTable.load(path, mmap=True)
+    assert isinstance(loaded.records, np.memmap)
+    assert list(loaded) == list(table)
+
+    # Modifying a memory-mapped table copies it first
+    loaded.extend([{"filename": "c.pdf", "page": 1}])
+    loaded.save(path, start=3)
+    assert list(MetadataTable.load(path))[3] == {"filename": "c.pdf", "page": 1}
+
+
+def test_migrate_from_json(tmp_path):
+    json_path = str(tmp_path / "metadata.json")
+    entries = [{"filename": "a.pdf", "page": i} for i in range(1, 4)]
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(entries, f)
+
+    migrate(json_path, str(tmp_path / "metadata.bin"))
+
+    assert list(load_metadata(str(tmp_path / "metadata.bin"))) == entries
+
+
+def test_vector_store_search_with_binary_metadata(tmp_path):
+    vectors = np.random.default_rng(0).random((20, 8), dtype="float32")
+    store = VectorStore(dim=8)
+    store.add_embeddings(vectors, [{"filename": f"doc{i % 3}.pdf", "page": i} for i in range(20)])
+    store.remove_ids([5])
+
+    paths = str(tmp_path / "faiss.index"), str(tmp_path / "metadata.bin")
+    store.save(*paths)
+    loaded = VectorStore(dim=8)
+    loaded.load(*paths, mmap_metadata=True)
+
+    result = loaded.search(vectors[7], k=1)[0]
+    assert result["metadata"] == {"filename": "doc1.pdf", "page": 7}
+    assert loaded.metadata[5] is None
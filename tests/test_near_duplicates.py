@@ -0,0 +1,140 @@
+import os
+
+import numpy as np
+
+from ingest import update_index
+from near_duplicates import DuplicateIndex, MinHasher, identifiers, similarity
+from page_store import PageStore
+from synthetic_corpus import DETAILS
+from vector_store import VectorStore
+
+
+BOILERPLATE = (
+    "This report is for informational purposes only. The National Transportation Safety Board "
+    "does not assign fault or blame for an accident or incident. The NTSB does not use this "
+    "information as evidence in litigation. Page intentionally left blank for the administrative record."
+)
+
+
+class FakeEmbedder:
+    def embed_pages(self, pages):
+        return np.array([[len(p["text"]), p["page"], 0, 0] for p in pages], dtype="float32")
+
+
+def test_lsh_finds_near_duplicates_only():
+    hasher = MinHasher()
+    index = DuplicateIndex(threshold=0.7)
+    index.add("boilerplate", hasher.signature(BOILERPLATE))
+
+    edited = BOILERPLATE.replace("left blank", "left empty")
+    assert similarity(hasher.signature(BOILERPLATE), hasher.signature(edited)) > 0.7
+    assert index.find(hasher.signature(edited)) == "boilerplate"
+    assert index.find(hasher.signature("Engine lost power during the initial climb after takeoff.")) is None
+    assert hasher.signature("") is None
+
+
+def test_duplicate_pages_are_aliases_and_survive_removal(tmp_path):
+    sources = {}
+    for name in ["a", "b", "c"]:
+        path = tmp_path / f"{name}.txt"
+        path.write_text(f"Accident report {name}: the pilot of aircraft {name} reported a loss of power.")
+        sources[f"{name}.pdf"] = str(path)
+
+    def load_documents(paths):
+        for path in paths:
+            name = os.path.basename(path).replace(".txt", ".pdf")
+            pages = [{"page": 1, "text": open(path).read()}, {"page": 2, "text": BOILERPLATE}]
+            yield {"filename": name, "pages": pages}
+
+    paths = {
+        "index_path": str(tmp_path / "faiss.index"),
+        "metadata_path": str(tmp_path / "metadata.bin"),
+        "manifest_path": str(tmp_path / "manifest.json"),
+        "pages_path": str(tmp_path / "pages.db"),
+        "dedup_threshold": 0.9,
+    }
+    update_index(sources, load_documents, embedder=FakeEmbedder(), dim=4, **paths)
+
+    store = VectorStore(dim=4)
+    store.load(paths["index_path"], paths["metadata_path"])
+    # One boilerplate page is embedded, the other two point at it
+    assert store.index.ntotal == 4
+    canonical = next(i for i, m in enumerate(store.metadata) if m["filename"] == "a.pdf" and m["page"] == 2)
+    page_store = PageStore(paths["pages_path"])
+    assert page_store.get_aliases(canonical) == (("b.pdf", 2), ("c.pdf", 2))
+    page_store.close()
+
+    # Removing the document that owns the embedded copy re-indexes the others
+    del sources["a.pdf"]
+    assert update_index(sources, load_documents, embedder=FakeEmbedder(), dim=4, **paths) == (2, 1)
+    store.load(paths["index_path"], paths["metadata_path"])
+    assert store.index.ntotal == 3
+    canonical = next(i for i, m in enumerate(store.metadata) if m and m["filename"] == "b.pdf" and m["page"] == 2)
+    page_store = PageStore(paths["pages_path"])
+    assert page_store.get_aliases(canonical) == (("c.pdf", 2),)
+    page_store.close()
+
+
+def test_also_in_only_lists_reports_passing_the_filters(tmp_path, build_engine):
+    states = {"a": "FL", "b": "CA", "c": "FL"}
+    sources = {}
+    for name, state in states.items():
+        path = tmp_path / f"{name}.txt"
+        path.write_text(f"Location: Tallahassee, {state} Accident Number: NYC08CA05{ord(name)} Aircraft: Piper")
+        sources[f"{name}.pdf"] = str(path)
+
+    def load_documents(paths):
+        for path in paths:
+            name = os.path.basename(path).replace(".txt", ".pdf")
+            pages = [{"page": 1, "text": open(path).read()}, {"page": 2, "text": BOILERPLATE}]
+            yield {"filename": name, "pages": pages}
+
+    engine = build_engine(
+        sources, load_documents, files=("faiss.index", "metadata.bin", "pages.db", "lexical.npz", "fields.npz"),
+        dedup_threshold=0.9,
+    )
+
+    hit = engine.search("intentionally left blank", k=1, mode="lexical", snippets=False)[0]
+    assert [alias["filename"] for alias in hit["also_in"]] == ["b.pdf", "c.pdf"]
+    hit = engine.search("intentionally left blank", k=1, mode="lexical", filters={"state": "FL"})[0]
+    assert hit["metadata"]["filename"] == "a.pdf"
+    assert [alias["filename"] for alias in hit["also_in"]] == ["c.pdf"]
+    cursor = engine.search_radius(BOILERPLATE, threshold=0.5, filters={"state": "fl"})
+    assert [alias["filename"] for alias in cursor[0]["also_in"]] == ["c.pdf"]
+
+
+def test_pages_keep_their_own_identifiers_searchable(tmp_path, build_engine):
+    hasher = MinHasher()
+    index = DuplicateIndex(threshold=0.9)
+    closing = BOILERPLATE + " " + " ".join(DETAILS)
+    original, copy = f"Accident Number: NYC08CA051 {closing}", f"Accident Number: NYC08CA052 {closing}"
+    index.add("a", hasher.signature(original), identifiers(original))
+    assert similarity(hasher.signature(original), hasher.signature(copy)) >= 0.9
+    assert identifiers(copy) == {"nyc08ca052"}
+    assert index.find(hasher.signature(copy), identifiers(copy)) is None
+
+    # Every report closes with the same page naming its own accident number
+    accident_numbers = {"a.pdf": "NYC08CA051", "b.pdf": "NYC08CA052", "c.pdf": "NYC08CA053"}
+    sources = {}
+    for filename in accident_numbers:
+        path = tmp_path / filename.replace(".pdf", ".txt")
+        path.write_text(f"Accident report {filename}: the pilot reported a loss of engine power.")
+        sources[filename] = str(path)
+
+    def load_documents(paths):
+        for path in paths:
+            name = os.path.basename(path).replace(".txt", ".pdf")
+            pages = [
+                {"page": 1, "text": open(path).read()},
+                {"page": 2, "text": f"Accident Number: {accident_numbers[name]} {closing}"},
+                {"page": 3, "text": BOILERPLATE},
+            ]
+            yield {"filename": name, "pages": pages}
+
+    engine = build_engine(sources, load_documents, files=("faiss.index", "metadata.bin", "pages.db", "lexical.npz"))
+
+    # Deduplication is on by default: the pages without identifiers are aliased
+    assert engine.vector_store.index.ntotal == 7
+    for filename, accident_number in accident_numbers.items():
+        hit = engine.search(accident_number, k=1, mode="lexical", snippets=False)[0]
+        assert hit["metadata"] == {"filename": filename, "page": 2}
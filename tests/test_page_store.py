@@ -0,0 +1,38 @@
+from page_store import PageStore, backfill
+from vector_store import load_metadata
+
+
+def test_page_store_roundtrip(tmp_path):
+    store = PageStore(str(tmp_path / "pages.db"))
+    store.add_pages([0, 1, 2], ["first", "second", "third"])
+
+    assert store.get_text(1) == "second"
+    assert store.get_text(42) is None
+
+    store.remove_ids([1])
+    assert store.get_text(1) is None
+    assert len(store) == 2
+
+
+def test_backfill_matches_index_metadata(tmp_path):
+    metadata = load_metadata("data/index/metadata.bin")
+    store = PageStore(str(tmp_path / "pages.db"))
+
+    stored = backfill(store, metadata)
+
+    assert stored == len(metadata)
+    assert store.get_text(0)
+
+
+def test_snippet_data_is_stored_with_pages(tmp_path):
+    store = PageStore(str(tmp_path / "pages.db"))
+    store.add_pages([0], ["Engine quit. Pilot landed."], sentence_vectors=[[[1.0, 0.0], [0.0, 1.0]]])
+
+    (bounds, token_sets), vectors = store.get_analysis(0)
+
+    assert bounds.tolist() == [[0, 12], [13, 26]]
+    assert token_sets == [{"engine", "quit"}, {"pilot", "landed"}]
+    assert vectors.shape == (2, 2)
+
+    store.remove_ids([0])
+    assert store.get_analysis(0) is None
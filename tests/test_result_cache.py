@@ -0,0 +1,66 @@
+import numpy as np
+
+from result_cache import ResultCache, search_params_key
+
+
+PARAMS = search_params_key(5, 1.2, "semantic", None)
+
+
+def test_exact_hits_and_version_invalidation():
+    cache = ResultCache(capacity=2)
+    cache.put("Carburetor  icing", PARAMS, "v1", [{"id": 1}])
+
+    assert cache.get("carburetor icing", PARAMS, "v1") == [{"id": 1}]
+    assert cache.get("carburetor icing", search_params_key(3, 1.2, "semantic", None), "v1") is None
+    assert cache.get("carburetor icing", PARAMS, "v2") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_callers_cannot_modify_cached_results():
+    cache = ResultCache(semantic_distance=0.1)
+    results = [{"id": 1, "metadata": {"filename": "a.pdf", "page": 1}, "also_in": []}]
+    cache.put("icing", PARAMS, "v1", results, embedding=np.ones(4, dtype="float32"))
+    results[0]["metadata"]["page"] = 2
+
+    hit = cache.get("icing", PARAMS, "v1")
+    hit[0]["snippet"] = "edited"
+    hit[0]["also_in"].append({"filename": "b.pdf", "page": 1})
+    similar = cache.get_similar(np.ones(4, dtype="float32"), PARAMS, "v1")
+    similar[0]["metadata"]["filename"] = "edited.pdf"
+
+    assert cache.get("icing", PARAMS, "v1") == [
+        {"id": 1, "metadata": {"filename": "a.pdf", "page": 1}, "also_in": []}
+    ]
+
+
+def test_semantic_hits_stay_within_distance_and_capacity():
+    cache = ResultCache(capacity=2, semantic_distance=0.1)
+    a, b = np.eye(4, dtype="float32")[:2]
+    cache.put("a", PARAMS, "v1", ["A"], embedding=a)
+    cache.put("b", PARAMS, "v1", ["B"], embedding=b)
+
+    assert cache.get_similar(a + 0.1, PARAMS, "v1") == ["A"]
+    assert cache.get_similar(a + b, PARAMS, "v1") is None
+
+    # Evicting "a" also drops it from the semantic level
+    cache.put("c", PARAMS, "v1", ["C"])
+    cache.put("d", PARAMS, "v1", ["D"])
+    assert cache.get_similar(a, PARAMS, "v1") is None
+    assert cache.stats()["semantic_hits"] == 1
+
+
+def test_engine_reuses_results_until_the_index_changes(synthetic_sources, build_engine):
+    engine = build_engine(synthetic_sources(40), engine_options={
+        "mmap_index": False, "semantic_cache_distance": 0.25, "result_cache_size": 1024,
+    })
+
+    first = engine.search("carburetor icing during descent", k=3, threshold=2.0)
+    assert engine.search("Carburetor icing  during descent", k=3, threshold=2.0) == first
+    reworded = engine.search("carburetor icing during the descent", k=3, threshold=2.0)
+    assert [r["id"] for r in reworded] == [r["id"] for r in first]
+    stats = engine.cache_stats()["results"]
+    assert (stats["exact_hits"], stats["semantic_hits"], stats["misses"]) == (1, 1, 1)
+
+    engine.vector_store.remove_ids([first[0]["id"]])
+    after = engine.search("carburetor icing during descent", k=3, threshold=2.0)
+    assert first[0]["id"] not in [r["id"] for r in after]
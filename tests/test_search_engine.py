@@ -1,4 +1,6 @@
+from metrics import REGISTRY, add_stage_hook, remove_stage_hook
 from search_engine import SearchEngine
+from synthetic_corpus import StubEmbedder, iter_documents
 
 
 def test_search_returns_valid_structure():
@@ -19,3 +21,88 @@ def test_search_returns_valid_structure():
 
         assert "filename" in meta
         assert "page" in meta
+
+
+def test_lexical_queries_do_not_wait_for_model():
+    engine = SearchEngine(cache_path=None, warmup="lazy")
+
+    results = engine.search("NYC08CA055", k=3, mode="hybrid")
+
+    assert results
+    assert not engine.embedder.ready
+    assert {"index", "lexical", "total"} <= set(engine.startup_report())
+
+
+def test_search_stages_are_timed_and_exported():
+    engine = SearchEngine(cache_path=None, warmup="lazy")
+    stages = []
+
+    def hook(name, seconds, labels):
+        stages.append(name)
+
+    add_stage_hook(hook)
+    try:
+        engine.search("NYC08CA055", k=3, mode="lexical")
+    finally:
+        remove_stage_hook(hook)
+
+    assert {"lexical", "page_fetch", "snippet"} <= set(stages)
+    assert 'pdf_search_search_requests_total{mode="lexical"}' in REGISTRY.render()
+
+
+def test_hits_can_be_returned_before_their_snippets():
+    engine = SearchEngine(cache_path=None, warmup="lazy")
+
+    hits = engine.search("NYC08CA055", k=3, mode="lexical", snippets=False)
+    full = engine.search("NYC08CA055", k=3, mode="lexical")
+
+    assert hits and all("snippet" not in hit for hit in hits)
+    assert [engine.snippet(hit, "NYC08CA055") for hit in hits] == [r["snippet"] for r in full]
+
+
+def test_radius_search_returns_every_page_within_threshold(synthetic_sources, build_engine):
+    engine = build_engine(synthetic_sources(10), dedup_threshold=None)
+
+    query = "carburetor icing during descent"
+    cursor = engine.search_radius(query, threshold=1.8)
+    top = engine.search(query, k=40, threshold=1.8, mode="semantic", snippets=False)
+
+    assert len(cursor) == len(top) > 2
+    assert [hit["id"] for hit in cursor.hits()] == [hit["id"] for hit in top]
+    assert all("snippet" not in hit for hit in cursor.hits())
+    first_page = cursor.page(0, size=2)
+    assert [r["id"] for r in first_page] == [hit["id"] for hit in top[:2]]
+    assert all(r["snippet"] for r in first_page)
+    assert all(r["distance"] <= 1.8 for r in cursor)
+
+    # Vectors with removed metadata are not part of the cursor
+    engine.vector_store.metadata.remove(top[0]["id"])
+    cursor = engine.search_radius(query, threshold=1.8)
+    assert len(cursor) == len(top) - 1 == len(list(cursor))
+    assert cursor[0]["id"] == top[1]["id"]
+
+
+class FailingEmbedder(StubEmbedder):
+    def embed_queries(self, queries):
+        raise RuntimeError("model unavailable")
+
+
+def test_radius_search_survives_embedding_errors(synthetic_sources, build_engine):
+    engine = build_engine(synthetic_sources(4, pages_per_doc=2), engine_options={"embedder": FailingEmbedder()})
+
+    cursor = engine.search_radius("carburetor icing", threshold=4.0)
+    assert len(cursor) == 0 and list(cursor) == []
+
+
+def test_identifier_queries_survive_embedding_errors(synthetic_sources, build_engine):
+    engine = build_engine(
+        synthetic_sources(4, pages_per_doc=2), files=("faiss.index", "metadata.bin", "pages.db", "lexical.npz"),
+        engine_options={"embedder": FailingEmbedder()},
+    )
+    documents = list(iter_documents(4, pages_per_doc=2))
+    accident_number = documents[1]["pages"][1]["text"].split()[4]
+
+    semantic, identifier = engine.search_batch(["carburetor icing", accident_number], k=3, mode="hybrid")
+
+    assert semantic == []
+    assert identifier and identifier[0]["metadata"]["filename"] == documents[1]["filename"]
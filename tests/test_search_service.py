@@ -0,0 +1,141 @@
+import json
+import asyncio
+
+import pytest
+
+from load_test import post_json
+from search_service import MAX_K, MicroBatcher, Overloaded, SearchService
+
+
+class FakeEngine:
+    class embedder:
+        ready = True
+
+    def __init__(self):
+        self.batches = []
+        self.ks = []
+
+    def cache_stats(self):
+        return {}
+
+    def search_batch(self, queries, k=5, threshold=1.2, mode="semantic", filters=None):
+        self.batches.append(list(queries))
+        self.ks.append(k)
+        return [
+            [{"id": i, "distance": 0.5, "metadata": {"filename": f"{q}.pdf", "page": 1}, "snippet": q}]
+            for i, q in enumerate(queries)
+        ]
+
+    def search_radius(self, query, threshold=1.2, filters=None):
+        return [
+            {"id": i, "distance": 0.5, "metadata": {"filename": f"{query}.pdf", "page": i}, "snippet": query}
+            for i in range(3 * MAX_K)
+        ]
+
+
+def test_concurrent_requests_are_coalesced():
+    engine = FakeEngine()
+
+    async def run():
+        batcher = MicroBatcher(engine, max_batch_size=8, max_wait=0.05)
+        batcher.start()
+        results = await asyncio.gather(*(batcher.search(f"q{i}") for i in range(5)))
+        await batcher.stop()
+        return results
+
+    results = asyncio.run(run())
+
+    assert engine.batches == [["q0", "q1", "q2", "q3", "q4"]]
+    assert [r[0]["metadata"]["filename"] for r in results] == [f"q{i}.pdf" for i in range(5)]
+
+
+def test_full_queue_rejects_requests():
+    async def run():
+        # No worker started, so the queue only fills up
+        batcher = MicroBatcher(FakeEngine(), max_queue=1)
+        first = asyncio.ensure_future(batcher.search("a", timeout=0.05))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded):
+            await batcher.search("b")
+        with pytest.raises(asyncio.TimeoutError):
+            await first
+
+    asyncio.run(run())
+
+
+def test_http_search_roundtrip():
+    async def run():
+        service = SearchService(engine)
+        server = await service.start("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        ok = await post_json(reader, writer, "localhost", "/search", {"query": "icing", "k": 3})
+        bad = await post_json(reader, writer, "localhost", "/search", {"k": 3})
+        bad_k = [
+            (await post_json(reader, writer, "localhost", "/search", {"query": "icing", "k": k}))[0]
+            for k in (0, -1, "3", 2.5, True)
+        ]
+        await post_json(reader, writer, "localhost", "/search", {"query": "icing", "k": 10 ** 9})
+        writer.close()
+        await service.stop()
+        return ok, bad, bad_k
+
+    engine = FakeEngine()
+    (status, body), (bad_status, _), bad_k = asyncio.run(run())
+
+    assert status == 200
+    assert json.loads(body)["results"][0]["filename"] == "icing.pdf"
+    assert bad_status == 400
+    assert bad_k == [400] * 5
+    assert engine.ks == [3, MAX_K]
+
+
+def test_radius_pages_are_validated_and_capped():
+    async def run():
+        service = SearchService(FakeEngine())
+        server = await service.start("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        page = await post_json(reader, writer, "localhost", "/search/radius", {"query": "icing", "offset": 5})
+        huge = await post_json(reader, writer, "localhost", "/search/radius", {"query": "icing", "limit": 10 ** 6})
+        bad = [
+            (await post_json(reader, writer, "localhost", "/search/radius", {"query": "icing", **fields}))[0]
+            for fields in (
+                {"offset": "5"}, {"offset": 5.9}, {"offset": True}, {"offset": -1},
+                {"limit": "20"}, {"limit": 2.5}, {"limit": True}, {"limit": 0},
+            )
+        ]
+        writer.close()
+        await service.stop()
+        return page, huge, bad
+
+    (status, body), (_, huge), bad = asyncio.run(run())
+
+    assert status == 200
+    assert [r["page"] for r in json.loads(body)["results"]] == list(range(5, 25))
+    assert len(json.loads(huge)["results"]) == MAX_K
+    assert bad == [400] * 8
+
+
+def test_metrics_endpoint_serves_prometheus_text():
+    async def run():
+        service = SearchService(FakeEngine())
+        server = await service.start("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        await post_json(reader, writer, "localhost", "/search", {"query": "icing"})
+        writer.write(b"GET /metrics HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n")
+        response = await reader.read()
+        writer.close()
+        await service.stop()
+        return response.decode("utf-8")
+
+    response = asyncio.run(run())
+
+    assert response.startswith("HTTP/1.1 200 OK")
+    assert "Content-Type: text/plain; version=0.0.4" in response
+    assert 'pdf_search_http_requests_total{path="/search",status="200"}' in response
+    assert "pdf_search_batch_size_count" in response
@@ -0,0 +1,85 @@
+import os
+
+from ingest import iter_extracted_json
+from search_engine import SearchEngine
+from shards import ShardManifest, partition, update_shards
+from synthetic_corpus import StubEmbedder
+
+
+def test_partition_keeps_existing_documents_in_place(tmp_path):
+    manifest = ShardManifest(str(tmp_path / "shards.json"))
+
+    first = partition(["a.pdf", "b.pdf", "c.pdf"], {}, manifest, shard_size=2)
+    assert first == {"shard-0000": ["a.pdf", "b.pdf"], "shard-0001": ["c.pdf"]}
+
+    owners = {name: shard for shard, names in first.items() for name in names}
+    second = partition(["a.pdf", "c.pdf", "d.pdf", "e.pdf"], owners, manifest, shard_size=2)
+    assert second == {"shard-0000": ["a.pdf"], "shard-0001": ["c.pdf", "d.pdf"], "shard-0002": ["e.pdf"]}
+
+
+def test_sharded_search_matches_single_index(tmp_path, synthetic_sources, build_engine):
+    embedder = StubEmbedder()
+    sources = synthetic_sources(40)
+    unsharded = build_engine(sources)
+    shards_path = str(tmp_path / "shards" / "shards.json")
+    changes = update_shards(
+        sources, iter_extracted_json, shards_path, shard_size=4, embedder=embedder, dim=embedder.dim,
+    )
+    assert sorted(changes) == ["shard-0000", "shard-0001", "shard-0002"]
+    # Nothing changed: no shard re-indexes anything
+    again = update_shards(sources, iter_extracted_json, shards_path, shard_size=4, embedder=embedder,
+                          dim=embedder.dim)
+    assert all(updated == 0 for updated, _ in again.values())
+
+    sharded = SearchEngine(
+        shards_path=shards_path, lexical_path=None, fields_path=None, cache_path=None, embedder=embedder,
+        result_cache_size=0,
+    )
+    assert len(sharded.shards) == 3
+
+    queries = ["carburetor icing during descent", "loss of engine power after takeoff"]
+    for expected, results in zip(
+        unsharded.search_batch(queries, k=8, threshold=2.0), sharded.search_batch(queries, k=8, threshold=2.0)
+    ):
+        assert [(r["metadata"]["filename"], r["metadata"]["page"]) for r in results] == \
+            [(r["metadata"]["filename"], r["metadata"]["page"]) for r in expected]
+        assert [r["snippet"] for r in results] == [r["snippet"] for r in expected]
+        assert {r["shard"] for r in results} <= {0, 1, 2}
+
+
+def test_shard_updates_switch_atomically(tmp_path, synthetic_sources):
+    embedder = StubEmbedder()
+    sources = synthetic_sources(8, pages_per_doc=2)
+    names = sorted(sources)
+    shards_path = str(tmp_path / "shards" / "shards.json")
+
+    def update(names):
+        return update_shards(
+            {name: sources[name] for name in names}, iter_extracted_json, shards_path, shard_size=2,
+            embedder=embedder, dim=embedder.dim,
+        )
+
+    update(names[:3])
+    engine = SearchEngine(
+        shards_path=shards_path, lexical_path=None, fields_path=None, cache_path=None, embedder=embedder,
+        result_cache_size=0,
+    )
+    assert engine.snapshot == "v000001"
+    query = "carburetor icing during descent"
+    assert len(engine.search(query, k=10, threshold=4.0)) == 6
+
+    # Only the changed shard gets a new snapshot; the served files are untouched
+    assert update(names) == {"shard-0000": (0, 0), "shard-0001": (1, 0)}
+    manifest = ShardManifest.load(shards_path)
+    assert manifest.snapshot == "v000002"
+    assert [shard["path"] for shard in manifest.shards] == [
+        os.path.join("shard-0000", "snapshots", "v000001"), os.path.join("shard-0001", "snapshots", "v000002"),
+    ]
+    assert len(engine.search(query, k=10, threshold=4.0)) == 6
+    assert engine.refresh() is True
+    assert len(engine.search(query, k=10, threshold=4.0)) == 8
+
+    # Nothing changed: the manifest is not rewritten
+    update(names)
+    assert ShardManifest.load(shards_path).snapshot == "v000002"
+    assert engine.refresh() is False
@@ -0,0 +1,157 @@
+import os
+
+from ingest import iter_extracted_json, update_index
+from search_engine import SearchEngine
+from snapshots import SnapshotStore, build_snapshot
+from synthetic_corpus import StubEmbedder
+from vector_store import VectorStore
+
+
+def test_engine_switches_to_new_snapshot_and_back(tmp_path, synthetic_sources):
+    embedder = StubEmbedder()
+    sources = synthetic_sources(18, pages_per_doc=3)
+    root = str(tmp_path / "index")
+
+    def build(names):
+        return build_snapshot(root, lambda paths: update_index(
+            {name: sources[name] for name in names}, iter_extracted_json, **paths,
+            embedder=embedder, dim=embedder.dim, dedup_threshold=None,
+        ))
+
+    names = sorted(sources)
+    assert build(names[:4]) == (4, 0)
+    engine = SearchEngine(
+        index_path=os.path.join(root, "faiss.index"), metadata_path=os.path.join(root, "metadata.bin"),
+        pages_path=os.path.join(root, "pages.db"), lexical_path=None, fields_path=None, documents_path=None,
+        cache_path=None, embedder=embedder,
+    )
+    assert engine.snapshot == "v000001"
+    query = "carburetor icing during descent"
+    cursor = engine.search_radius(query, threshold=4.0)
+    version = engine.index_version
+
+    # Nothing changed: no new snapshot
+    assert build(names[:4]) == (0, 0)
+    assert engine.refresh() is False
+
+    assert build(names) == (2, 0)
+    assert engine.refresh() is True
+    assert engine.snapshot == "v000002"
+    assert engine.index_version != version
+    hits = engine.search(query, k=20, threshold=4.0)
+    assert {hit["metadata"]["filename"] for hit in hits} == set(names)
+    # A cursor from before the switch still reads the snapshot it searched
+    assert {hit["metadata"]["filename"] for hit in cursor} == set(names[:4])
+
+    store = SnapshotStore(root)
+    assert store.rollback() == "v000001"
+    assert engine.refresh() is True
+    assert {hit["metadata"]["filename"] for hit in engine.search(query, k=20, threshold=4.0)} == set(names[:4])
+
+    # Only the current snapshot and the one before it are kept
+    store.publish("v000002")
+    assert build(names[:5]) == (0, 1)
+    assert store.names() == ["v000002", "v000003"]
+
+
+def test_new_snapshot_shares_atomically_replaced_files(tmp_path):
+    root = tmp_path / "index"
+    root.mkdir()
+    for name in ("faiss.index", "manifest.json", "lexical.npz", "metadata.bin", "pages.db"):
+        (root / name).write_text(name)
+    store = SnapshotStore(str(root))
+
+    first, _ = store.begin()
+    store.publish(first)
+    second, paths = store.begin()
+
+    def shared(key):
+        return os.path.samefile(store.paths(first)[key], paths[key])
+
+    assert shared("index_path") and shared("manifest_path") and shared("lexical_path")
+    # Only appended to, and records past a snapshot's own are ignored
+    assert shared("metadata_path")
+    # Updated in place: a private copy
+    assert not shared("pages_path")
+    assert open(paths["pages_path"]).read() == "pages.db"
+
+
+def test_switch_closes_old_shards_once_unused(tmp_path, synthetic_sources):
+    embedder = StubEmbedder()
+    sources = synthetic_sources(9, pages_per_doc=3)
+    root = str(tmp_path / "index")
+
+    def build(names):
+        return build_snapshot(root, lambda paths: update_index(
+            {name: sources[name] for name in names}, iter_extracted_json, **paths,
+            embedder=embedder, dim=embedder.dim, dedup_threshold=None,
+        ))
+
+    names = sorted(sources)
+    build(names[:1])
+    engine = SearchEngine(
+        index_path=os.path.join(root, "faiss.index"), metadata_path=os.path.join(root, "metadata.bin"),
+        pages_path=os.path.join(root, "pages.db"), lexical_path=None, fields_path=None, documents_path=None,
+        cache_path=None, embedder=embedder,
+    )
+    first = engine.shards[0]
+    cursor = engine.search_radius("carburetor icing", threshold=4.0)
+
+    # The cursor still reads the first snapshot after the switch
+    build(names[:2])
+    assert engine.refresh() is True
+    assert first.page_store is not None
+    assert all(hit["snippet"] for hit in cursor)
+    cursor.close()
+    assert first.page_store is None and first.vector_store is None
+
+    # Nothing holds the second snapshot: closed by the next switch
+    second = engine.shards[0]
+    engine.search("carburetor icing", k=3, threshold=4.0)
+    build(names)
+    assert engine.refresh() is True
+    assert second.page_store is None
+    assert len(engine.search("carburetor icing", k=20, threshold=4.0)) == 9
+
+
+def test_builds_append_to_shared_files_without_changing_older_snapshots(tmp_path, synthetic_sources):
+    embedder = StubEmbedder()
+    sources = synthetic_sources(12, pages_per_doc=3)
+    root = str(tmp_path / "index")
+
+    def build(names):
+        return build_snapshot(root, lambda paths: update_index(
+            {name: sources[name] for name in names}, iter_extracted_json, **paths,
+            embedder=embedder, dim=embedder.dim, rerank_dtype="float16", dedup_threshold=None,
+        ))
+
+    def load(name, mmap=False):
+        paths = store.paths(name)
+        vector_store = VectorStore()
+        vector_store.load(paths["index_path"], paths["metadata_path"], mmap_metadata=mmap, mmap_index=mmap)
+        return vector_store
+
+    names = sorted(sources)
+    store = SnapshotStore(root)
+    build(names[:2])
+    build(names[:3])
+    first, second = store.paths("v000001"), store.paths("v000002")
+    assert os.path.samefile(first["metadata_path"], second["metadata_path"])
+    assert len(load("v000001").metadata) == len(load("v000001").vectors) == 6
+    assert len(load("v000002").metadata) == len(load("v000002").vectors) == 9
+
+    # A build after a rollback does not append over the records of the
+    # snapshot rolled back from (still read by an engine here), which is
+    # deleted once the build is published
+    served = load("v000002", mmap=True)
+    _, vectors = served.get_vectors()
+    assert store.rollback() == "v000001"
+    assert build(names[:2] + names[3:4]) == (1, 0)
+    assert store.names() == ["v000001", "v000003"]
+    assert store.parent("v000003") == "v000001"
+    assert len(load("v000001").metadata) == 6
+    third = load("v000003")
+    assert len(third.metadata) == third.index.ntotal == 9
+    assert {meta["filename"] for meta in third.metadata} == set(names[:2] + names[3:4])
+    assert {meta["filename"] for meta in served.metadata} == set(names[:3])
+    assert (served.get_vectors()[1] == vectors).all()
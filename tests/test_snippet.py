@@ -1,4 +1,7 @@
+import numpy as np
+
 from search_engine import generate_snippet
+from snippets import analyze_page
 
 
 def test_snippet_basic():
@@ -23,3 +26,22 @@ def test_snippet_no_match_fallback():
     # Fallback should still return a string
     assert isinstance(snippet, str)
     assert len(snippet) > 0
+
+
+def test_precomputed_analysis_matches_on_the_fly():
+    text = "Weather was clear. The engine lost power on takeoff. The pilot landed in a field."
+    query = "engine power"
+
+    snippet = generate_snippet(text, query, analysis=analyze_page(text))
+
+    assert snippet == generate_snippet(text, query)
+    assert snippet == "The **engine** lost **power** on takeoff."
+
+
+def test_sentence_vectors_pick_the_closest_sentence():
+    text = "First sentence. Second sentence. Third sentence."
+    vectors = np.eye(3, dtype="float16")
+
+    snippet = generate_snippet(text, "first", sentence_vectors=vectors, query_embedding=[0, 0, 1])
+
+    assert snippet == "Third sentence."
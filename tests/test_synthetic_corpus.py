@@ -0,0 +1,24 @@
+import numpy as np
+
+from pdf_processor import parse_report_header
+from synthetic_corpus import StubEmbedder, iter_documents, make_document
+
+
+def test_documents_are_reproducible_and_parseable():
+    assert make_document(7, seed=1) == make_document(7, seed=1)
+    assert make_document(7, seed=1) != make_document(8, seed=1)
+
+    documents = list(iter_documents(10, pages_per_doc=4))
+    assert sum(len(d["pages"]) for d in documents) == 12
+
+    fields = parse_report_header(documents[0]["pages"][0]["text"])
+    assert fields["date"] and fields["state"] and fields["accident_number"]
+
+
+def test_stub_embedder_is_deterministic_and_normalised():
+    embedder = StubEmbedder(dim=64)
+    vectors = embedder.embed_texts(["engine power loss", "engine power loss", "bird strike"])
+
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0)
+    assert np.allclose(vectors[0], vectors[1])
+    assert vectors[0] @ vectors[2] < vectors[0] @ vectors[1]
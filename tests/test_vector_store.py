@@ -1,10 +1,11 @@
 from vector_store import VectorStore
+import numpy as np
 import os
 
 
 def test_vector_store_loading():
     index_path = "data/index/faiss.index"
-    metadata_path = "data/index/metadata.json"
+    metadata_path = "data/index/metadata.bin"
 
     # Index must exist
     assert os.path.exists(index_path)
@@ -14,3 +15,92 @@ def test_vector_store_loading():
     store.load(index_path, metadata_path)
 
     assert len(store.metadata) > 0
+
+
+def test_search_batch_matches_single_search():
+    store = VectorStore()
+    store.load("data/index/faiss.index", "data/index/metadata.bin")
+
+    queries = store.index.reconstruct_n(0, 3)
+    batch = store.search_batch(queries, k=4)
+
+    assert len(batch) == 3
+    for query, results in zip(queries, batch):
+        assert results == store.search(query, k=4)
+
+
+def test_ivf_index_spec_is_trained_and_persisted(tmp_path):
+    vectors = np.random.default_rng(0).random((500, 8), dtype="float32")
+    metadata = [{"filename": "doc.pdf", "page": i} for i in range(500)]
+
+    store = VectorStore(dim=8, index_spec="IVF4,Flat", train_size=200)
+    store.add_embeddings(vectors, metadata)
+    store.set_search_params(nprobe=4)
+
+    index_path = str(tmp_path / "faiss.index")
+    metadata_path = str(tmp_path / "metadata.json")
+    store.save(index_path, metadata_path)
+
+    loaded = VectorStore(dim=8)
+    loaded.load(index_path, metadata_path)
+
+    assert loaded.index_spec == "IVF4,Flat"
+    assert loaded.search_params == {"nprobe": 4}
+    assert loaded.index.ntotal == 500
+    assert loaded.search(vectors[7], k=1)[0]["id"] == 7
+
+
+def test_id_mask_filters_inside_faiss_search():
+    vectors = np.random.default_rng(1).random((100, 8), dtype="float32")
+    store = VectorStore(dim=8)
+    store.add_embeddings(vectors, [{"filename": "doc.pdf", "page": i} for i in range(100)])
+
+    id_mask = np.zeros(100, dtype=bool)
+    id_mask[50:60] = True
+    results = store.search_batch(vectors[:1], k=5, id_mask=id_mask)[0]
+
+    assert len(results) == 5
+    assert all(50 <= r["id"] < 60 for r in results)
+
+
+def test_search_ids_scores_only_the_given_vectors():
+    vectors = np.random.default_rng(1).random((100, 8), dtype="float32")
+    store = VectorStore(dim=8)
+    store.add_embeddings(vectors, [{"filename": "doc.pdf", "page": i} for i in range(100)])
+    store.metadata.remove(52)
+
+    id_mask = np.zeros(100, dtype=bool)
+    id_mask[50:60] = True
+    id_mask[52] = False
+    results = store.search_ids(vectors[0], np.arange(50, 60), k=5)
+
+    assert [r["id"] for r in results] == [r["id"] for r in store.search_batch(vectors[:1], k=5, id_mask=id_mask)[0]]
+    exact = ((vectors[[r["id"] for r in results]] - vectors[0]) ** 2).sum(axis=1)
+    assert np.allclose([r["distance"] for r in results], exact)
+
+
+def test_compressed_index_reranks_from_memory_mapped_vectors(tmp_path):
+    rng = np.random.default_rng(2)
+    vectors = rng.random((600, 16), dtype="float32")
+    metadata = [{"filename": "doc.pdf", "page": i} for i in range(600)]
+    queries = vectors[:20] + rng.normal(scale=0.01, size=(20, 16)).astype("float32")
+
+    exact = VectorStore(dim=16)
+    exact.add_embeddings(vectors, metadata)
+    store = VectorStore(dim=16, index_spec="SQ8", train_size=600, rerank_dtype="float32", rerank_factor=4)
+    store.add_embeddings(vectors, metadata)
+
+    index_path = str(tmp_path / "faiss.index")
+    store.save(index_path, str(tmp_path / "metadata.bin"))
+    loaded = VectorStore(dim=16)
+    loaded.load(index_path, str(tmp_path / "metadata.bin"), mmap_metadata=True, mmap_index=True)
+    assert loaded.rerank_dtype == "float32" and loaded.vectors.mapped
+
+    # Distances are exact, so they compare with those of the flat index
+    for expected, results in zip(exact.search_batch(queries, k=5), loaded.search_batch(queries, k=5)):
+        assert [r["id"] for r in results] == [r["id"] for r in expected]
+        np.testing.assert_allclose(
+            [r["distance"] for r in results], [r["distance"] for r in expected], rtol=1e-4, atol=1e-6
+        )
+    ids, loaded_vectors = loaded.get_vectors()
+    np.testing.assert_array_equal(loaded_vectors, vectors[ids])
@@ -0,0 +1,127 @@
+import os
+
+import numpy as np
+
+from metadata_table import is_shared_past
+from metrics import BYTES_READ
+
+MAGIC = b"PDFVEC01"
+
+# After the magic: int32 dimension and int32 bytes per component
+HEADER = np.dtype([("dim", "<i4"), ("itemsize", "<i4")])
+
+DTYPES = {2: np.dtype("<f2"), 4: np.dtype("<f4")}
+
+
+class VectorFile:
+    """
+    Full-precision copy of every indexed vector, one row per vector ID,
+    kept on disk next to a compressed FAISS index so its candidates can be
+    re-ranked by exact distance. Stored as float16 (half the size, enough
+    for ranking) or float32; rows of removed vectors stay in place so IDs
+    never shift. Loaded memory-mapped, only the candidate rows of a query
+    are ever read.
+    """
+
+    def __init__(self, dim, dtype="float16"):
+        self.dim = dim
+        dtype = np.dtype(dtype)
+        if dtype.kind != "f" or dtype.itemsize not in DTYPES:
+            raise ValueError(f"[ERROR] Unsupported vector file type '{dtype}', expected float16 or float32.")
+        self.dtype = DTYPES[dtype.itemsize]
+        self.rows = np.zeros((0, dim), dtype=self.dtype)
+        self._size = 0
+        self.mapped = False
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def nbytes(self):
+        """Size of the stored rows."""
+        return self._size * self.dim * self.dtype.itemsize
+
+    def _reserve(self, size):
+        """Grow the row array (geometrically) and make it writable."""
+        if size <= len(self.rows) and self.rows.flags.writeable:
+            return
+        capacity = max(size, 2 * len(self.rows), 1024)
+        rows = np.zeros((capacity, self.dim), dtype=self.dtype)
+        rows[:self._size] = self.rows[:self._size]
+        self.rows = rows
+        self.mapped = False
+
+    def extend(self, vectors):
+        """Append vectors (N x dim) as the rows of the next N vector IDs."""
+        vectors = np.asarray(vectors).reshape(-1, self.dim)
+        self._reserve(self._size + len(vectors))
+        self.rows[self._size:self._size + len(vectors)] = vectors
+        self._size += len(vectors)
+
+    def pad_to(self, size):
+        """
+        Append zero rows up to size. A killed build can leave metadata
+        ahead of the vector file; those IDs are never in the index.
+        """
+        if size > self._size:
+            self.extend(np.zeros((size - self._size, self.dim), dtype=self.dtype))
+
+    def take(self, ids):
+        """Rows of the given vector IDs as a float32 matrix."""
+        rows = self.rows[np.asarray(ids, dtype="int64")]
+        if self.mapped:
+            BYTES_READ.inc(rows.nbytes, source="vector_file")
+        return rows.astype("float32")
+
+    def save(self, path, start=0):
+        """
+        Write the rows to path. With start > 0 only rows from that vector
+        ID on are appended to an existing file, unless it is shared with
+        another snapshot past that point (see MetadataTable.save).
+        """
+        row_bytes = self.dim * self.dtype.itemsize
+        end = len(MAGIC) + HEADER.itemsize + start * row_bytes
+        if start == 0 or not os.path.exists(path) or is_shared_past(path, end):
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(MAGIC)
+                f.write(np.array([(self.dim, self.dtype.itemsize)], dtype=HEADER).tobytes())
+                f.write(self.rows[:self._size].tobytes())
+            os.replace(tmp_path, path)
+            return
+
+        with open(path, "r+b") as f:
+            # Drop a partial row left by a killed build before appending
+            f.truncate(end)
+            f.seek(0, os.SEEK_END)
+            f.write(self.rows[start:self._size].tobytes())
+
+    @classmethod
+    def load(cls, path, mmap=False, size=None):
+        """
+        Load a file written by save. With mmap=True the rows are
+        memory-mapped read-only and only copied if vectors are added.
+        A partial trailing row left by a killed build is ignored, and so
+        are rows past size (appended by a later index snapshot).
+        """
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"[ERROR] {path} is not a vector file.")
+            header = np.frombuffer(f.read(HEADER.itemsize), dtype=HEADER)[0]
+
+        dim, itemsize = int(header["dim"]), int(header["itemsize"])
+        vector_file = cls(dim, DTYPES[itemsize])
+        offset = len(MAGIC) + HEADER.itemsize
+        stored = (os.path.getsize(path) - offset) // (dim * itemsize)
+        size = stored if size is None else min(size, stored)
+        if size == 0:
+            return vector_file
+        if mmap:
+            vector_file.rows = np.memmap(path, dtype=vector_file.dtype, mode="r", offset=offset, shape=(size, dim))
+            vector_file.mapped = True
+        else:
+            vector_file.rows = np.fromfile(path, dtype=vector_file.dtype, count=size * dim, offset=offset)
+            vector_file.rows = vector_file.rows.reshape(size, dim)
+            BYTES_READ.inc(vector_file.rows.nbytes, source="vector_file")
+        vector_file._size = size
+        return vector_file
@@ -2,26 +2,291 @@ import faiss
 import numpy as np
 import os
 import json
+import threading
+
+from logs import get_logger
+from metadata_table import MetadataTable, is_binary_metadata, load_json_metadata
+from metrics import BYTES_READ, REGISTRY
+from vector_file import VectorFile
+
+log = get_logger("vector_store")
+
+VECTORS_SCANNED = REGISTRY.counter(
+    "faiss_vectors_scanned_total", "Distance computations performed by FAISS searches."
+)
+
+# FAISS only counts HNSW distance computations in one process-wide
+# counter that concurrent searches all add to. It is read only for a
+# search no other HNSW search overlapped, so for HNSW indexes
+# VECTORS_SCANNED is a lower bound under concurrency.
+_hnsw_lock = threading.Lock()
+_hnsw_searches = {"running": 0, "started": 0}
+
+
+def _hnsw_scan_start():
+    with _hnsw_lock:
+        _hnsw_searches["running"] += 1
+        _hnsw_searches["started"] += 1
+        return _hnsw_searches["running"] == 1, _hnsw_searches["started"], faiss.cvar.hnsw_stats.ndis
+
+
+def _hnsw_scan_end(start):
+    """Distance computations of the search started with start, or None if another one overlapped it."""
+    alone, number, before = start
+    with _hnsw_lock:
+        _hnsw_searches["running"] -= 1
+        if alone and _hnsw_searches["started"] == number:
+            return max(faiss.cvar.hnsw_stats.ndis - before, 0)
+    return None
+
+
+def index_info_path(index_path):
+    """Path of the JSON sidecar describing how an index was built."""
+    return os.path.splitext(index_path)[0] + "_info.json"
+
+
+def vector_file_path(index_path):
+    """Path of the full-precision vectors kept next to a compressed index."""
+    return os.path.splitext(index_path)[0] + "_vectors.bin"
+
+
+def index_file_version(index_path):
+    """
+    Identity of an index file on disk. Builds replace the file atomically,
+    so any rebuild yields a new value.
+    """
+    st = os.stat(index_path)
+    return f"{st.st_ino:x}-{st.st_mtime_ns:x}-{st.st_size:x}"
+
+
+def mmap_io_flags():
+    """
+    FAISS read flags that memory-map the index data instead of copying it
+    into RAM. Newer FAISS versions map flat codes and inverted lists in
+    place (IO_FLAG_MMAP_IFC); older ones only support IO_FLAG_MMAP.
+    """
+    return getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+
+def load_metadata(metadata_path, mmap=False, size=None):
+    """
+    Load the per-vector metadata written by VectorStore.save as a
+    MetadataTable. ".bin" paths use the compact binary format (optionally
+    memory-mapped, and cut to size records if given); anything else is
+    read as JSON Lines, or as the single JSON array written by older
+    versions.
+    """
+    if is_binary_metadata(metadata_path):
+        return MetadataTable.load(metadata_path, mmap=mmap, size=size)
+    return MetadataTable.from_records(load_json_metadata(metadata_path))
 
 
 class VectorStore:
-    def __init__(self, dim=384):
+    def __init__(self, dim=384, index_spec="Flat", train_size=50000, rerank_dtype=None, rerank_factor=4):
         """
         dim = dimension of embeddings (384 for MiniLM-L6-v2)
+        index_spec = FAISS index_factory string, e.g. "Flat" (exact search),
+                     "IVF1024,Flat", "HNSW32", "SQ8", "PQ48" or "IVF1024,PQ48"
+        train_size = number of vectors collected to train indexes that
+                     need training (IVF, SQ, PQ) before anything is added
+        rerank_dtype = "float16" or "float32" to keep full-precision vectors
+                       in a file next to the index (memory-mapped at query
+                       time); the compressed index then only proposes
+                       candidates, which are re-ranked by exact distance
+        rerank_factor = candidates fetched per requested result when
+                        re-ranking
+        Note: HNSW indexes cannot remove vectors, so incremental builds
+        that delete documents need a full rebuild with them.
         """
         self.dim = dim
-        self.index = faiss.IndexFlatL2(dim)  # FAISS index (L2 distance)
-        self.metadata = []  # Stores PDF info for each vector
+        self.index_spec = index_spec
+        self.train_size = train_size
+        # Query-time knobs such as nprobe (IVF) and efSearch (HNSW)
+        self.search_params = {}
+        self.rerank_factor = rerank_factor
+        # Exact vectors by ID for re-ranking, or None
+        self.vectors = VectorFile(dim, rerank_dtype) if rerank_dtype else None
+        # Embedding model and backend the vectors come from ({"model",
+        # "backend"}); None for indexes built before it was recorded
+        self.embedding = None
+        # FAISS index (L2 distance), ID-mapped so vectors can be removed later
+        self.index = self._new_index()
+        # Stores PDF info for each vector, indexed by vector ID.
+        # Removed vectors read back as None so IDs never shift.
+        self.metadata = MetadataTable()
+        # Vectors waiting for enough training data: (embeddings, ids)
+        self._pending = []
+        # Metadata entries already written to disk; later entries are
+        # appended on the next save unless the file must be rewritten
+        self._metadata_saved = 0
+        self._metadata_rewrite = True
+        self._vectors_saved = 0
+        # Memory-mapped indexes are loaded read-only
+        self.read_only = False
+        # File the index was loaded from and changes made since, see version
+        self._source_version = None
+        self._changes = 0
+        # (version, ntotal, sizes of the IVF inverted lists), see _scan_start
+        self._list_sizes = None
+
+    @property
+    def version(self):
+        """
+        Changes whenever search results may change: the index is loaded
+        from a different file, or vectors or search parameters change.
+        """
+        return self._source_version, self._changes
+
+    def _new_index(self):
+        """Create an empty ID-mapped index from the index spec."""
+        return faiss.IndexIDMap2(faiss.index_factory(self.dim, self.index_spec))
+
+    def flush(self):
+        """Train the index if needed, then add any buffered vectors."""
+        if not self._pending:
+            return
+        embeddings = np.vstack([e for e, _ in self._pending])
+        ids = np.concatenate([i for _, i in self._pending])
+        self._pending = []
+
+        if not self.index.is_trained:
+            log.info("Training index", index_spec=self.index_spec, vectors=len(embeddings))
+            sample = embeddings
+            if len(sample) > self.train_size:
+                rng = np.random.default_rng(0)
+                sample = sample[rng.choice(len(sample), self.train_size, replace=False)]
+            try:
+                self.index.train(sample)
+            except RuntimeError as e:
+                raise ValueError(
+                    f"[ERROR] Could not train '{self.index_spec}' on {len(sample)} vectors: {e}"
+                )
+        self.index.add_with_ids(embeddings, ids)
+
+    @property
+    def rerank_dtype(self):
+        return self.vectors.dtype.name if self.vectors is not None else None
+
+    def set_search_params(self, nprobe=None, ef_search=None, rerank_factor=None):
+        """
+        Set query-time tuning knobs. Knobs that do not apply to the
+        current index type are ignored with a warning.
+        nprobe = number of IVF lists visited per query
+        ef_search = HNSW search queue size
+        rerank_factor = candidates re-ranked per requested result
+        """
+        if rerank_factor is not None:
+            if self.vectors is None:
+                log.warning("Index keeps no vectors to re-rank with, rerank_factor ignored",
+                            index_spec=self.index_spec)
+            else:
+                self.rerank_factor = rerank_factor
+                self._changes += 1
+
+        params = faiss.ParameterSpace()
+        for name, value in (("nprobe", nprobe), ("efSearch", ef_search)):
+            if value is None:
+                continue
+            try:
+                params.set_index_parameter(self.index, name, value)
+                self.search_params[name] = value
+                self._changes += 1
+            except RuntimeError:
+                log.warning("Search parameter does not apply to this index, ignored",
+                            param=name, index_spec=self.index_spec)
+
+    def _check_writable(self):
+        if self.read_only:
+            raise ValueError("[ERROR] Index was memory-mapped read-only; load it without mmap to modify it.")
+
+    def _ensure_id_map(self):
+        """
+        Indexes written before ID mapping was introduced are plain flat
+        indexes whose IDs are their positions. Re-wrap them so vectors
+        can be removed without renumbering.
+        """
+        if isinstance(self.index, faiss.IndexIDMap):
+            return
+        vectors = self.index.reconstruct_n(0, self.index.ntotal)
+        self.index = faiss.IndexIDMap2(faiss.IndexFlatL2(self.dim))
+        self.index.add_with_ids(vectors, np.arange(len(vectors), dtype="int64"))
 
     def add_embeddings(self, embeddings, metadata_list):
         """
         embeddings: numpy array of shape (N, 384)
         metadata_list: list of dictionaries with {filename, page}
+        Returns the vector IDs assigned to the new embeddings.
         """
+        self._check_writable()
+        self._ensure_id_map()
         embeddings = embeddings.astype("float32")  # FAISS needs float32
-        self.index.add(embeddings)
+        start = len(self.metadata)
+        ids = np.arange(start, start + len(embeddings), dtype="int64")
         self.metadata.extend(metadata_list)
-        print(f"[INFO] Added {len(embeddings)} embeddings to index.")
+        if self.vectors is not None:
+            self.vectors.extend(embeddings)
+
+        if self.index.is_trained:
+            self.index.add_with_ids(embeddings, ids)
+        else:
+            # Hold vectors back until there is enough data to train on
+            self._pending.append((embeddings, ids))
+            if sum(len(e) for e, _ in self._pending) >= self.train_size:
+                self.flush()
+
+        self._changes += 1
+        log.debug("Added embeddings to index", count=len(embeddings))
+        return ids
+
+    def remove_ids(self, ids):
+        """
+        Remove vectors from the index by ID.
+        Returns the number of vectors actually removed.
+        """
+        ids = np.asarray(ids, dtype="int64")
+        if len(ids) == 0:
+            return 0
+        self._check_writable()
+        self._ensure_id_map()
+        self.flush()
+        removed = self.index.remove_ids(ids)
+        for idx in ids:
+            self.metadata.remove(int(idx))
+        self._metadata_rewrite = True
+        self._changes += 1
+        log.info("Removed embeddings from index", count=removed)
+        return removed
+
+    def ids(self):
+        """Return the IDs of every vector stored in the index."""
+        self.flush()
+        if isinstance(self.index, faiss.IndexIDMap):
+            return faiss.vector_to_array(self.index.id_map)
+        return np.arange(self.index.ntotal, dtype="int64")
+
+    def get_vectors(self, ids=None):
+        """
+        Return (ids, vectors) for every vector stored in the index, or
+        only for the given IDs.
+        Only exact (Flat) indexes and indexes with a vector file keep the
+        original vectors around.
+        """
+        self.flush()
+        if ids is not None:
+            ids = np.asarray(ids, dtype="int64")
+            if self.vectors is not None:
+                return ids, self.vectors.take(ids)
+            if not len(ids):
+                return ids, np.zeros((0, self.index.d), dtype="float32")
+            return ids, self.index.reconstruct_batch(ids)
+        ids = self.ids()
+        if self.vectors is not None:
+            return ids, self.vectors.take(ids)
+        if isinstance(self.index, faiss.IndexIDMap):
+            vectors = self.index.index.reconstruct_n(0, self.index.ntotal)
+        else:
+            vectors = self.index.reconstruct_n(0, self.index.ntotal)
+        return ids, vectors
 
     def search(self, query_embedding, k=5):
         """
@@ -29,30 +294,309 @@ class VectorStore:
         Returns distances and metadata.
         """
         query_embedding = np.array(query_embedding).astype("float32").reshape(1, -1)
-        distances, indices = self.index.search(query_embedding, k)
+        return self.search_batch(query_embedding, k)[0]
+
+    def _filtered_search_params(self, selector):
+        """
+        Search parameters restricting a search to the selected IDs, keeping
+        the index's own tuning knobs (the parameter type depends on the index).
+        """
+        inner = self._inner_index()
+
+        if isinstance(inner, faiss.IndexIVF):
+            return faiss.SearchParametersIVF(sel=selector, nprobe=inner.nprobe)
+        if isinstance(inner, faiss.IndexHNSW):
+            return faiss.SearchParametersHNSW(sel=selector, efSearch=inner.hnsw.efSearch)
+        return faiss.SearchParameters(sel=selector)
+
+    def _inner_index(self):
+        inner = self.index.index if isinstance(self.index, faiss.IndexIDMap) else self.index
+        return faiss.downcast_index(inner)
+
+    def _index_type(self):
+        """Short index family name used as a metric label: flat, ivf, hnsw, ..."""
+        inner = self._inner_index()
+        if isinstance(inner, faiss.IndexIVF):
+            return "ivf"
+        if isinstance(inner, faiss.IndexHNSW):
+            return "hnsw"
+        return type(inner).__name__.replace("Index", "").lower()
+
+    def _scan_start(self, query_embeddings, id_mask=None):
+        """
+        Called before a search: the number of vectors it scans, computed
+        for this call alone, or for HNSW what _count_scanned needs to read
+        FAISS's global counter afterwards.
+        """
+        inner = self._inner_index()
+        if isinstance(inner, faiss.IndexIVF):
+            # The lists the search probes, chosen by the coarse quantizer
+            _, lists = inner.quantizer.search(query_embeddings, inner.nprobe)
+            key = (self.version, inner.ntotal)
+            if self._list_sizes is None or self._list_sizes[0] != key:
+                invlists = inner.invlists
+                sizes = np.array([invlists.list_size(i) for i in range(inner.nlist)], dtype="int64")
+                self._list_sizes = (key, sizes)
+            return int(self._list_sizes[1][lists[lists >= 0]].sum())
+        if isinstance(inner, faiss.IndexHNSW):
+            return _hnsw_scan_start()
+        # An exact index compares every query with every selected vector
+        selected = self.index.ntotal if id_mask is None else int(np.count_nonzero(id_mask))
+        return len(query_embeddings) * min(selected, self.index.ntotal)
+
+    def _count_scanned(self, scan):
+        """Add a search's scanned vectors (from _scan_start) to VECTORS_SCANNED."""
+        scanned = _hnsw_scan_end(scan) if isinstance(scan, tuple) else scan
+        if scanned is not None:
+            VECTORS_SCANNED.inc(scanned, index_type=self._index_type())
+
+    def range_search(self, query_embedding, radius, id_mask=None):
+        """
+        Every vector within a squared L2 distance of radius (inclusive)
+        of one query, however many there are.
+        id_mask: optional boolean array over vector IDs, as in search_batch.
+        Returns (distances, ids) as numpy arrays sorted by distance; no
+        metadata is built, callers look up the hits they actually use.
+
+        With a vector file the index's approximate distances select the
+        candidates, which are then kept or dropped by exact distance.
+        """
+        self.flush()
+        query_embedding = np.array(query_embedding).astype("float32").reshape(1, self.dim)
+        # FAISS keeps distances strictly below the radius
+        faiss_radius = float(np.nextafter(np.float32(radius), np.float32(np.inf)))
+
+        params = None
+        if id_mask is not None:
+            bits = np.packbits(np.asarray(id_mask, dtype=bool), bitorder="little")
+            params = self._filtered_search_params(faiss.IDSelectorBitmap(len(bits), faiss.swig_ptr(bits)))
+
+        scan = self._scan_start(query_embedding, id_mask)
+        try:
+            if params is None:
+                _, distances, ids = self.index.range_search(query_embedding, faiss_radius)
+            else:
+                _, distances, ids = self.index.range_search(query_embedding, faiss_radius, params=params)
+        except RuntimeError as e:
+            raise ValueError(f"[ERROR] Index '{self.index_spec}' does not support range search: {e}")
+        finally:
+            self._count_scanned(scan)
+
+        ids = ids.astype("int64")
+        if self.vectors is not None and len(ids):
+            distances = ((self.vectors.take(ids) - query_embedding) ** 2).sum(axis=1)
+            keep = distances <= radius
+            distances, ids = distances[keep], ids[keep]
+        order = np.argsort(distances, kind="stable")
+        return distances[order].astype("float32"), ids[order]
+
+    def search_batch(self, query_embeddings, k=5, id_mask=None):
+        """
+        Find the top k similar embeddings for every row of a query matrix
+        with a single FAISS search.
+        id_mask: optional boolean array over vector IDs; only vectors whose
+        entry is True are considered, inside the FAISS search itself.
+        Returns one result list per query.
+        """
+        self.flush()
+        query_embeddings = np.array(query_embeddings).astype("float32").reshape(-1, self.dim)
+
+        # With a vector file the index only proposes candidates
+        n_candidates = k * self.rerank_factor if self.vectors is not None else k
+        scan = self._scan_start(query_embeddings, id_mask)
+        try:
+            if id_mask is None:
+                distances, indices = self.index.search(query_embeddings, n_candidates)
+            else:
+                bits = np.packbits(np.asarray(id_mask, dtype=bool), bitorder="little")
+                # The bitmap size is given in bytes
+                selector = faiss.IDSelectorBitmap(len(bits), faiss.swig_ptr(bits))
+                params = self._filtered_search_params(selector)
+                distances, indices = self.index.search(query_embeddings, n_candidates, params=params)
+        finally:
+            self._count_scanned(scan)
+        if self.vectors is not None:
+            distances, indices = self._rerank(query_embeddings, indices, k)
+
+        # Metadata dicts are only built for the hits
+        all_results = []
+        for row_distances, row_indices in zip(distances, indices):
+            results = []
+            for dist, idx in zip(row_distances, row_indices):
+                if idx == -1:
+                    continue
+                meta = self.metadata[int(idx)]
+                if meta is None:
+                    continue
+                results.append({
+                    "id": int(idx),
+                    "distance": float(dist),
+                    "metadata": meta
+                })
+            all_results.append(results)
+
+        return all_results
+
+    def search_ids(self, query_embedding, ids, k=5):
+        """
+        Exact top k of one query among the given vector IDs only: their
+        vectors are read (vector file or Flat index) and compared by
+        squared L2, without searching the rest of the index.
+        Returns a result list like search.
+        """
+        query_embedding = np.array(query_embedding).astype("float32").reshape(self.dim)
+        ids, vectors = self.get_vectors(ids)
+        VECTORS_SCANNED.inc(len(ids), index_type=self._index_type())
+        exact = ((vectors - query_embedding) ** 2).sum(axis=1)
 
         results = []
-        for dist, idx in zip(distances[0], indices[0]):
-            if idx == -1:
+        for i in np.argsort(exact, kind="stable"):
+            meta = self.metadata[int(ids[i])]
+            if meta is None:
                 continue
-            results.append({
-                "distance": float(dist),
-                "metadata": self.metadata[idx]
-            })
-
+            results.append({"id": int(ids[i]), "distance": float(exact[i]), "metadata": meta})
+            if len(results) == k:
+                break
         return results
 
+    def _rerank(self, query_embeddings, candidates, k):
+        """
+        Exact squared L2 distances between every query and its candidate
+        IDs, read from the vector file. Returns the top k per query as
+        (distances, indices), padded with -1 like a FAISS search.
+        """
+        distances = np.full((len(query_embeddings), k), np.inf, dtype="float32")
+        indices = np.full((len(query_embeddings), k), -1, dtype="int64")
+
+        # Every candidate row is read once, however many queries share it
+        unique_ids = np.unique(candidates[candidates >= 0])
+        if not len(unique_ids):
+            return distances, indices
+        rows = self.vectors.take(unique_ids)
+
+        for i, (query, row_ids) in enumerate(zip(query_embeddings, candidates)):
+            row_ids = row_ids[row_ids >= 0]
+            exact = ((rows[np.searchsorted(unique_ids, row_ids)] - query) ** 2).sum(axis=1)
+            order = np.argsort(exact, kind="stable")[:k]
+            distances[i, :len(order)] = exact[order]
+            indices[i, :len(order)] = row_ids[order]
+        return distances, indices
+
+    def save_metadata(self, metadata_path):
+        """
+        Write metadata in the binary format (".bin" paths) or as JSON Lines.
+        Entries added since the last save are appended to the existing file,
+        so periodic checkpoints of a large build only write what is new.
+        Removals force a full rewrite.
+        """
+        if is_binary_metadata(metadata_path):
+            start = 0 if self._metadata_rewrite else self._metadata_saved
+            self.metadata.save(metadata_path, start=start)
+        elif self._metadata_rewrite or not os.path.exists(metadata_path):
+            tmp_path = metadata_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for meta in self.metadata:
+                    f.write(json.dumps(meta) + "\n")
+            os.replace(tmp_path, metadata_path)
+        else:
+            with open(metadata_path, "a", encoding="utf-8") as f:
+                for vector_id in range(self._metadata_saved, len(self.metadata)):
+                    meta = self.metadata[vector_id]
+                    f.write(json.dumps(meta) + "\n")
+
+        self._metadata_saved = len(self.metadata)
+        self._metadata_rewrite = False
+
     def save(self, index_path, metadata_path):
-        """Save FAISS index + metadata to disk."""
-        faiss.write_index(self.index, index_path)
-        with open(metadata_path, "w", encoding="utf-8") as f:
-            json.dump(self.metadata, f, indent=4)
-        print(f"[INFO] Index saved to {index_path}")
-        print(f"[INFO] Metadata saved to {metadata_path}")
-
-    def load(self, index_path, metadata_path):
-        """Load FAISS index + metadata from disk."""
-        self.index = faiss.read_index(index_path)
-        with open(metadata_path, "r", encoding="utf-8") as f:
-            self.metadata = json.load(f)
-        print("[INFO] Index and metadata loaded successfully!")
+        """Save FAISS index + metadata (and how the index was built) to disk."""
+        self.flush()
+        # Metadata goes first: it may run ahead of the index after a crash,
+        # but never behind it
+        self.save_metadata(metadata_path)
+        if self.vectors is not None:
+            self.vectors.save(vector_file_path(index_path), start=self._vectors_saved)
+            self._vectors_saved = len(self.vectors)
+
+        tmp_path = index_path + ".tmp"
+        faiss.write_index(self.index, tmp_path)
+        os.replace(tmp_path, index_path)
+
+        info_path = index_info_path(index_path)
+        with open(info_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "dim": self.dim,
+                    "index_spec": self.index_spec,
+                    "search_params": self.search_params,
+                    "embedding": self.embedding,
+                    "rerank_dtype": self.rerank_dtype,
+                    "rerank_factor": self.rerank_factor,
+                    # Binary metadata and vector files can be shared with
+                    # later snapshots, which append past this
+                    "metadata_size": len(self.metadata),
+                },
+                f,
+                indent=4,
+            )
+        os.replace(info_path + ".tmp", info_path)
+        log.info("Index saved", index=index_path, metadata=metadata_path, vectors=self.index.ntotal)
+
+    def load(self, index_path, metadata_path, mmap_metadata=False, mmap_index=False):
+        """
+        Load FAISS index + metadata from disk.
+        mmap_metadata = memory-map binary metadata instead of reading it
+        mmap_index = memory-map the FAISS index read-only, so loading does
+                     not copy every vector into RAM first
+        """
+        self.read_only = False
+        if mmap_index:
+            try:
+                self.index = faiss.read_index(index_path, mmap_io_flags())
+                self.read_only = True
+            except RuntimeError as e:
+                log.warning("Could not memory-map the index, reading it instead", path=index_path, error=e)
+                self.index = faiss.read_index(index_path)
+        else:
+            self.index = faiss.read_index(index_path)
+        if not self.read_only:
+            BYTES_READ.inc(os.path.getsize(index_path), source="index")
+
+        # Indexes saved before the sidecar existed are exact flat indexes
+        info_path = index_info_path(index_path)
+        info = None
+        if os.path.exists(info_path):
+            with open(info_path, "r", encoding="utf-8") as f:
+                info = json.load(f)
+        size = info.get("metadata_size") if info else None
+
+        self.metadata = load_metadata(metadata_path, mmap=mmap_metadata, size=size)
+        if not (mmap_metadata and is_binary_metadata(metadata_path)):
+            BYTES_READ.inc(os.path.getsize(metadata_path), source="metadata")
+        self._pending = []
+        self._source_version = index_file_version(index_path)
+        self._changes = 0
+        self._metadata_saved = len(self.metadata)
+        # Rewrite JSON once on the next save, in case the file is in the
+        # legacy format or ends with a truncated line. Binary files can be
+        # appended to: a partial trailing record is already dropped on load.
+        self._metadata_rewrite = not is_binary_metadata(metadata_path)
+
+        if info is not None:
+            self.index_spec = info["index_spec"]
+            self.embedding = info.get("embedding")
+            params = info.get("search_params", {})
+            self.set_search_params(nprobe=params.get("nprobe"), ef_search=params.get("efSearch"))
+            self.rerank_factor = info.get("rerank_factor", self.rerank_factor)
+            rerank_dtype = info.get("rerank_dtype")
+        else:
+            self.index_spec = "Flat"
+            self.embedding = None
+            rerank_dtype = None
+
+        self.vectors = None
+        if rerank_dtype:
+            self.vectors = VectorFile.load(vector_file_path(index_path), mmap=mmap_index, size=size)
+            self.vectors.pad_to(len(self.metadata))
+        self._vectors_saved = len(self.vectors) if self.vectors is not None else 0
+        log.info("Index and metadata loaded", vectors=self.index.ntotal, index_spec=self.index_spec,
+                 rerank_dtype=rerank_dtype, mmap=self.read_only)